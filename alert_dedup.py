@@ -0,0 +1,206 @@
+"""
+Webhook deduplication and alert coalescing for the autonomous incident agent.
+
+OpsGenie re-sends webhooks for the same alert on every action (acknowledge,
+note added, escalation, ...). This module drops exact re-deliveries keyed on
+alertId + action and follow-up actions on alerts that were already
+investigated, and folds alerts that hit the same entity while an
+investigation is in progress into that investigation.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+NEW = "new"
+DUPLICATE = "duplicate"
+COALESCED = "coalesced"
+
+
+@dataclass
+class DedupDecision:
+    """Outcome of checking an incoming webhook against recent activity."""
+    status: str
+    primary_alert_id: Optional[str] = None
+    related: Optional[Dict[str, Any]] = None
+
+
+class AlertDeduplicator:
+    """
+    Idempotency layer in front of the incident queue.
+
+    Each accepted (alertId, action) pair, and each alertId covered by an
+    investigation, is remembered for `dedup_ttl` seconds; only a Create can
+    start another investigation of a remembered alert. Each investigation
+    started for an entity opens a coalescing window, closed by `complete`
+    or after at most `coalesce_window` seconds, during which further alerts
+    on that entity are attached to the primary alert's `coalescedAlerts`
+    list instead of starting a new investigation.
+    """
+
+    def __init__(self, dedup_ttl: float = 3600, coalesce_window: float = 300, max_entries: int = 10000):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            dedup_ttl: Seconds an (alertId, action) pair or investigated alertId is remembered
+            coalesce_window: Maximum seconds after an investigation starts during
+                which alerts on the same entity are coalesced into it (0 disables)
+            max_entries: Upper bound on remembered keys and entities
+        """
+        self.dedup_ttl = dedup_ttl
+        self.coalesce_window = coalesce_window
+        self.max_entries = max_entries
+
+        # All maps are insertion ordered, which is also expiry order
+        self._seen: "OrderedDict[tuple, float]" = OrderedDict()
+        self._investigated: "OrderedDict[str, float]" = OrderedDict()
+        self._entities: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self._counters = {"duplicates": 0, "coalesced": 0, "new": 0}
+
+    def check(self, alert_data: Dict[str, Any], action: str) -> DedupDecision:
+        """
+        Classify an incoming alert webhook.
+
+        Coalesced alerts are attached to the primary alert data (which the
+        queued investigation holds by reference) as a side effect. Alerts
+        classified as new are not remembered until `record` is called, so a
+        webhook rejected by the queue can be retried by OpsGenie.
+
+        Args:
+            alert_data: Alert information from OpsGenie webhook
+            action: OpsGenie webhook action (Create, Acknowledge, AddNote, ...)
+
+        Returns:
+            DedupDecision: Whether to investigate, drop, or report coalescing
+        """
+        now = time.monotonic()
+        self._expire(now)
+
+        alert_id = alert_data.get('alertId')
+        key = (alert_id, action)
+
+        if key in self._seen:
+            self._counters["duplicates"] += 1
+            logger.info(f"Dropping duplicate webhook for alert {alert_id} (action {action})")
+            return DedupDecision(DUPLICATE, alert_id)
+
+        if action != 'Create' and alert_id in self._investigated:
+            self._remember(key, now)
+            self._counters["duplicates"] += 1
+            logger.info(f"Dropping {action} webhook for already investigated alert {alert_id}")
+            return DedupDecision(DUPLICATE, alert_id)
+
+        entity = alert_data.get('entity')
+        window = self._entities.get(entity) if entity else None
+
+        if window is not None:
+            _, primary = window
+            primary_id = primary.get('alertId')
+
+            related = None
+            if primary_id != alert_id:
+                related = {
+                    "alertId": alert_id,
+                    "message": alert_data.get('message'),
+                    "priority": alert_data.get('priority'),
+                    "createdAt": alert_data.get('createdAt')
+                }
+                primary.setdefault('coalescedAlerts', []).append(related)
+                self._remember_investigated(alert_id, now)
+
+            self._remember(key, now)
+            self._counters["coalesced"] += 1
+            logger.info(f"Coalescing alert {alert_id} (action {action}) into investigation of {primary_id}")
+            return DedupDecision(COALESCED, primary_id, related)
+
+        return DedupDecision(NEW)
+
+    def record(self, alert_data: Dict[str, Any], action: str):
+        """
+        Remember an alert whose investigation has been accepted.
+
+        Args:
+            alert_data: Alert information from OpsGenie webhook
+            action: OpsGenie webhook action
+        """
+        now = time.monotonic()
+        self._remember((alert_data.get('alertId'), action), now)
+        self._remember_investigated(alert_data.get('alertId'), now)
+
+        entity = alert_data.get('entity')
+        if entity and self.coalesce_window > 0:
+            self._entities.pop(entity, None)
+            self._entities[entity] = (now, alert_data)
+            while len(self._entities) > self.max_entries:
+                self._entities.popitem(last=False)
+
+        self._counters["new"] += 1
+
+    def complete(self, alert_data: Dict[str, Any]):
+        """
+        Close the coalescing window of a finished investigation.
+
+        Alerts arriving afterwards start a new investigation instead of being
+        attached to one whose coalesced alerts have already been notified.
+
+        Args:
+            alert_data: Alert information of the primary alert
+        """
+        entity = alert_data.get('entity')
+        window = self._entities.get(entity) if entity else None
+        if window is not None and window[1].get('alertId') == alert_data.get('alertId'):
+            del self._entities[entity]
+
+    def _remember(self, key: tuple, now: float):
+        """Store a dedup key, evicting the oldest keys past the size cap."""
+        self._seen.pop(key, None)
+        self._seen[key] = now
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def _remember_investigated(self, alert_id: str, now: float):
+        """Store an alertId covered by an investigation, evicting the oldest past the size cap."""
+        self._investigated.pop(alert_id, None)
+        self._investigated[alert_id] = now
+        while len(self._investigated) > self.max_entries:
+            self._investigated.popitem(last=False)
+
+    def _expire(self, now: float):
+        """Drop dedup keys and coalescing windows that have aged out."""
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.dedup_ttl:
+                break
+            self._seen.popitem(last=False)
+
+        while self._investigated:
+            alert_id, investigated_at = next(iter(self._investigated.items()))
+            if now - investigated_at < self.dedup_ttl:
+                break
+            self._investigated.popitem(last=False)
+
+        while self._entities:
+            entity, (opened_at, _) = next(iter(self._entities.items()))
+            if now - opened_at < self.coalesce_window:
+                break
+            self._entities.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of deduplication activity.
+
+        Returns:
+            Dict: Counters and current table sizes
+        """
+        return {
+            "tracked_keys": len(self._seen),
+            "investigated_alerts": len(self._investigated),
+            "open_windows": len(self._entities),
+            **self._counters
+        }
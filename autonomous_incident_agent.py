@@ -7,16 +7,93 @@ Claude has full autonomy to decide which tools to use and how to investigate.
 """
 
 import asyncio
-import json
 import logging
 import os
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
-from anthropic import Anthropic
+from llm_client import LLMClient, create_llm_client
 from mcp_client import MCPClient
+from tool_cache import ToolResultCache
+from tool_catalog import ToolCatalog
+from investigation import Investigation, InvestigationBudget, TokenUsage
+from context_compaction import ContextCompactor, estimate_tokens
+from result_shaping import ResultShaper
+from health_monitor import HealthMonitor
+from resilience import RATE_LIMITED, CallTimeoutError, CircuitOpenError, RetryPolicy
+from rate_limiter import ModelRateLimiter
+from incident_queue import PRIORITY_RANKS, priority_rank
+from job_store import JobStore
+from metrics import metrics
+from tracing import get_tracer
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer("incident-agent")
+
+# Static investigation instructions, identical for every alert. Sent as the
+# system prompt so that, together with the tool definitions that precede it,
+# it forms a cacheable prefix.
+SYSTEM_PROMPT = """
+You are an expert DevOps engineer analyzing a critical infrastructure incident. You have been given full access to monitoring tools and must conduct a thorough investigation.
+
+**YOUR MISSION:**
+Conduct a comprehensive investigation to determine the root cause and provide actionable recommendations. You have complete autonomy to:
+
+1. **Explore Grafana** - Search dashboards, query metrics, analyze logs, investigate datasources
+2. **Examine patterns** - Look for correlations, anomalies, and trends
+3. **Cross-reference data** - Combine multiple data sources for deeper insights
+4. **Research context** - Understand the infrastructure setup and dependencies
+
+**INVESTIGATION STRATEGY:**
+- Start by exploring relevant dashboards and datasources
+- Query specific metrics related to the alert (CPU, memory, network, disk, etc.)
+- Examine logs for error patterns and anomalies
+- Look for correlations with other systems or recent changes
+- Consider both immediate and underlying causes
+
+**EXPECTED DELIVERABLE:**
+Provide a comprehensive analysis report with:
+
+## 🔍 **ROOT CAUSE ANALYSIS**
+- Primary cause of the incident
+- Contributing factors
+- Timeline of events
+
+## 📊 **IMPACT ASSESSMENT**
+- Affected systems and services
+- Severity and scope of impact
+- Business impact estimation
+
+## 🛠️ **IMMEDIATE ACTIONS**
+- Step-by-step resolution procedures
+- Priority order of actions
+- Required resources or permissions
+
+## 📋 **RECOMMENDATIONS**
+- Long-term prevention measures
+- Monitoring improvements
+- Infrastructure optimizations
+
+## 🚨 **ESCALATION CRITERIA**
+- When to escalate
+- Who to involve
+- Additional resources needed
+"""
+
+# Cache marker for provider-side prompt caching
+EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+# Characters of each tool result quoted in the early triage note
+TRIAGE_EXCERPT_CHARS = 300
+
+# Appended to the last user turn when the investigation budget runs out
+SUMMARIZE_NOW_PROMPT = (
+    "The investigation budget is exhausted. Do not call any more tools. "
+    "Write the final analysis now from the data gathered so far, using the "
+    "deliverable format and stating clearly what could not be verified."
+)
 
 class AutonomousIncidentAgent:
     """
@@ -26,34 +103,96 @@ class AutonomousIncidentAgent:
     Claude to autonomously decide how to investigate incidents and what data to collect.
     """
     
-    def __init__(self):
+    def __init__(self, llm_client: Optional[LLMClient] = None, job_store: Optional[JobStore] = None):
         """
-        Initialize the agent with MCP client and Anthropic API.
+        Initialize the agent with MCP client and async LLM client.
         
         Environment variables required:
-        - ANTHROPIC_API_KEY: API key for Claude
+        - ANTHROPIC_API_KEY: API key for Claude (unless LLM_BACKEND=stub)
         - GRAFANA_MCP_URL: URL for Grafana MCP server 
         - OPSGENIE_API_KEY: API key for OpsGenie
+        
+        Args:
+            llm_client: Optional pre-built LLM client; built from environment if omitted
+            job_store: Optional durable store for job state and conversation checkpoints
         """
-        self.anthropic = Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
-        self.mcp_client = MCPClient()
+        self.llm = llm_client or create_llm_client()
+        self.job_store = job_store
+        
+        # One retry policy for model and MCP calls, so they share a retry budget
+        self.retry_policy = RetryPolicy.from_env()
+        
+        # Requests/min and tokens/min budget shared by all investigations
+        self.rate_limiter = ModelRateLimiter.from_env()
+        
+        # Stream model responses so tool calls start before the response is complete
+        self.streaming = os.environ.get('MODEL_STREAMING', 'true').lower() == 'true'
+        
+        # Post a triage note after the first round of tool results, before the full analysis
+        self.progressive_reporting = os.environ.get('PROGRESSIVE_REPORTING', 'true').lower() == 'true'
+        self._first_note_latencies = deque(maxlen=1000)
+        
+        # Read-only tool results are cached and shared across investigations
+        tool_cache = ToolResultCache.from_env() if os.environ.get('TOOL_CACHE_ENABLED', 'true').lower() == 'true' else None
+        self.mcp_client = MCPClient(tool_cache=tool_cache, retry_policy=self.retry_policy)
+        
+        # Default upper bound on concurrent tool calls per MCP server
+        default_concurrency = int(os.environ.get('MCP_MAX_CONCURRENCY_PER_SERVER', 8))
         
         # MCP server configurations
         self.mcp_servers = {
             "grafana": {
                 "url": os.environ.get('GRAFANA_MCP_URL', 'http://grafana-mcp-server:8080'),
                 "name": "Grafana MCP Server",
-                "description": "Provides access to Grafana metrics, logs, and dashboards"
+                "description": "Provides access to Grafana metrics, logs, and dashboards",
+                "max_concurrency": int(os.environ.get('GRAFANA_MCP_MAX_CONCURRENCY', default_concurrency)),
+                "transport": os.environ.get('GRAFANA_MCP_TRANSPORT')
             },
             "opsgenie": {
                 "url": os.environ.get('OPSGENIE_MCP_URL', 'http://opsgenie-mcp-server:8080'),
                 "name": "OpsGenie MCP Server", 
-                "description": "Provides access to OpsGenie alerts and ticket management"
+                "description": "Provides access to OpsGenie alerts and ticket management",
+                "max_concurrency": int(os.environ.get('OPSGENIE_MCP_MAX_CONCURRENCY', default_concurrency)),
+                "transport": os.environ.get('OPSGENIE_MCP_TRANSPORT')
             }
         }
         
+        # Concurrency limits are shared by all investigations running in this process
+        self._server_semaphores = {
+            server_name: asyncio.Semaphore(config["max_concurrency"])
+            for server_name, config in self.mcp_servers.items()
+        }
+        # Serializes taking several slots at once for a batch (see _execute_tool_batch)
+        self._batch_locks = {server_name: asyncio.Lock() for server_name in self.mcp_servers}
+        
+        # Provider-side prompt caching of the static prefix (tools + system prompt)
+        self.prompt_caching = os.environ.get('PROMPT_CACHING', 'true').lower() == 'true'
+        system_block = {"type": "text", "text": SYSTEM_PROMPT}
+        if self.prompt_caching:
+            system_block["cache_control"] = EPHEMERAL_CACHE
+        self.system_prompt = [system_block]
+        
+        # Bounds the size of each tool result before it enters the conversation
+        self.result_shaper = ResultShaper.from_env()
+        
+        # Keeps long conversations within a per-priority token budget
+        self.context_compactor = ContextCompactor.from_env()
+        
+        # Probes MCP servers in the background so health checks are served from memory
+        self.health_monitor = HealthMonitor(
+            self.mcp_client,
+            self.mcp_servers,
+            interval=float(os.environ.get('HEALTH_CHECK_INTERVAL', 30)),
+            ttl=float(os.environ.get('HEALTH_CHECK_TTL', 90)),
+            probe_timeout=float(os.environ.get('HEALTH_CHECK_TIMEOUT', 10))
+        )
+        
+        # Token usage accumulated over all investigations
+        self.token_usage = TokenUsage()
+        
         self.initialized = False
         self.available_tools = []
+        self.tool_catalog = ToolCatalog([])
 
     async def initialize(self):
         """
@@ -66,11 +205,14 @@ class AutonomousIncidentAgent:
             # Connect to all MCP servers
             for server_name, config in self.mcp_servers.items():
                 logger.info(f"Connecting to {config['name']} at {config['url']}")
-                await self.mcp_client.connect_server(server_name, config['url'])
+                await self.mcp_client.connect_server(server_name, config['url'], transport=config.get('transport'))
             
             # Discover all available tools from connected servers
             await self._discover_tools()
             
+            # Start background health probing
+            await self.health_monitor.start()
+            
             self.initialized = True
             logger.info(f"Agent initialized successfully with {len(self.available_tools)} tools available")
             
@@ -81,9 +223,10 @@ class AutonomousIncidentAgent:
     async def _discover_tools(self):
         """
         Discover and catalog all available tools from connected MCP servers.
-        This creates the tool definitions that will be provided to Claude.
+        This creates the tool definitions that will be provided to Claude and
+        replaces the shared tool catalog with a new version.
         """
-        self.available_tools = []
+        discovered_tools = []
         
         for server_name in self.mcp_servers.keys():
             try:
@@ -94,7 +237,7 @@ class AutonomousIncidentAgent:
                 for tool in server_tools:
                     tool['server'] = server_name
                     tool['server_name'] = self.mcp_servers[server_name]['name']
-                    self.available_tools.append(tool)
+                    discovered_tools.append(tool)
                 
                 logger.info(f"Discovered {len(server_tools)} tools from {server_name}")
                 
@@ -102,6 +245,11 @@ class AutonomousIncidentAgent:
                 logger.error(f"Failed to discover tools from {server_name}: {str(e)}")
                 # Continue with other servers even if one fails
                 continue
+        
+        # Swap in the new catalog; investigations already running keep their reference
+        self.available_tools = discovered_tools
+        self.tool_catalog = ToolCatalog(discovered_tools, version=self.tool_catalog.version + 1)
+        logger.info(f"Tool catalog v{self.tool_catalog.version} built with {len(self.tool_catalog)} tools")
 
     async def analyze_incident(self, alert_data: Dict[str, Any]) -> str:
         """
@@ -110,6 +258,10 @@ class AutonomousIncidentAgent:
         Claude receives the alert information and access to all available tools,
         then decides independently how to investigate and analyze the incident.
         
+        With a job store, the conversation is checkpointed after every round of
+        tool results; an investigation interrupted by a restart resumes from its
+        last checkpoint instead of starting over.
+        
         Args:
             alert_data: Alert information from OpsGenie webhook
             
@@ -122,35 +274,127 @@ class AutonomousIncidentAgent:
         alert_id = alert_data.get('alertId', 'unknown')
         logger.info(f"Starting autonomous analysis for alert: {alert_id}")
         
+        with tracer.span("investigation", alert_id=alert_id, priority=alert_data.get('priority')) as span:
+            try:
+                investigation = Investigation(alert_data, budget=InvestigationBudget.from_env())
+                await self._restore_checkpoint(investigation)
+                
+                if not investigation.messages:
+                    # Start conversation with Claude, providing all available tools and the budget
+                    investigation_prompt = self._create_investigation_prompt(alert_data)
+                    investigation.messages.append({
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": investigation_prompt},
+                            {"type": "text", "text": investigation.budget.describe(0, investigation.usage)}
+                        ]
+                    })
+                    await self._checkpoint(investigation)
+                
+                # Let Claude investigate autonomously using available tools
+                outcome = "failed"
+                try:
+                    analysis_result = await self._conduct_autonomous_investigation(investigation)
+                    outcome = "completed"
+                finally:
+                    self.token_usage.merge(investigation.usage)
+                    priority = investigation.priority if investigation.priority in PRIORITY_RANKS else "unknown"
+                    metrics.investigation_seconds(priority, outcome).observe(investigation.elapsed)
+                    span.set_attribute("outcome", outcome)
+                    span.set_attribute("resumed", investigation.resumed)
+                    span.set_attribute("iterations", investigation.iterations)
+                    span.set_attribute("summarize_reason", investigation.summarize_reason)
+                    span.set_attribute("input_tokens", investigation.usage.input_tokens)
+                    span.set_attribute("output_tokens", investigation.usage.output_tokens)
+                    logger.info(f"Investigation metrics: {investigation.summary()}")
+                
+                # Post the full analysis after the triage note, if one is on its way
+                if investigation.triage_task is not None:
+                    await investigation.triage_task
+                await self.update_opsgenie_ticket(alert_id, analysis_result)
+                self._note_posted(investigation)
+                
+                if self.job_store:
+                    await self.job_store.complete_job(alert_id, analysis_result)
+                
+                logger.info(f"Analysis completed for alert: {alert_id}")
+                return analysis_result
+                
+            except Exception as e:
+                logger.error(f"Error analyzing incident {alert_id}: {str(e)}")
+                metrics.errors["investigation"].inc()
+                if self.job_store:
+                    try:
+                        await self.job_store.fail_job(alert_id, str(e))
+                    except Exception as store_error:
+                        logger.error(f"Failed to record failure of job {alert_id}: {str(store_error)}")
+                raise e
+
+    async def _restore_checkpoint(self, investigation: Investigation):
+        """
+        Mark the investigation's job as running and load its checkpointed conversation.
+        
+        Checkpoints always end with a user turn, so a restored conversation can
+        be sent to Claude as is. The time and tool calls used before the
+        checkpoint are charged to the new budget, so repeated resumes do not
+        extend the investigation's limits.
+        
+        Args:
+            investigation: Freshly created investigation
+        """
+        if not self.job_store:
+            return
+        
+        await self.job_store.mark_running(investigation.alert_id)
+        messages = await self.job_store.load_messages(investigation.alert_id)
+        if not messages:
+            return
+        
+        investigation.messages.extend(messages)
+        investigation.checkpointed = len(messages)
+        investigation.iterations = sum(1 for message in messages if message["role"] == "assistant")
+        investigation.resumed = True
+        
+        job = await self.job_store.get_job(investigation.alert_id)
+        tool_calls = sum(
+            1 for message in messages if message["role"] == "user" and isinstance(message["content"], list)
+            for block in message["content"] if isinstance(block, dict) and block.get("type") == "tool_result"
+        )
+        investigation.budget.carry_over(job.elapsed_seconds if job is not None else 0.0, tool_calls)
+        logger.info(
+            f"Resuming investigation {investigation.alert_id} from checkpoint after {investigation.iterations} iterations, "
+            f"{investigation.budget.elapsed_seconds:.0f}s and {tool_calls} tool calls"
+        )
+
+    async def _checkpoint(self, investigation: Investigation):
+        """
+        Append the messages added since the last checkpoint to the job store.
+        
+        A failed checkpoint is logged and does not interrupt the investigation;
+        the next checkpoint writes the missed messages as well.
+        
+        Args:
+            investigation: Investigation whose conversation ends with a user turn
+        """
+        if not self.job_store:
+            return
+        
+        new_messages = investigation.messages[investigation.checkpointed:]
         try:
-            # Create the investigation prompt for Claude
-            investigation_prompt = self._create_investigation_prompt(alert_data)
-            
-            # Start conversation with Claude, providing all available tools
-            messages = [
-                {
-                    "role": "user",
-                    "content": investigation_prompt
-                }
-            ]
-            
-            # Let Claude investigate autonomously using available tools
-            analysis_result = await self._conduct_autonomous_investigation(messages)
-            
-            # Update OpsGenie ticket with the analysis
-            await self.update_opsgenie_ticket(alert_id, analysis_result)
-            
-            logger.info(f"Analysis completed for alert: {alert_id}")
-            return analysis_result
-            
+            await self.job_store.append_messages(
+                investigation.alert_id, investigation.checkpointed, new_messages, investigation.budget.elapsed_seconds
+            )
+            investigation.checkpointed += len(new_messages)
         except Exception as e:
-            logger.error(f"Error analyzing incident {alert_id}: {str(e)}")
-            raise e
+            logger.warning(f"Failed to checkpoint investigation {investigation.alert_id}: {str(e)}")
 
     def _create_investigation_prompt(self, alert_data: Dict[str, Any]) -> str:
         """
-        Create the initial investigation prompt that gives Claude full context
-        and autonomy to investigate the incident.
+        Create the initial investigation prompt with the incident-specific context.
+        
+        The static instructions and deliverable template live in SYSTEM_PROMPT
+        so they can be served from the prompt cache; this prompt only carries
+        what changes from one alert to the next.
         
         Args:
             alert_data: Alert information from OpsGenie
@@ -158,9 +402,18 @@ class AutonomousIncidentAgent:
         Returns:
             str: Formatted prompt for Claude
         """
+        related_alerts = ""
+        if alert_data.get('coalescedAlerts'):
+            related_lines = "\n".join(
+                f"- {related.get('alertId', 'N/A')} [{related.get('priority', 'N/A')}]: {related.get('message', 'N/A')}"
+                for related in alert_data['coalescedAlerts']
+            )
+            related_alerts = f"""
+**RELATED ALERTS ON THE SAME ENTITY:**
+{related_lines}
+"""
+        
         prompt = f"""
-You are an expert DevOps engineer analyzing a critical infrastructure incident. You have been given full access to monitoring tools and must conduct a thorough investigation.
-
 **INCIDENT DETAILS:**
 - Alert ID: {alert_data.get('alertId', 'N/A')}
 - Affected Entity: {alert_data.get('entity', 'N/A')}
@@ -170,82 +423,78 @@ You are an expert DevOps engineer analyzing a critical infrastructure incident.
 - Source: {alert_data.get('source', 'N/A')}
 - Tags: {', '.join(alert_data.get('tags', []))}
 - Created At: {alert_data.get('createdAt', 'N/A')}
-
-**YOUR MISSION:**
-Conduct a comprehensive investigation to determine the root cause and provide actionable recommendations. You have complete autonomy to:
-
-1. **Explore Grafana** - Search dashboards, query metrics, analyze logs, investigate datasources
-2. **Examine patterns** - Look for correlations, anomalies, and trends
-3. **Cross-reference data** - Combine multiple data sources for deeper insights
-4. **Research context** - Understand the infrastructure setup and dependencies
-
-**INVESTIGATION STRATEGY:**
-- Start by exploring relevant dashboards and datasources
-- Query specific metrics related to the alert (CPU, memory, network, disk, etc.)
-- Examine logs for error patterns and anomalies
-- Look for correlations with other systems or recent changes
-- Consider both immediate and underlying causes
-
-**EXPECTED DELIVERABLE:**
-Provide a comprehensive analysis report with:
-
-## 🔍 **ROOT CAUSE ANALYSIS**
-- Primary cause of the incident
-- Contributing factors
-- Timeline of events
-
-## 📊 **IMPACT ASSESSMENT**
-- Affected systems and services
-- Severity and scope of impact
-- Business impact estimation
-
-## 🛠️ **IMMEDIATE ACTIONS**
-- Step-by-step resolution procedures
-- Priority order of actions
-- Required resources or permissions
-
-## 📋 **RECOMMENDATIONS**
-- Long-term prevention measures
-- Monitoring improvements
-- Infrastructure optimizations
-
-## 🚨 **ESCALATION CRITERIA**
-- When to escalate
-- Who to involve
-- Additional resources needed
-
+{related_alerts}
 Begin your investigation now. Use all available tools as needed and be thorough in your analysis.
 """
         return prompt
 
-    async def _conduct_autonomous_investigation(self, messages: List[Dict]) -> str:
+    async def _conduct_autonomous_investigation(self, investigation: Investigation) -> str:
         """
         Conduct the investigation by allowing Claude to use tools autonomously.
         This handles the conversation loop where Claude can call multiple tools
         and continue investigating based on what it discovers.
         
+        The loop runs within the investigation's budget. After each round of
+        tool results Claude is told what remains of it; once time, tool calls,
+        turns or tokens run low, the next turn asks for the final analysis with
+        tools disabled. If the deadline passes mid-call, whatever text was
+        streamed so far is returned.
+        
         Args:
-            messages: Conversation history with Claude
+            investigation: Investigation state holding the conversation with Claude
             
         Returns:
             str: Final analysis result
         """
-        max_iterations = 20  # Prevent infinite loops
-        iteration = 0
+        budget = investigation.budget
+        iteration = investigation.iterations
+        messages = investigation.messages
         
-        while iteration < max_iterations:
-            iteration += 1
-            logger.debug(f"Investigation iteration {iteration}")
-            
-            try:
-                # Send message to Claude with available tools
-                response = await self.anthropic.messages.create(
-                    model="claude-3-sonnet-20240229",
-                    max_tokens=4000,
-                    messages=messages,
-                    tools=self._format_tools_for_claude(),
-                    tool_choice="auto"
+        early_tools: Dict[str, asyncio.Task] = {}
+        try:
+            while True:
+                iteration += 1
+                investigation.iterations = iteration
+                logger.debug(f"Investigation iteration {iteration}")
+                
+                # Keep the conversation within budget, then send it to Claude with available tools
+                investigation.compacted_chars += self.context_compactor.compact(messages, investigation.priority)
+                
+                summarize_reason = budget.summarize_reason(
+                    iteration, investigation.usage, self.rate_limiter.estimate(estimate_tokens(messages))
                 )
+                if summarize_reason:
+                    investigation.summarize_reason = summarize_reason
+                    metrics.budget_exhausted(summarize_reason).inc()
+                    logger.info(f"Investigation {investigation.alert_id} budget exhausted ({summarize_reason}); requesting final analysis")
+                    messages[-1]["content"].append({"type": "text", "text": SUMMARIZE_NOW_PROMPT})
+                
+                self._move_cache_breakpoint(investigation)
+                
+                # Transient API failures are retried by the shared retry policy;
+                # anything that still fails ends the investigation. Tool calls
+                # dispatched while the response streams in are collected by id.
+                early_tools = {}
+                try:
+                    response = await asyncio.wait_for(
+                        self.retry_policy.run(
+                            "model call",
+                            lambda: self._call_model(investigation, early_tools, final=bool(summarize_reason)),
+                            classify=self.llm.classify_error
+                        ),
+                        timeout=max(0.0, budget.remaining_seconds)
+                    )
+                except asyncio.TimeoutError:
+                    investigation.summarize_reason = "deadline"
+                    metrics.budget_exhausted("deadline").inc()
+                    logger.warning(f"Investigation {investigation.alert_id} hit its {budget.deadline_seconds}s deadline during a model call")
+                    return self._partial_result(investigation)
+                except Exception as e:
+                    logger.error(f"Model call failed in investigation iteration {iteration}: {str(e)}")
+                    metrics.errors["model"].inc()
+                    raise e
+                investigation.usage.add(getattr(response, "usage", None))
+                metrics.observe_usage(getattr(response, "usage", None))
                 
                 # Add Claude's response to conversation
                 messages.append({
@@ -254,110 +503,519 @@ Begin your investigation now. Use all available tools as needed and be thorough
                 })
                 
                 # Check if Claude wants to use tools
-                if response.stop_reason == "tool_use":
-                    # Execute the tool calls Claude requested
-                    tool_results = await self._execute_tool_calls(response.content)
+                if response.stop_reason == "tool_use" and not summarize_reason:
+                    # Execute the tool calls Claude requested, leaving time for the final turn
+                    tool_results = await self._execute_tool_calls_within_budget(investigation, response.content, early_tools)
+                    
+                    # Triage note from the alert and the first round of results, posted in the background
+                    if iteration == 1 and self.progressive_reporting:
+                        investigation.triage_task = asyncio.create_task(
+                            self._post_triage_note(investigation, response.content, list(tool_results)),
+                            name=f"triage-note-{investigation.alert_id}"
+                        )
                     
-                    # Add tool results to conversation
+                    # Add tool results and the remaining budget to conversation
+                    tool_results.append({"type": "text", "text": budget.describe(iteration, investigation.usage)})
                     messages.append({
                         "role": "user",
                         "content": tool_results
                     })
+                    await self._checkpoint(investigation)
                     
                     # Continue the conversation loop
                     continue
                 else:
+                    # Calls started while a turn streamed that then ended without tool_use
+                    # (e.g. cut off at max_tokens) must not outlive the investigation
+                    if early_tools:
+                        await asyncio.gather(*self._cancel_early_tools(investigation, early_tools), return_exceptions=True)
+                    
                     # Claude provided final analysis without using more tools
-                    final_response = response.content[0].text if response.content else "Analysis completed"
+                    final_response = "".join(block.text for block in response.content if block.type == "text")
                     logger.info(f"Investigation completed in {iteration} iterations")
-                    return final_response
-                    
-            except Exception as e:
-                logger.error(f"Error in investigation iteration {iteration}: {str(e)}")
-                # Try to continue with next iteration unless it's a critical error
-                if iteration >= 3:  # Fail after a few retries
-                    raise e
-                continue
+                    return final_response or self._partial_result(investigation)
+        except BaseException:
+            # A failure or cancellation (e.g. a lost lease) must not leave early tool calls running
+            self._cancel_early_tools(investigation, early_tools)
+            raise
+
+    def _partial_result(self, investigation: Investigation) -> str:
+        """Best available analysis when the investigation ends without a final answer."""
+        note = f"⚠️ Investigation stopped after {investigation.elapsed:.0f}s ({investigation.summarize_reason or 'no final answer'})."
+        if investigation.partial_analysis:
+            return f"{note} Partial analysis:\n\n{investigation.partial_analysis}"
+        return f"{note} No analysis was produced in time."
+
+    async def _execute_tool_calls_within_budget(
+        self,
+        investigation: Investigation,
+        content: List[Any],
+        early_tools: Dict[str, asyncio.Task]
+    ) -> List[Dict]:
+        """
+        Execute a turn's tool calls, bounded by the investigation's remaining time.
         
-        logger.warning(f"Investigation reached maximum iterations ({max_iterations})")
-        return "Analysis completed (reached iteration limit)"
+        Tool calls are cut off early enough to leave the summarize margin for
+        the final turn; if that happens, every call of the turn is reported to
+        Claude as cancelled.
+        
+        Args:
+            investigation: Investigation the calls belong to
+            content: Claude's response content containing tool use blocks
+            early_tools: Tasks of tool calls started early, keyed by tool_use id
+            
+        Returns:
+            List[Dict]: tool_result blocks to send back to Claude
+        """
+        budget = investigation.budget
+        task = asyncio.create_task(self._execute_tool_calls(content, early_tools, budget))
+        done, _ = await asyncio.wait({task}, timeout=max(0.0, budget.remaining_seconds - budget.summarize_margin))
+        if task in done:
+            return task.result()
+        
+        task.cancel()
+        for early_task in early_tools.values():
+            early_task.cancel()
+        await asyncio.gather(task, *early_tools.values(), return_exceptions=True)
+        logger.warning(f"Investigation {investigation.alert_id} ran out of time during tool calls")
+        
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": "Tool call cancelled: the investigation time budget is exhausted.",
+                "is_error": True
+            }
+            for block in content if block.type == "tool_use"
+        ]
+
+    async def _call_model(
+        self,
+        investigation: Investigation,
+        early_tools: Dict[str, asyncio.Task],
+        final: bool = False
+    ) -> Any:
+        """
+        Send the conversation to Claude within the shared rate limit.
+        
+        Waits for the rate limiter (queued by alert priority), makes one model
+        call, and reports the actual token usage back to the limiter. When
+        streaming, generated text is buffered on the investigation and each
+        idempotent tool call is started as soon as its block is complete.
+        Tool calls that may have side effects wait for the full response, so
+        a failed and retried response can never run them twice.
+        
+        Args:
+            investigation: Investigation whose conversation is sent
+            early_tools: Filled with tasks of tool calls started early, keyed by tool_use id
+            final: Whether this is the final turn, in which tools are disabled
+            
+        Returns:
+            Any: Model response
+        """
+        reserved = self.rate_limiter.estimate(estimate_tokens(investigation.messages))
+        await self.rate_limiter.acquire(reserved, priority_rank(investigation.alert_data))
+        
+        investigation.partial_text = []
+        request = {
+            "messages": investigation.messages,
+            "system": self.system_prompt
+        }
+        # The API rejects tool_choice without tools, e.g. when no MCP server is connected
+        tools = self._format_tools_for_claude()
+        if tools:
+            request["tools"] = tools
+            request["tool_choice"] = {"type": "none" if final else "auto"}
+        
+        def dispatch(block: Any):
+            if final:
+                return
+            task = self._dispatch_tool_call(block, investigation.budget)
+            if task is not None:
+                early_tools[block.id] = task
+                investigation.early_dispatched_tools += 1
+        
+        with tracer.span("model.call", final=final, streaming=self.streaming) as span:
+            started = time.monotonic()
+            try:
+                if self.streaming:
+                    response = await self.llm.stream_message(
+                        on_tool_use=dispatch,
+                        on_text=investigation.partial_text.append,
+                        **request
+                    )
+                else:
+                    response = await self.llm.create_message(**request)
+            except BaseException as e:
+                # Results of this attempt's tool calls would be orphaned; calls not yet made are refunded
+                self._cancel_early_tools(investigation, early_tools)
+                if isinstance(e, Exception) and self.llm.classify_error(e) == RATE_LIMITED:
+                    self.rate_limiter.on_rate_limited()
+                raise e
+            metrics.model_call_seconds.observe(time.monotonic() - started)
+            
+            usage = getattr(response, "usage", None)
+            span.set_attribute("stop_reason", getattr(response, "stop_reason", None))
+            span.set_attribute("input_tokens", getattr(usage, "input_tokens", None))
+            span.set_attribute("output_tokens", getattr(usage, "output_tokens", None))
+        
+        if usage is not None:
+            # Cache reads do not count against input token rate limits
+            self.rate_limiter.settle(
+                reserved,
+                (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "cache_creation_input_tokens", 0) or 0),
+                getattr(usage, "output_tokens", 0) or 0
+            )
+        
+        return response
+
+    def _move_cache_breakpoint(self, investigation: Investigation):
+        """
+        Move the conversation cache breakpoint to the newest user turn.
+        
+        The system prompt breakpoint caches the static prefix shared by all
+        investigations; this second, moving breakpoint lets each turn read the
+        conversation so far from cache instead of resending it as uncached
+        input. Only one conversation breakpoint is kept to stay within the
+        provider's breakpoint limit.
+        
+        Args:
+            investigation: Investigation whose conversation is about to be sent
+        """
+        if not self.prompt_caching or not investigation.messages:
+            return
+        
+        content = investigation.messages[-1].get("content")
+        if not isinstance(content, list) or not content or not isinstance(content[-1], dict):
+            return
+        
+        if investigation.cache_breakpoint is not None:
+            investigation.cache_breakpoint.pop("cache_control", None)
+        
+        content[-1]["cache_control"] = EPHEMERAL_CACHE
+        investigation.cache_breakpoint = content[-1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Runtime statistics of the agent for monitoring.
+        
+        Returns:
+            Dict: Tool catalog version, aggregate token usage, tool cache, retry
+            and model rate limiter activity, and time-to-first-note percentiles
+        """
+        return {
+            "tool_catalog_version": self.tool_catalog.version,
+            "tools": len(self.tool_catalog),
+            "prompt_caching": self.prompt_caching,
+            "token_usage": self.token_usage.as_dict(),
+            "tool_cache": self.mcp_client.tool_cache.stats() if self.mcp_client.tool_cache else None,
+            "retries": self.retry_policy.stats(),
+            "model_rate_limit": self.rate_limiter.stats(),
+            "time_to_first_note_seconds": self._first_note_stats()
+        }
+
+    def _first_note_stats(self) -> Dict[str, Any]:
+        """Percentiles of recent time-to-first-note latencies."""
+        latencies = sorted(self._first_note_latencies)
+        if not latencies:
+            return {"samples": 0}
+        return {
+            "samples": len(latencies),
+            "p50": round(latencies[int(0.50 * (len(latencies) - 1))], 3),
+            "p95": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+            "p99": round(latencies[int(0.99 * (len(latencies) - 1))], 3),
+            "max": round(latencies[-1], 3)
+        }
 
     def _format_tools_for_claude(self) -> List[Dict]:
         """
-        Format the available MCP tools for Claude's tool calling interface.
+        Get the available MCP tools in Claude's tool calling format.
+        
+        The definitions are precomputed by the tool catalog at discovery time,
+        so this is a lookup rather than a rebuild.
         
         Returns:
             List[Dict]: Tool definitions in Claude's expected format
         """
-        claude_tools = []
+        return self.tool_catalog.claude_tools
+
+    def _dispatch_tool_call(self, block: Any, budget: InvestigationBudget) -> Optional[asyncio.Task]:
+        """
+        Start one tool call while the model response is still streaming.
         
-        for tool in self.available_tools:
-            claude_tool = {
-                "name": f"{tool['server']}_{tool['name']}",  # Prefix with server name
-                "description": f"[{tool['server_name']}] {tool['description']}",
-                "input_schema": tool.get('inputSchema', {})
-            }
-            claude_tools.append(claude_tool)
+        Only tools annotated read-only are started early; tools with side
+        effects, even idempotent ones, wait for the complete response so a
+        turn cut short never leaves a half-applied change behind.
+        
+        Args:
+            block: Completed tool_use block
+            budget: Budget of the investigation, charged for the call
+            
+        Returns:
+            Optional[asyncio.Task]: Task producing the tool_result block, or None
+            if the call must wait for the complete response
+        """
+        try:
+            server_name, tool_name = self.tool_catalog.resolve(block.name)
+        except ValueError:
+            return None
+        if server_name not in self._server_semaphores or not self.mcp_client.is_read_only(server_name, tool_name):
+            return None
+        if not budget.take_tool_call():
+            return None
+        
+        async def run() -> Dict:
+            results: List[Optional[Dict]] = [None]
+            await self._execute_server_tool_calls(server_name, [(0, tool_name, block)], results)
+            return results[0]
+        
+        return asyncio.create_task(run(), name=f"tool-{block.id}")
+
+    def _cancel_early_tools(self, investigation: Investigation, early_tools: Dict[str, asyncio.Task]) -> List[asyncio.Task]:
+        """
+        Cancel tool calls started early whose results will not be used.
+        
+        Calls cancelled before they finished are refunded to the budget.
         
-        return claude_tools
+        Args:
+            investigation: Investigation the calls were charged to
+            early_tools: Tasks of tool calls started early, keyed by tool_use id; cleared
+            
+        Returns:
+            List[asyncio.Task]: The cancelled tasks, for callers that can wait for them to unwind
+        """
+        tasks = list(early_tools.values())
+        for task in tasks:
+            if task.cancel():
+                investigation.budget.refund_tool_call()
+        early_tools.clear()
+        return tasks
 
-    async def _execute_tool_calls(self, content: List[Any]) -> str:
+    async def _execute_tool_calls(
+        self,
+        content: List[Any],
+        early_tools: Optional[Dict[str, asyncio.Task]] = None,
+        budget: Optional[InvestigationBudget] = None
+    ) -> List[Dict]:
         """
         Execute the tool calls requested by Claude and format the results.
         
+        Independent tool calls from the same turn are dispatched concurrently,
+        bounded per MCP server. Several calls to the same server are sent as
+        one JSON-RPC batch. Calls already started while the response streamed
+        in are awaited instead of being sent again. Results are returned in the
+        same order as the tool_use blocks so each tool_use_id lines up with its
+        request. Calls beyond the budget's remaining tool calls are not sent.
+        
         Args:
             content: Claude's response content containing tool use blocks
+            early_tools: Tasks of tool calls started early, keyed by tool_use id
+            budget: Budget of the investigation, charged for each call
             
         Returns:
-            str: Formatted tool results to send back to Claude
+            List[Dict]: tool_result blocks to send back to Claude
         """
-        results = []
+        tool_blocks = [block for block in content if block.type == "tool_use"]
+        results: List[Optional[Dict]] = [None] * len(tool_blocks)
+        calls_by_server: Dict[str, List[Tuple[int, str, Any]]] = {}
+        started: List[Tuple[int, asyncio.Task]] = []
         
-        for content_block in content:
-            if content_block.type == "tool_use":
-                tool_name = content_block.name
-                tool_input = content_block.input
-                tool_use_id = content_block.id
-                
-                try:
-                    # Parse server and tool name
-                    server_name, actual_tool_name = tool_name.split('_', 1)
-                    
-                    # Execute the tool via MCP client
-                    result = await self.mcp_client.call_tool(
-                        server_name, 
-                        actual_tool_name, 
-                        tool_input
-                    )
-                    
-                    results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": json.dumps(result, indent=2)
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Error executing tool {tool_name}: {str(e)}")
-                    results.append({
-                        "type": "tool_result", 
-                        "tool_use_id": tool_use_id,
-                        "content": f"Error executing tool: {str(e)}"
-                    })
+        for position, block in enumerate(tool_blocks):
+            if early_tools and block.id in early_tools:
+                started.append((position, early_tools[block.id]))
+                continue
+            try:
+                # Resolve server and tool name from the catalog index
+                server_name, tool_name = self.tool_catalog.resolve(block.name)
+                if server_name not in self._server_semaphores:
+                    raise ValueError(f"Unknown MCP server: {server_name}")
+                if budget is not None and not budget.take_tool_call():
+                    raise ValueError(f"Tool call budget of {budget.max_tool_calls} calls exhausted; call not executed")
+            except ValueError as e:
+                results[position] = self._tool_error_result(block, e)
+                continue
+            calls_by_server.setdefault(server_name, []).append((position, tool_name, block))
         
-        return json.dumps(results, indent=2)
+        await asyncio.gather(*(
+            self._execute_server_tool_calls(server_name, calls, results)
+            for server_name, calls in calls_by_server.items()
+        ))
+        
+        for position, task in started:
+            results[position] = await task
+        
+        return results
+
+    async def _execute_server_tool_calls(
+        self,
+        server_name: str,
+        calls: List[Tuple[int, str, Any]],
+        results: List[Optional[Dict]]
+    ):
+        """
+        Execute one turn's tool calls against a single MCP server.
+        
+        The calls are sent as batches of at most the server's concurrency
+        limit, each holding one concurrency slot per call.
+        
+        Args:
+            server_name: Name of the MCP server
+            calls: (result position, tool name, tool_use block) triples
+            results: Result slots to fill, indexed by position
+        """
+        limit = max(1, self.mcp_servers[server_name]["max_concurrency"])
+        await asyncio.gather(*(
+            self._execute_tool_batch(server_name, calls[start:start + limit], results)
+            for start in range(0, len(calls), limit)
+        ))
+
+    async def _execute_tool_batch(
+        self,
+        server_name: str,
+        calls: List[Tuple[int, str, Any]],
+        results: List[Optional[Dict]]
+    ):
+        """
+        Execute up to the server's concurrency limit of tool calls in one request.
+        
+        Args:
+            server_name: Name of the MCP server
+            calls: (result position, tool name, tool_use block) triples
+            results: Result slots to fill, indexed by position
+        """
+        semaphore = self._server_semaphores[server_name]
+        acquired = 0
+        try:
+            # A batch puts every call on the server at once, so it takes one slot per call.
+            # Slots are taken under a lock so two batches never each hold part of what they need.
+            async with self._batch_locks[server_name]:
+                for _ in calls:
+                    await semaphore.acquire()
+                    acquired += 1
+            
+            started = time.monotonic()
+            if len(calls) == 1:
+                _, tool_name, block = calls[0]
+                outcomes = [await self.mcp_client.call_tool(server_name, tool_name, block.input)]
+                metrics.mcp_tool_seconds(server_name, tool_name).observe(time.monotonic() - started)
+            else:
+                outcomes = await self.mcp_client.call_tools_batch(
+                    server_name,
+                    [(tool_name, block.input) for _, tool_name, block in calls]
+                )
+                metrics.mcp_batch_seconds(server_name).observe(time.monotonic() - started)
+        except Exception as e:
+            outcomes = [e] * len(calls)
+        finally:
+            for _ in range(acquired):
+                semaphore.release()
+        
+        result_bytes = metrics.tool_result_bytes(server_name)
+        for (position, tool_name, block), outcome in zip(calls, outcomes):
+            if isinstance(outcome, Exception):
+                metrics.errors["mcp"].inc()
+                results[position] = self._tool_error_result(block, outcome)
+            else:
+                content = await self.result_shaper.shape_async(outcome)
+                result_bytes.observe(len(content))
+                results[position] = {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": content
+                }
 
-    async def update_opsgenie_ticket(self, alert_id: str, analysis: str):
+    def _tool_error_result(self, block: Any, error: Exception) -> Dict:
+        """
+        Wrap a failed tool call as a tool_result Claude can react to.
+        
+        Args:
+            block: tool_use block that failed
+            error: Exception raised for the call
+            
+        Returns:
+            Dict: tool_result block describing the error
+        """
+        logger.error(f"Error executing tool {block.name}: {str(error)}")
+        
+        content = f"Error executing tool: {str(error)}"
+        if isinstance(error, CircuitOpenError):
+            content += (
+                ". The server is failing and calls to it are being rejected without being sent; "
+                "continue with the other available tools and note the missing data in your analysis."
+            )
+        elif isinstance(error, CallTimeoutError):
+            content += ". Retry with a narrower query (shorter time range, fewer series) or use a different tool."
+        
+        return {
+            "type": "tool_result", 
+            "tool_use_id": block.id,
+            "content": content,
+            "is_error": True
+        }
+
+    async def _post_triage_note(self, investigation: Investigation, content: List[Any], tool_results: List[Dict]):
+        """
+        Post an early triage note while the investigation continues.
+        
+        Built without another model call from the alert, Claude's first
+        response text and excerpts of the first round of tool results.
+        Failures are logged and otherwise ignored; the full analysis follows
+        regardless.
+        
+        Args:
+            investigation: Investigation the note belongs to
+            content: Claude's first response content
+            tool_results: tool_result blocks of the first round
+        """
+        alert = investigation.alert_data
+        tool_names = {block.id: block.name for block in content if block.type == "tool_use"}
+        first_take = "".join(block.text for block in content if block.type == "text").strip()
+        
+        signals = []
+        for result in tool_results:
+            if result.get("type") != "tool_result":
+                continue
+            excerpt = result["content"] if isinstance(result["content"], str) else str(result["content"])
+            if len(excerpt) > TRIAGE_EXCERPT_CHARS:
+                excerpt = excerpt[:TRIAGE_EXCERPT_CHARS] + "..."
+            status = " (error)" if result.get("is_error") else ""
+            signals.append(f"- `{tool_names.get(result['tool_use_id'], 'tool')}`{status}: {excerpt}")
+        
+        note = f"""**Alert:** {alert.get('message', 'N/A')} on {alert.get('entity', 'N/A')} ({investigation.priority})
+"""
+        if first_take:
+            note += f"""
+**Initial assessment:** {first_take}
+"""
+        if signals:
+            note += "\n**First signals:**\n" + "\n".join(signals) + "\n"
+        note += "\n_Investigation in progress; the full analysis will be posted as a follow-up note._"
+        
+        try:
+            await self.update_opsgenie_ticket(investigation.alert_id, note, title="⏱️ **INITIAL TRIAGE**")
+            self._note_posted(investigation)
+        except Exception as e:
+            logger.warning(f"Triage note for {investigation.alert_id} not posted: {str(e)}")
+
+    def _note_posted(self, investigation: Investigation):
+        """Track time-to-first-note when the first note of an investigation is posted."""
+        if investigation.record_note():
+            self._first_note_latencies.append(investigation.time_to_first_note)
+            logger.info(f"First note for {investigation.alert_id} posted {investigation.time_to_first_note:.1f}s after alert receipt")
+
+    async def update_opsgenie_ticket(self, alert_id: str, analysis: str, title: str = "🤖 **AUTONOMOUS AI ANALYSIS**"):
         """
         Update the OpsGenie ticket with the analysis results.
         
         Args:
             alert_id: OpsGenie alert ID
             analysis: Analysis results from Claude
+            title: Heading of the note
         """
         try:
             # Format the analysis note for OpsGenie
             formatted_note = f"""
-🤖 **AUTONOMOUS AI ANALYSIS**
+{title}
 
 {analysis}
 
@@ -386,32 +1044,13 @@ Begin your investigation now. Use all available tools as needed and be thorough
         """
         Check health status of the agent and all MCP server connections.
         
+        Results come from the background health monitor's cache, so this
+        sends no traffic to the MCP servers.
+        
         Returns:
             Dict: Health status information
         """
-        health_status = {
-            "healthy": True,
-            "servers": {}
-        }
-        
-        for server_name, config in self.mcp_servers.items():
-            try:
-                # Try to ping the MCP server
-                tools = await self.mcp_client.list_tools(server_name)
-                health_status["servers"][server_name] = {
-                    "status": "healthy",
-                    "url": config["url"],
-                    "tools_count": len(tools)
-                }
-            except Exception as e:
-                health_status["healthy"] = False
-                health_status["servers"][server_name] = {
-                    "status": "unhealthy",
-                    "url": config["url"],
-                    "error": str(e)
-                }
-        
-        return health_status
+        return self.health_monitor.snapshot()
 
     async def shutdown(self):
         """
@@ -419,10 +1058,17 @@ Begin your investigation now. Use all available tools as needed and be thorough
         """
         logger.info("Shutting down Autonomous Incident Agent...")
         
+        await self.health_monitor.stop()
+        
         try:
             await self.mcp_client.disconnect_all()
             logger.info("All MCP connections closed")
         except Exception as e:
             logger.error(f"Error during shutdown: {str(e)}")
         
+        try:
+            await self.llm.close()
+        except Exception as e:
+            logger.error(f"Error closing LLM client: {str(e)}")
+        
         self.initialized = False
\ No newline at end of file
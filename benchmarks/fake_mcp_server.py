@@ -0,0 +1,302 @@
+"""
+In-process fake MCP servers for offline benchmarking.
+
+Each fake server speaks enough of MCP over HTTP (initialize, tools/list,
+ping, tools/call, JSON-RPC batches and notifications) for the orchestrator
+to connect to it. Tool calls sleep for a latency drawn from a configurable
+distribution and return a Grafana-like payload of a configurable size.
+
+The servers run on their own event loop in a background thread, so their
+work does not show up as event-loop lag of the orchestrator under test.
+"""
+
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Any, Callable, Optional
+
+from aiohttp import web
+
+# Final analysis and triage notes are recognised by the headings the agent writes
+FINAL_NOTE_MARKER = "AUTONOMOUS AI ANALYSIS"
+TRIAGE_NOTE_MARKER = "INITIAL TRIAGE"
+
+# Payloads are generated per size bucket and reused
+PAYLOAD_BUCKET_BYTES = 1024
+
+
+@dataclass
+class Distribution:
+    """
+    Random distribution of latencies (ms) or payload sizes (bytes).
+
+    Specs: "fixed:V", "uniform:LOW,HIGH", "exp:MEAN" or
+    "lognormal:MEDIAN,SIGMA".
+    """
+    kind: str
+    params: tuple
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        """
+        Parse a distribution spec.
+
+        Args:
+            spec: Spec string, e.g. "lognormal:80,0.6"; a bare number means fixed
+
+        Returns:
+            Distribution: Parsed distribution
+
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        kind, _, args = spec.partition(":")
+        if not args:
+            kind, args = "fixed", kind
+        params = tuple(float(value) for value in args.split(","))
+        expected = {"fixed": 1, "uniform": 2, "exp": 1, "lognormal": 2}
+        if expected.get(kind) != len(params):
+            raise ValueError(f"Invalid distribution spec: {spec}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one non-negative value."""
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "exp":
+            value = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0
+        else:
+            value = rng.lognormvariate(math.log(max(self.params[0], 1e-9)), self.params[1])
+        return max(0.0, value)
+
+
+@dataclass
+class FakeTool:
+    """A tool exposed by a fake server."""
+    name: str
+    kind: str  # "metrics", "logs" or "record": shape of the generated payload
+    read_only: bool = True
+    required: tuple = ()
+
+
+GRAFANA_TOOLS = [
+    FakeTool("query_prometheus", "metrics", required=("query",)),
+    FakeTool("query_loki_logs", "logs", required=("query",)),
+    FakeTool("search_dashboards", "record"),
+    FakeTool("list_datasources", "record")
+]
+
+OPSGENIE_TOOLS = [
+    FakeTool("get_alert", "record", required=("alert_id",)),
+    FakeTool("add_note", "record", read_only=False, required=("alert_id", "note")),
+    FakeTool("add_tags", "record", read_only=False, required=("alert_id", "tags"))
+]
+
+
+def _build_payload(kind: str, size: int) -> Any:
+    """Build a payload of roughly `size` bytes of JSON, shaped like a real tool result."""
+    if kind == "metrics":
+        def item(index: int) -> Dict[str, Any]:
+            return {
+                "metric": {"__name__": "http_requests_total", "pod": f"api-{index}", "namespace": "prod"},
+                "values": [[1700000000 + 15 * point, f"{(index * 7 + point) % 100 / 10:.1f}"] for point in range(60)]
+            }
+    elif kind == "logs":
+        def item(index: int) -> Dict[str, Any]:
+            return {
+                "timestamp": str(1700000000000000000 + index),
+                "line": f"level=error msg=\"upstream request failed\" status=503 attempt={index % 5}"
+            }
+    else:
+        def item(index: int) -> Dict[str, Any]:
+            return {"name": f"item-{index}", "value": "x" * 40}
+
+    count = max(1, size // len(json.dumps(item(0))))
+    items = [item(index) for index in range(count)]
+    if kind == "metrics":
+        return {"status": "success", "data": {"resultType": "matrix", "result": items}}
+    if kind == "logs":
+        return {"streams": [{"stream": {"app": "api"}, "values": items}]}
+    return {"id": "bench", "status": "open", "items": items}
+
+
+class FakeMCPServer:
+    """
+    Fake MCP server with configurable tool latency and payload size.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tools: List[FakeTool],
+        latency: Distribution,
+        payload: Distribution,
+        seed: int = 0,
+        on_note: Optional[Callable[[str, str, float], None]] = None
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            name: Server name used in reports
+            tools: Tools to expose
+            latency: Tool call latency distribution in milliseconds
+            payload: Tool result size distribution in bytes
+            seed: Random seed, for reproducible runs
+            on_note: Called with (alert id, "triage" or "final", monotonic time) for every add_note call
+        """
+        self.name = name
+        self.tools = {tool.name: tool for tool in tools}
+        self.latency = latency
+        self.payload = payload
+        self.on_note = on_note
+        self.tool_calls = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._payloads: Dict[tuple, str] = {}
+
+    def tool_definitions(self) -> List[Dict[str, Any]]:
+        """tools/list result entries."""
+        return [
+            {
+                "name": tool.name,
+                "description": f"Fake {tool.kind} tool {tool.name}",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {field: {"type": "array" if field == "tags" else "string"} for field in tool.required},
+                    "required": list(tool.required)
+                },
+                "annotations": {"readOnlyHint": tool.read_only}
+            }
+            for tool in self.tools.values()
+        ]
+
+    def _payload_text(self, tool: FakeTool) -> str:
+        """Serialized tool result of a size drawn from the payload distribution."""
+        size = int(self.payload.sample(self._rng)) if tool.read_only else 64
+        bucket = (tool.kind, max(1, round(size / PAYLOAD_BUCKET_BYTES)))
+        text = self._payloads.get(bucket)
+        if text is None:
+            text = self._payloads[bucket] = json.dumps(_build_payload(tool.kind, bucket[1] * PAYLOAD_BUCKET_BYTES))
+        return text
+
+    async def _call_tool(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one tools/call request."""
+        params = message.get("params", {})
+        tool = self.tools.get(params.get("name"))
+        if tool is None:
+            return {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32602, "message": "Unknown tool"}}
+
+        self.tool_calls += 1
+        await asyncio.sleep(self.latency.sample(self._rng) / 1000)
+
+        if tool.name == "add_note" and self.on_note:
+            arguments = params.get("arguments", {})
+            note = str(arguments.get("note", ""))
+            if FINAL_NOTE_MARKER in note:
+                self.on_note(str(arguments.get("alert_id")), "final", time.monotonic())
+            elif TRIAGE_NOTE_MARKER in note:
+                self.on_note(str(arguments.get("alert_id")), "triage", time.monotonic())
+
+        text = self._payload_text(tool)
+        self.bytes_sent += len(text)
+        return {"jsonrpc": "2.0", "id": message["id"], "result": {"content": [{"type": "text", "text": text}]}}
+
+    async def _answer(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Answer one JSON-RPC message; notifications get None."""
+        if "id" not in message:
+            return None
+
+        method = message.get("method")
+        if method == "tools/call":
+            return await self._call_tool(message)
+        if method == "initialize":
+            result = {
+                "protocolVersion": message.get("params", {}).get("protocolVersion", "2025-03-26"),
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": self.name, "version": "bench"}
+            }
+        elif method == "tools/list":
+            result = {"tools": self.tool_definitions()}
+        elif method == "ping":
+            result = {}
+        else:
+            return {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": message["id"], "result": result}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """POST /mcp handler for single messages and batches."""
+        body = await request.json()
+        if isinstance(body, list):
+            responses = [response for response in await asyncio.gather(*(self._answer(m) for m in body)) if response]
+            return web.json_response(responses) if responses else web.Response(status=202)
+
+        response = await self._answer(body)
+        return web.json_response(response) if response else web.Response(status=202)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tool call and traffic counters."""
+        return {"tool_calls": self.tool_calls, "bytes_sent": self.bytes_sent}
+
+
+class FakeServerThread:
+    """
+    Runs fake MCP servers on a dedicated event loop in a daemon thread.
+    """
+
+    def __init__(self, servers: Dict[int, FakeMCPServer], host: str = "127.0.0.1"):
+        """
+        Initialize the runner.
+
+        Args:
+            servers: Fake servers keyed by the port to serve them on
+            host: Interface to bind
+        """
+        self.servers = servers
+        self.host = host
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._runners: List[web.AppRunner] = []
+        self._thread = threading.Thread(target=self._run, name="fake-mcp-servers", daemon=True)
+
+    def url(self, port: int) -> str:
+        """Base URL of the server on a port (the client appends /mcp)."""
+        return f"http://{self.host}:{port}"
+
+    def start(self):
+        """Start serving; returns once every server listens."""
+        self._thread.start()
+        if not self._started.wait(timeout=10):
+            raise RuntimeError("Fake MCP servers did not start")
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _serve(self):
+        for port, server in self.servers.items():
+            app = web.Application(client_max_size=64 * 1024 * 1024)
+            app.router.add_post("/mcp", server.handle)
+            app.router.add_delete("/mcp", lambda request: web.Response())
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, port).start()
+            self._runners.append(runner)
+
+    def stop(self):
+        """Stop the servers and their loop."""
+        async def cleanup():
+            for runner in self._runners:
+                await runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
@@ -0,0 +1,448 @@
+"""
+Offline benchmark of the incident orchestrator.
+
+Runs the real application (main.app under uvicorn, in this process) against
+fake Grafana and OpsGenie MCP servers and the stub model backend, drives
+/webhook/opsgenie at a configurable alert rate, and reports:
+
+- investigation time (webhook sent -> final analysis note received) p50/p95/p99
+- time to the first note and webhook response time
+- event-loop lag of the orchestrator's loop
+- memory (RSS) per in-flight investigation
+- MCP tool calls per second
+
+With --baseline, the run is compared to a saved report and the process
+exits with status 1 if a gated metric regressed by more than --tolerance,
+or if any alert was not fully investigated. Use it as the regression gate
+for performance changes:
+
+    python benchmarks/run_benchmark.py --save-baseline baseline.json
+    ... change ...
+    python benchmarks/run_benchmark.py --baseline baseline.json
+
+Application settings can be overridden with --env KEY=VALUE (e.g.
+--env TOOL_CACHE_ENABLED=false); the model and MCP servers are always the
+offline stand-ins.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+from typing import Dict, List, Any, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_mcp_server import GRAFANA_TOOLS, OPSGENIE_TOOLS, Distribution, FakeMCPServer, FakeServerThread
+
+PRIORITIES = ("P1", "P2", "P3", "P4", "P5")
+
+# Gated metrics: report path -> (direction, minimum absolute change that counts).
+# Direction 1 means higher is worse, -1 means lower is worse.
+GATES = {
+    "investigation_seconds.p50": (1, 0.05),
+    "investigation_seconds.p95": (1, 0.05),
+    "investigation_seconds.p99": (1, 0.05),
+    "loop_lag_ms.p99": (1, 5.0),
+    "memory.rss_per_investigation_kb": (1, 256.0),
+    "throughput_per_second": (-1, 0.05),
+    "mcp.calls_per_second": (-1, 0.5)
+}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max/mean of a sample (nearest rank), rounded for reporting."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50": round(rank(50), 4),
+        "p95": round(rank(95), 4),
+        "p99": round(rank(99), 4),
+        "max": round(ordered[-1], 4),
+        "mean": round(sum(ordered) / len(ordered), 4)
+    }
+
+
+def rss_kb() -> float:
+    """Current resident set size in KB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+class LoopMonitor:
+    """Samples event-loop lag and process memory while the benchmark runs."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.lags_ms: List[float] = []
+        self.peak_rss_kb = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._sample())
+
+    async def _sample(self):
+        samples = 0
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (time.perf_counter() - started - self.interval) * 1000))
+            samples += 1
+            if samples % 10 == 0:
+                self.peak_rss_kb = max(self.peak_rss_kb, rss_kb())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.peak_rss_kb = max(self.peak_rss_kb, rss_kb())
+
+
+def make_alert(run_id: str, index: int, rng: random.Random) -> Dict[str, Any]:
+    """Webhook payload of one synthetic alert; entities are unique so alerts are not coalesced."""
+    service = f"api-{index}"
+    return {
+        "action": "Create",
+        "alert": {
+            "alertId": f"{run_id}-{index}",
+            "message": f"High 5xx error rate on {service}",
+            "entity": service,
+            "priority": rng.choice(PRIORITIES),
+            "source": "benchmark",
+            "tags": ["benchmark", "http"],
+            "description": f"Error rate above 5% for 5 minutes on {service}"
+        }
+    }
+
+
+def configure_environment(args: argparse.Namespace, grafana_url: str, opsgenie_url: str):
+    """Point the application at the offline stand-ins before it is imported."""
+    defaults = {
+        "JOB_STORE": "none",
+        "MODEL_REQUESTS_PER_MINUTE": "1000000",
+        "MODEL_TOKENS_PER_MINUTE": "1000000000",
+        "OPSGENIE_API_KEY": "benchmark"
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+    os.environ.update({
+        "LLM_BACKEND": "stub",
+        "STUB_LLM_LATENCY_MS": str(args.model_latency_ms),
+        "STUB_LLM_TOOL_TURNS": str(args.tool_turns),
+        "STUB_LLM_TOOLS_PER_TURN": str(args.tools_per_turn),
+        "GRAFANA_MCP_URL": grafana_url,
+        "OPSGENIE_MCP_URL": opsgenie_url
+    })
+
+    for assignment in args.env:
+        key, _, value = assignment.partition("=")
+        os.environ[key] = value
+
+
+async def wait_until_ready(session: aiohttp.ClientSession, base_url: str, server_task: asyncio.Task, timeout: float):
+    """Poll /readyz until the application accepts work."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server_task.done():
+            raise RuntimeError("Application failed to start")
+        try:
+            async with session.get(f"{base_url}/readyz") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Application not ready after {timeout}s")
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run one benchmark scenario.
+
+    Args:
+        args: Parsed command line options
+
+    Returns:
+        Dict: Benchmark report
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    run_id = f"bench-{int(time.time())}"
+
+    sent_at: Dict[str, float] = {}
+    first_note_at: Dict[str, float] = {}
+    final_at: Dict[str, float] = {}
+    all_done = asyncio.Event()
+    accepted: set = set()
+    sending_done = False
+
+    def record_note(alert_id: str, kind: str, at: float):
+        if alert_id not in sent_at:
+            return
+        first_note_at.setdefault(alert_id, at)
+        if kind == "final":
+            final_at.setdefault(alert_id, at)
+            if sending_done and accepted <= final_at.keys():
+                all_done.set()
+
+    def on_note(alert_id: str, kind: str, at: float):
+        loop.call_soon_threadsafe(record_note, alert_id, kind, at)
+
+    grafana = FakeMCPServer(
+        "grafana", GRAFANA_TOOLS, Distribution.parse(args.grafana_latency), Distribution.parse(args.grafana_payload),
+        seed=args.seed
+    )
+    opsgenie = FakeMCPServer(
+        "opsgenie", OPSGENIE_TOOLS, Distribution.parse(args.opsgenie_latency), Distribution.parse("fixed:512"),
+        seed=args.seed + 1, on_note=on_note
+    )
+    fake_servers = FakeServerThread({args.grafana_port: grafana, args.opsgenie_port: opsgenie})
+    fake_servers.start()
+
+    configure_environment(args, fake_servers.url(args.grafana_port), fake_servers.url(args.opsgenie_port))
+
+    import uvicorn
+    import main
+
+    logging.getLogger().setLevel(args.log_level)
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server.install_signal_handlers = lambda: None
+    server_task = asyncio.create_task(server.serve())
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    webhook_ms: List[float] = []
+    rejected = 0
+    peak_in_flight = 0
+    monitor = LoopMonitor()
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        await wait_until_ready(session, base_url, server_task, timeout=30)
+        baseline_rss = rss_kb()
+        calls_before = grafana.tool_calls + opsgenie.tool_calls
+        monitor.start()
+
+        async def send(alert: Dict[str, Any]):
+            nonlocal rejected, peak_in_flight
+            alert_id = alert["alert"]["alertId"]
+            sent_at[alert_id] = time.monotonic()
+            try:
+                async with session.post(f"{base_url}/webhook/opsgenie", json=alert) as response:
+                    body = await response.json()
+                    ok = response.status == 200 and body.get("status") == "accepted"
+            except Exception:
+                ok = False
+            webhook_ms.append((time.monotonic() - sent_at[alert_id]) * 1000)
+            if ok:
+                accepted.add(alert_id)
+                # In-flight investigations only grow when one is accepted
+                peak_in_flight = max(peak_in_flight, len(accepted - final_at.keys()))
+            else:
+                rejected += 1
+
+        started = time.monotonic()
+        sends = []
+        offset = 0.0
+        for index in range(args.alerts):
+            delay = started + offset - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sends.append(asyncio.create_task(send(make_alert(run_id, index, rng))))
+            offset += rng.expovariate(args.rate) if args.arrival == "poisson" else 1 / args.rate
+        await asyncio.gather(*sends)
+
+        sending_done = True
+        if accepted <= final_at.keys():
+            all_done.set()
+        try:
+            await asyncio.wait_for(all_done.wait(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finished = max(final_at.values(), default=time.monotonic())
+        peak_in_flight = max(peak_in_flight, 1)
+
+        await monitor.stop()
+        async with session.get(f"{base_url}/stats") as response:
+            app_stats = await response.json()
+
+    server.should_exit = True
+    await server_task
+    fake_servers.stop()
+
+    duration = max(finished - started, 1e-9)
+    completed = [alert_id for alert_id in accepted if alert_id in final_at]
+    mcp_calls = grafana.tool_calls + opsgenie.tool_calls - calls_before
+
+    return {
+        "scenario": {
+            "alerts": args.alerts,
+            "rate": args.rate,
+            "arrival": args.arrival,
+            "model_latency_ms": args.model_latency_ms,
+            "tool_turns": args.tool_turns,
+            "tools_per_turn": args.tools_per_turn,
+            "grafana_latency": args.grafana_latency,
+            "grafana_payload": args.grafana_payload,
+            "opsgenie_latency": args.opsgenie_latency,
+            "seed": args.seed,
+            "env": args.env
+        },
+        "alerts": {
+            "sent": len(sent_at),
+            "accepted": len(accepted),
+            "rejected": rejected,
+            "completed": len(completed),
+            "incomplete": len(accepted) - len(completed)
+        },
+        "duration_seconds": round(duration, 3),
+        "throughput_per_second": round(len(completed) / duration, 4),
+        "investigation_seconds": percentiles([final_at[a] - sent_at[a] for a in completed]),
+        "first_note_seconds": percentiles([first_note_at[a] - sent_at[a] for a in completed if a in first_note_at]),
+        "webhook_ms": percentiles(webhook_ms),
+        "loop_lag_ms": percentiles(monitor.lags_ms),
+        "memory": {
+            "baseline_rss_mb": round(baseline_rss / 1024, 1),
+            "peak_rss_mb": round(monitor.peak_rss_kb / 1024, 1),
+            "peak_in_flight": peak_in_flight,
+            "rss_per_investigation_kb": round(max(0.0, monitor.peak_rss_kb - baseline_rss) / peak_in_flight, 1)
+        },
+        "mcp": {
+            "calls": mcp_calls,
+            "calls_per_second": round(mcp_calls / duration, 3),
+            "servers": {"grafana": grafana.stats(), "opsgenie": opsgenie.stats()}
+        },
+        "queue": app_stats.get("queue")
+    }
+
+
+def lookup(report: Dict[str, Any], path: str) -> Optional[float]:
+    """Value at a dotted path of a report, or None if missing."""
+    value: Any = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare a report to a baseline.
+
+    Args:
+        report: Report of this run
+        baseline: Saved report to compare to
+        tolerance: Allowed relative change in the bad direction
+
+    Returns:
+        List[str]: Descriptions of regressed metrics (empty if none)
+    """
+    regressions = []
+    for path, (direction, min_delta) in GATES.items():
+        current, previous = lookup(report, path), lookup(baseline, path)
+        if current is None or previous is None:
+            continue
+        change = (current - previous) * direction
+        if change > min_delta and change > abs(previous) * tolerance:
+            regressions.append(f"{path}: {previous} -> {current}")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable summary of a report."""
+    def row(label: str, stats: Dict[str, float], unit: str) -> str:
+        if not stats.get("count"):
+            return f"{label:<22} n/a"
+        return (f"{label:<22} p50 {stats['p50']:>9.3f}{unit}  p95 {stats['p95']:>9.3f}{unit}  "
+                f"p99 {stats['p99']:>9.3f}{unit}  max {stats['max']:>9.3f}{unit}")
+
+    alerts = report["alerts"]
+    memory = report["memory"]
+    return "\n".join([
+        f"alerts                 sent {alerts['sent']}  accepted {alerts['accepted']}  "
+        f"completed {alerts['completed']}  rejected {alerts['rejected']}  incomplete {alerts['incomplete']}",
+        f"duration               {report['duration_seconds']:.2f}s  throughput {report['throughput_per_second']:.2f} investigations/s",
+        row("investigation", report["investigation_seconds"], "s"),
+        row("first note", report["first_note_seconds"], "s"),
+        row("webhook", report["webhook_ms"], "ms"),
+        row("loop lag", report["loop_lag_ms"], "ms"),
+        f"memory                 baseline {memory['baseline_rss_mb']} MB  peak {memory['peak_rss_mb']} MB  "
+        f"{memory['rss_per_investigation_kb']} KB per in-flight investigation (peak {memory['peak_in_flight']})",
+        f"mcp                    {report['mcp']['calls']} tool calls  {report['mcp']['calls_per_second']:.1f} calls/s"
+    ])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the incident orchestrator")
+    parser.add_argument("--alerts", type=int, default=50, help="Number of alerts to send")
+    parser.add_argument("--rate", type=float, default=5, help="Alerts per second")
+    parser.add_argument("--arrival", choices=("constant", "poisson"), default="constant", help="Alert arrival process")
+    parser.add_argument("--model-latency-ms", type=float, default=200, help="Stub model latency per call")
+    parser.add_argument("--tool-turns", type=int, default=3, help="Model turns that request tools")
+    parser.add_argument("--tools-per-turn", type=int, default=2, help="Tool calls requested per turn")
+    parser.add_argument("--grafana-latency", default="lognormal:80,0.6", help="Grafana tool latency distribution (ms)")
+    parser.add_argument("--grafana-payload", default="lognormal:8192,1.0", help="Grafana result size distribution (bytes)")
+    parser.add_argument("--opsgenie-latency", default="lognormal:40,0.4", help="OpsGenie tool latency distribution (ms)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for investigations after the last alert")
+    parser.add_argument("--port", type=int, default=18000, help="Port of the application under test")
+    parser.add_argument("--grafana-port", type=int, default=18081, help="Port of the fake Grafana MCP server")
+    parser.add_argument("--opsgenie-port", type=int, default=18082, help="Port of the fake OpsGenie MCP server")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Application environment override")
+    parser.add_argument("--log-level", default="WARNING", help="Application log level")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this file")
+    parser.add_argument("--save-baseline", help="Write the report as the baseline to this file")
+    parser.add_argument("--baseline", help="Compare against this baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression of gated metrics")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    print(format_report(report))
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, "w") as output:
+                json.dump(report, output, indent=2)
+
+    failed = False
+    if report["alerts"]["incomplete"] or report["alerts"]["rejected"]:
+        print(f"FAIL: {report['alerts']['incomplete']} incomplete and {report['alerts']['rejected']} rejected alerts")
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            failed = True
+        else:
+            print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
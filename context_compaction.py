@@ -0,0 +1,218 @@
+"""
+Conversation context compaction for long investigations.
+
+Every investigation turn appends Claude's response and the raw output of
+each tool it called, so the conversation grows without bound. The compactor
+tracks an estimate of the conversation's token footprint and, once it goes
+over a per-priority budget, elides old tool results that Claude has already
+reviewed, keeping the most recent turns verbatim.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used for budget estimates
+CHARS_PER_TOKEN = 4
+
+ELISION_MARKER = "[elided"
+
+
+@dataclass
+class ContextPolicy:
+    """Context limits applied to investigations of one priority."""
+    token_budget: int
+    keep_recent_turns: int
+
+
+DEFAULT_POLICIES = {
+    "P1": ContextPolicy(token_budget=120000, keep_recent_turns=4),
+    "P2": ContextPolicy(token_budget=80000, keep_recent_turns=3),
+}
+FALLBACK_POLICY = ContextPolicy(token_budget=50000, keep_recent_turns=2)
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """
+    Estimate the token footprint of a conversation.
+
+    Args:
+        messages: Conversation history in Messages API format
+
+    Returns:
+        int: Approximate token count
+    """
+    return sum(_message_chars(message) for message in messages) // CHARS_PER_TOKEN
+
+
+def _message_chars(message: Dict) -> int:
+    """Approximate character size of one message."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return len(content)
+    return sum(_block_chars(block) for block in content or [])
+
+
+def _block_chars(block: Any) -> int:
+    """Approximate character size of one content block (dict or SDK object)."""
+    if isinstance(block, dict):
+        block_type = block.get("type")
+        if block_type == "text":
+            return len(block.get("text", ""))
+        if block_type == "tool_result":
+            content = block.get("content", "")
+            return len(content) if isinstance(content, str) else len(str(content))
+        return len(str(block))
+
+    block_type = getattr(block, "type", None)
+    if block_type == "text":
+        return len(getattr(block, "text", ""))
+    if block_type == "tool_use":
+        return len(str(getattr(block, "input", ""))) + len(getattr(block, "name", ""))
+    return len(str(block))
+
+
+class ContextCompactor:
+    """
+    Keeps investigation conversations within a token budget.
+
+    Compaction only touches tool_result blocks in user turns that Claude has
+    already answered, outside the most recent `keep_recent_turns` turns. Each
+    elided result keeps a short head of the original payload. To avoid
+    invalidating the prompt cache on every turn, compaction brings the
+    conversation down to `target_ratio` of the budget rather than just under it.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, ContextPolicy]] = None,
+        fallback: ContextPolicy = FALLBACK_POLICY,
+        target_ratio: float = 0.7,
+        preview_chars: int = 300
+    ):
+        """
+        Initialize the compactor.
+
+        Args:
+            policies: Context policy per OpsGenie priority
+            fallback: Policy for priorities without an explicit entry
+            target_ratio: Fraction of the budget to compact down to
+            preview_chars: Characters of each elided tool result to keep
+        """
+        self.policies = policies if policies is not None else dict(DEFAULT_POLICIES)
+        self.fallback = fallback
+        self.target_ratio = target_ratio
+        self.preview_chars = preview_chars
+
+    @classmethod
+    def from_env(cls) -> "ContextCompactor":
+        """
+        Build a compactor from environment configuration.
+
+        Environment variables (all optional):
+        - CONTEXT_TOKEN_BUDGET_<PRIORITY> / CONTEXT_KEEP_TURNS_<PRIORITY>: per-priority policy
+        - CONTEXT_TOKEN_BUDGET / CONTEXT_KEEP_TURNS: fallback policy
+
+        Returns:
+            ContextCompactor: Configured compactor
+        """
+        fallback = ContextPolicy(
+            token_budget=int(os.environ.get('CONTEXT_TOKEN_BUDGET', FALLBACK_POLICY.token_budget)),
+            keep_recent_turns=int(os.environ.get('CONTEXT_KEEP_TURNS', FALLBACK_POLICY.keep_recent_turns))
+        )
+
+        policies = {}
+        for priority in ("P1", "P2", "P3", "P4", "P5"):
+            default = DEFAULT_POLICIES.get(priority, fallback)
+            policies[priority] = ContextPolicy(
+                token_budget=int(os.environ.get(f'CONTEXT_TOKEN_BUDGET_{priority}', default.token_budget)),
+                keep_recent_turns=int(os.environ.get(f'CONTEXT_KEEP_TURNS_{priority}', default.keep_recent_turns))
+            )
+
+        return cls(policies=policies, fallback=fallback)
+
+    def policy_for(self, priority: str) -> ContextPolicy:
+        """Get the context policy for an OpsGenie priority."""
+        return self.policies.get(priority, self.fallback)
+
+    def compact(self, messages: List[Dict], priority: str) -> int:
+        """
+        Elide old tool results in place if the conversation is over budget.
+
+        Args:
+            messages: Conversation history, modified in place
+            priority: OpsGenie priority of the investigation
+
+        Returns:
+            int: Number of characters removed (0 if nothing was compacted)
+        """
+        policy = self.policy_for(priority)
+        footprint = estimate_tokens(messages)
+
+        if footprint <= policy.token_budget:
+            return 0
+
+        target_chars = int(policy.token_budget * self.target_ratio) * CHARS_PER_TOKEN
+        current_chars = footprint * CHARS_PER_TOKEN
+        removed = 0
+        elided_blocks = 0
+
+        # Indices of user turns, newest last; the last keep_recent_turns stay verbatim
+        user_turns = [index for index, message in enumerate(messages) if message.get("role") == "user"]
+        candidates = user_turns[:-policy.keep_recent_turns] if policy.keep_recent_turns else user_turns
+
+        for index in candidates:
+            # Only compact results Claude has already seen and responded to
+            if index + 1 >= len(messages):
+                continue
+
+            content = messages[index].get("content")
+            if not isinstance(content, list):
+                continue
+
+            for block in content:
+                if current_chars - removed <= target_chars:
+                    break
+                saved = self._elide_block(block)
+                if saved:
+                    removed += saved
+                    elided_blocks += 1
+
+        if removed:
+            logger.info(
+                f"Compacted conversation from ~{footprint} tokens: elided {elided_blocks} "
+                f"tool results (~{removed // CHARS_PER_TOKEN} tokens)"
+            )
+        else:
+            logger.warning(f"Conversation at ~{footprint} tokens exceeds budget {policy.token_budget} with nothing left to compact")
+
+        return removed
+
+    def _elide_block(self, block: Any) -> int:
+        """
+        Replace a tool result's payload with a short preview.
+
+        Args:
+            block: Content block from a user turn
+
+        Returns:
+            int: Characters removed (0 if the block was left unchanged)
+        """
+        if not isinstance(block, dict) or block.get("type") != "tool_result":
+            return 0
+
+        content = block.get("content")
+        if not isinstance(content, str) or content.startswith(ELISION_MARKER):
+            return 0
+        if len(content) <= self.preview_chars * 2:
+            return 0
+
+        replacement = (
+            f"{ELISION_MARKER} {len(content)} chars of tool output already reviewed; "
+            f"call the tool again if the details are needed] {content[:self.preview_chars]}..."
+        )
+        block["content"] = replacement
+        return len(content) - len(replacement)
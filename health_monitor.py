@@ -0,0 +1,148 @@
+"""
+Background health monitor for MCP server connections.
+
+Probes each MCP server on its own jittered schedule and caches the results,
+so liveness and readiness endpoints can be answered from memory without
+sending any traffic to the MCP servers.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any
+
+from mcp_client import MCPClient
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Periodically probes MCP servers and serves cached health results.
+    """
+
+    def __init__(
+        self,
+        mcp_client: MCPClient,
+        servers: Dict[str, Dict[str, Any]],
+        interval: float = 30,
+        jitter: float = 0.2,
+        ttl: float = 90,
+        probe_timeout: float = 10
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            mcp_client: Client used to probe the servers
+            servers: MCP server configurations keyed by server name
+            interval: Base seconds between probes of one server
+            jitter: Fractional random spread applied to each interval
+            ttl: Seconds after which a probe result is considered stale
+            probe_timeout: Seconds before a probe counts as failed
+        """
+        self.mcp_client = mcp_client
+        self.servers = servers
+        self.interval = interval
+        self.jitter = jitter
+        self.ttl = ttl
+        self.probe_timeout = probe_timeout
+
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        """Probe every server once, then keep probing in the background."""
+        await asyncio.gather(*(self._probe(server_name) for server_name in self.servers))
+
+        for server_name in self.servers:
+            self._tasks[server_name] = asyncio.create_task(
+                self._probe_loop(server_name), name=f"health-probe-{server_name}"
+            )
+        logger.info(f"Health monitor started (interval {self.interval}s, ttl {self.ttl}s)")
+
+    async def stop(self):
+        """Stop background probing."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def _probe_loop(self, server_name: str):
+        """Probe one server forever with jittered sleeps between probes."""
+        while True:
+            spread = self.interval * self.jitter
+            await asyncio.sleep(self.interval + random.uniform(-spread, spread))
+            await self._probe(server_name)
+
+    async def _probe(self, server_name: str):
+        """
+        Probe one server and record the outcome.
+
+        Args:
+            server_name: Name of the MCP server
+        """
+        started = time.monotonic()
+        previous = self._results.get(server_name, {}).get("status")
+
+        try:
+            await asyncio.wait_for(self.mcp_client.ping(server_name), timeout=self.probe_timeout)
+            status, error = "healthy", None
+        except asyncio.TimeoutError:
+            status, error = "unhealthy", f"Probe timed out after {self.probe_timeout}s"
+        except Exception as e:
+            status, error = "unhealthy", str(e)
+
+        self._results[server_name] = {
+            "status": status,
+            "error": error,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "checked_monotonic": time.monotonic(),
+            "checked_at": datetime.now().isoformat()
+        }
+
+        if status != previous:
+            log = logger.info if status == "healthy" else logger.warning
+            log(f"MCP server '{server_name}' is {status}" + (f": {error}" if error else ""))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cached health of all servers; stale or missing results count as unhealthy.
+
+        Returns:
+            Dict: Overall flag and per-server status, including circuit breaker state
+        """
+        now = time.monotonic()
+        health_status = {
+            "healthy": True,
+            "servers": {}
+        }
+
+        for server_name, config in self.servers.items():
+            result = self._results.get(server_name)
+            entry: Dict[str, Any] = {"url": config.get("url")}
+
+            if result is None:
+                entry.update(status="unknown", error="Not probed yet")
+            else:
+                age = now - result["checked_monotonic"]
+                entry.update(
+                    status=result["status"] if age <= self.ttl else "stale",
+                    latency_ms=result["latency_ms"],
+                    checked_at=result["checked_at"],
+                    age_seconds=round(age, 1)
+                )
+                if result["error"]:
+                    entry["error"] = result["error"]
+
+            # Breaker state is reported but does not affect readiness: an open
+            # circuit already fails calls fast and recovers through half-open probes
+            entry["circuit"] = self.mcp_client.get_circuit_state(server_name)
+
+            if entry["status"] != "healthy":
+                health_status["healthy"] = False
+            health_status["servers"][server_name] = entry
+
+        return health_status
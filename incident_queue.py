@@ -0,0 +1,213 @@
+"""
+Bounded incident work queue for the autonomous incident agent.
+
+Incoming alerts are queued by OpsGenie priority and processed by a fixed
+pool of worker tasks, so an alert storm cannot spawn an unbounded number of
+concurrent investigations. The queue sheds load once it reaches its depth
+limit and drains gracefully on shutdown.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Any, Callable, Awaitable, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# OpsGenie priorities, P1 being the most urgent; unknown priorities rank as P3
+PRIORITY_RANKS = {"P1": 1, "P2": 2, "P3": 3, "P4": 4, "P5": 5}
+DEFAULT_PRIORITY_RANK = 3
+
+
+class QueueFullError(Exception):
+    """Raised when an alert is rejected because the queue is at its depth limit."""
+
+
+class QueueClosedError(Exception):
+    """Raised when an alert is submitted while the queue is not accepting work."""
+
+
+def priority_rank(alert_data: Dict[str, Any]) -> int:
+    """
+    Map an alert's OpsGenie priority to a sortable rank (lower runs first).
+
+    Args:
+        alert_data: Alert information from OpsGenie webhook
+
+    Returns:
+        int: Priority rank
+    """
+    return PRIORITY_RANKS.get(str(alert_data.get('priority', '')).upper(), DEFAULT_PRIORITY_RANK)
+
+
+class IncidentQueue:
+    """
+    Priority queue of pending incidents served by a pool of worker tasks.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        workers: int = 4,
+        max_depth: int = 100,
+        wait_samples: int = 1000
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            handler: Coroutine function that processes one alert
+            workers: Number of concurrent worker tasks
+            max_depth: Maximum number of queued (not yet running) alerts
+            wait_samples: Number of recent queue wait times kept for statistics
+        """
+        self.handler = handler
+        self.worker_count = workers
+        self.max_depth = max_depth
+
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_depth)
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._busy_workers = 0
+        self._accepting = False
+
+        self._wait_times = deque(maxlen=wait_samples)
+        self._counters = {
+            "accepted": 0,
+            "rejected_full": 0,
+            "rejected_closed": 0,
+            "processed": 0,
+            "failed": 0
+        }
+
+    @property
+    def accepting(self) -> bool:
+        """Whether the queue currently accepts new alerts."""
+        return self._accepting
+
+    @property
+    def idle_workers(self) -> int:
+        """Workers that would pick up a newly submitted alert right away."""
+        return max(0, self.worker_count - self._busy_workers - self._queue.qsize())
+
+    def start(self):
+        """Start the worker pool and begin accepting alerts."""
+        if self._workers:
+            return
+
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"incident-worker-{index}")
+            for index in range(self.worker_count)
+        ]
+        self._accepting = True
+        logger.info(f"Incident queue started with {self.worker_count} workers (max depth {self.max_depth})")
+
+    def submit(self, alert_data: Dict[str, Any]) -> int:
+        """
+        Enqueue an alert for investigation.
+
+        Args:
+            alert_data: Alert information from OpsGenie webhook
+
+        Returns:
+            int: Queue depth after enqueueing
+
+        Raises:
+            QueueClosedError: If the queue is not started or is draining
+            QueueFullError: If the queue is at its depth limit
+        """
+        if not self._accepting:
+            self._counters["rejected_closed"] += 1
+            raise QueueClosedError("Incident queue is not accepting work")
+
+        entry = (priority_rank(alert_data), next(self._sequence), time.monotonic(), alert_data)
+
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._counters["rejected_full"] += 1
+            raise QueueFullError(f"Incident queue is full ({self.max_depth} pending)")
+
+        self._counters["accepted"] += 1
+        return self._queue.qsize()
+
+    async def _worker(self, index: int):
+        """
+        Worker loop: take the most urgent alert and run the handler on it.
+
+        Args:
+            index: Worker number, used for logging
+        """
+        while True:
+            rank, _, enqueued_at, alert_data = await self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            self._wait_times.append(wait)
+            metrics.queue_wait_seconds.observe(wait)
+            self._busy_workers += 1
+
+            try:
+                logger.debug(f"Worker {index} picked alert {alert_data.get('alertId', 'unknown')} (rank {rank})")
+                await self.handler(alert_data)
+                self._counters["processed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.error(f"Worker {index} failed processing alert {alert_data.get('alertId', 'unknown')}: {str(e)}")
+            finally:
+                self._busy_workers -= 1
+                self._queue.task_done()
+
+    async def drain(self, timeout: Optional[float] = None):
+        """
+        Stop accepting alerts, wait for queued and running work, then stop workers.
+
+        Args:
+            timeout: Maximum seconds to wait before cancelling remaining work
+        """
+        self._accepting = False
+        pending = self._queue.qsize()
+        logger.info(f"Draining incident queue ({pending} queued, {self._busy_workers} running)")
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            logger.info("Incident queue drained")
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Incident queue drain timed out with {self._queue.qsize()} queued "
+                f"and {self._busy_workers} running; cancelling"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth, wait times and worker utilization.
+
+        Returns:
+            Dict: Queue statistics for monitoring
+        """
+        waits = sorted(self._wait_times)
+
+        return {
+            "accepting": self._accepting,
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "workers": self.worker_count,
+            "busy_workers": self._busy_workers,
+            "utilization": self._busy_workers / self.worker_count if self.worker_count else 0.0,
+            "wait_seconds": {
+                "samples": len(waits),
+                "avg": sum(waits) / len(waits) if waits else 0.0,
+                "p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0
+            },
+            **self._counters
+        }
@@ -0,0 +1,310 @@
+"""
+Per-investigation state for the autonomous incident agent.
+
+An Investigation carries everything that belongs to one alert's analysis:
+the conversation with Claude, token accounting, timing and its budget. It is
+created by `AutonomousIncidentAgent.analyze_incident` and threaded through
+the investigation loop.
+"""
+
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional
+
+
+@dataclass
+class TokenUsage:
+    """
+    Token accounting for model calls.
+
+    `input_tokens` counts only uncached input, matching the Anthropic usage
+    report; cache writes and cache reads are tracked separately.
+    """
+    model_calls: int = 0
+    input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    output_tokens: int = 0
+
+    def add(self, usage: Any):
+        """
+        Accumulate the usage block of one model response.
+
+        Args:
+            usage: Usage object from a model response (fields may be missing or None)
+        """
+        self.model_calls += 1
+        if usage is None:
+            return
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+
+    def merge(self, other: "TokenUsage"):
+        """Add another usage total into this one."""
+        self.model_calls += other.model_calls
+        self.input_tokens += other.input_tokens
+        self.cache_creation_input_tokens += other.cache_creation_input_tokens
+        self.cache_read_input_tokens += other.cache_read_input_tokens
+        self.output_tokens += other.output_tokens
+
+    @property
+    def total_input_tokens(self) -> int:
+        """All input tokens, cached or not."""
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Fraction of input tokens served from the prompt cache."""
+        total = self.total_input_tokens
+        return self.cache_read_input_tokens / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Usage totals as a plain dictionary."""
+        return {
+            **asdict(self),
+            "total_input_tokens": self.total_input_tokens,
+            "cache_hit_ratio": round(self.cache_hit_ratio, 4)
+        }
+
+
+class InvestigationBudget:
+    """
+    Limits on one investigation: wall-clock deadline, tool calls, tokens and model turns.
+
+    The agent asks for a final "summarize now" turn once the remaining time
+    falls within `summarize_margin`, the tool calls or turns are used up, or
+    the token budget could not cover another two turns.
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = 300,
+        max_tool_calls: int = 20,
+        max_tokens: int = 0,
+        max_iterations: int = 20,
+        summarize_margin: float = 30
+    ):
+        """
+        Initialize the budget; the clock starts now.
+
+        Args:
+            deadline_seconds: Wall-clock limit for the whole investigation
+            max_tool_calls: Tool calls allowed across all turns
+            max_tokens: Input+output tokens allowed across all model calls; 0 for no limit
+            max_iterations: Model turns allowed, including the final one
+            summarize_margin: Seconds kept back for the final summarize turn
+        """
+        self.deadline_seconds = deadline_seconds
+        self.max_tool_calls = max_tool_calls
+        self.max_tokens = max_tokens
+        self.max_iterations = max_iterations
+        self.summarize_margin = min(summarize_margin, deadline_seconds / 2)
+        self.tool_calls = 0
+        self.started_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "InvestigationBudget":
+        """
+        Build a budget from environment configuration.
+
+        Environment variables (all optional): MAX_ANALYSIS_TIMEOUT,
+        MAX_TOOL_CALLS, MAX_INVESTIGATION_TOKENS, MAX_ITERATIONS,
+        SUMMARIZE_MARGIN_SECONDS
+
+        Returns:
+            InvestigationBudget: Budget starting now
+        """
+        return cls(
+            deadline_seconds=float(os.environ.get('MAX_ANALYSIS_TIMEOUT', 300)),
+            max_tool_calls=int(os.environ.get('MAX_TOOL_CALLS', 20)),
+            max_tokens=int(os.environ.get('MAX_INVESTIGATION_TOKENS', 0)),
+            max_iterations=int(os.environ.get('MAX_ITERATIONS', 20)),
+            summarize_margin=float(os.environ.get('SUMMARIZE_MARGIN_SECONDS', 30))
+        )
+
+    @property
+    def remaining_seconds(self) -> float:
+        """Seconds until the deadline (negative once passed)."""
+        return self.deadline_seconds - self.elapsed_seconds
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Seconds used, including any carried over from earlier attempts."""
+        return time.monotonic() - self.started_at
+
+    @property
+    def remaining_tool_calls(self) -> int:
+        """Tool calls still allowed."""
+        return max(0, self.max_tool_calls - self.tool_calls)
+
+    def remaining_tokens(self, usage: TokenUsage) -> Optional[int]:
+        """Tokens still allowed, or None without a token limit."""
+        if not self.max_tokens:
+            return None
+        return max(0, self.max_tokens - usage.total_input_tokens - usage.output_tokens)
+
+    def take_tool_call(self) -> bool:
+        """Use one tool call from the budget; False if none are left."""
+        if self.tool_calls >= self.max_tool_calls:
+            return False
+        self.tool_calls += 1
+        return True
+
+    def refund_tool_call(self):
+        """Give back a tool call that was taken but never sent."""
+        self.tool_calls = max(0, self.tool_calls - 1)
+
+    def carry_over(self, elapsed_seconds: float, tool_calls: int):
+        """
+        Charge time and tool calls used by an earlier attempt of the same investigation.
+
+        Args:
+            elapsed_seconds: Seconds the earlier attempts ran
+            tool_calls: Tool calls they made
+        """
+        self.started_at -= max(0.0, elapsed_seconds)
+        self.tool_calls += tool_calls
+
+    def summarize_reason(self, iteration: int, usage: TokenUsage, next_turn_tokens: int) -> Optional[str]:
+        """
+        Why the next turn must be the final summary, if it must.
+
+        Args:
+            iteration: Number of the turn about to be sent
+            usage: Token usage of the investigation so far
+            next_turn_tokens: Estimated tokens of the next model call
+
+        Returns:
+            Optional[str]: Reason, or None while the investigation may continue
+        """
+        if self.remaining_seconds <= self.summarize_margin:
+            return "time"
+        if iteration >= self.max_iterations:
+            return "turns"
+        if self.tool_calls >= self.max_tool_calls:
+            return "tool calls"
+        remaining_tokens = self.remaining_tokens(usage)
+        if remaining_tokens is not None and remaining_tokens < 2 * next_turn_tokens:
+            return "tokens"
+        return None
+
+    def describe(self, iteration: int, usage: TokenUsage) -> str:
+        """Remaining budget as a sentence for the model."""
+        parts = [
+            f"{max(0, int(self.remaining_seconds - self.summarize_margin))}s",
+            f"{self.remaining_tool_calls} tool calls",
+            f"{max(0, self.max_iterations - iteration - 1)} more turns"
+        ]
+        remaining_tokens = self.remaining_tokens(usage)
+        if remaining_tokens is not None:
+            parts.append(f"{remaining_tokens} tokens")
+        return (
+            "Investigation budget remaining before you must write the final analysis: "
+            + ", ".join(parts) + ". Prioritize the most informative queries."
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Budget limits and consumption as a plain dictionary."""
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "remaining_seconds": round(self.remaining_seconds, 1),
+            "tool_calls": self.tool_calls,
+            "max_tool_calls": self.max_tool_calls,
+            "max_tokens": self.max_tokens
+        }
+
+
+class Investigation:
+    """
+    State of a single incident investigation.
+    """
+
+    def __init__(
+        self,
+        alert_data: Dict[str, Any],
+        messages: Optional[List[Dict]] = None,
+        budget: Optional[InvestigationBudget] = None
+    ):
+        """
+        Initialize the investigation for an alert.
+
+        Args:
+            alert_data: Alert information from OpsGenie webhook
+            messages: Existing conversation, if any
+            budget: Limits for the investigation; default limits if omitted
+        """
+        self.alert_data = alert_data
+        self.alert_id = alert_data.get('alertId', 'unknown')
+        self.priority = str(alert_data.get('priority', 'P3')).upper()
+        self.messages: List[Dict] = messages if messages is not None else []
+        self.usage = TokenUsage()
+        self.budget = budget or InvestigationBudget()
+        self.summarize_reason: Optional[str] = None
+        self.iterations = 0
+        self.compacted_chars = 0
+        self.early_dispatched_tools = 0
+        self.started_at = time.monotonic()
+
+        # Wall-clock receipt of the alert (stamped by the webhook) and of the first note posted for it
+        self.received_at = float(alert_data.get('receivedAt') or time.time())
+        self.first_note_at: Optional[float] = None
+
+        # Background task posting the early triage note, if one was started
+        self.triage_task: Optional[Any] = None
+
+        # Text streamed so far in the current model turn
+        self.partial_text: List[str] = []
+
+        # Content block currently carrying the moving conversation cache breakpoint
+        self.cache_breakpoint: Optional[Dict] = None
+
+        # Messages already written to the job store, and whether the conversation was restored from it
+        self.checkpointed = 0
+        self.resumed = False
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the investigation started."""
+        return time.monotonic() - self.started_at
+
+    @property
+    def time_to_first_note(self) -> Optional[float]:
+        """Seconds from alert receipt to the first note on the alert, once posted."""
+        return self.first_note_at - self.received_at if self.first_note_at is not None else None
+
+    def record_note(self) -> bool:
+        """Record that a note was posted for the alert; True if it was the first."""
+        if self.first_note_at is not None:
+            return False
+        self.first_note_at = time.time()
+        return True
+
+    @property
+    def partial_analysis(self) -> str:
+        """Text generated so far in the current model turn, possibly incomplete."""
+        return "".join(self.partial_text)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Per-investigation metrics for logging and reporting.
+
+        Returns:
+            Dict: Iterations, compaction, early tool dispatch, budget use, duration,
+            time to first note and token usage
+        """
+        return {
+            "alert_id": self.alert_id,
+            "priority": self.priority,
+            "iterations": self.iterations,
+            "resumed": self.resumed,
+            "compacted_chars": self.compacted_chars,
+            "early_dispatched_tools": self.early_dispatched_tools,
+            "summarize_reason": self.summarize_reason,
+            "budget": self.budget.as_dict(),
+            "duration_seconds": round(self.elapsed, 3),
+            "time_to_first_note_seconds": round(self.time_to_first_note, 3) if self.time_to_first_note is not None else None,
+            "usage": self.usage.as_dict()
+        }
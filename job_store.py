@@ -0,0 +1,465 @@
+"""
+Durable job store for incident investigations.
+
+Every accepted alert becomes a job whose state, conversation checkpoints and
+result are persisted, so investigations interrupted by a pod restart or
+rolling update are picked up again. `JobStore` is the interface a shared
+backend (e.g. Redis) would implement; `SQLiteJobStore` is the default.
+
+Work is pulled from the store: a job is claimed with a lease that its
+owner keeps renewing, and a job whose lease expired (its owner died) can be
+claimed again. With a backend shared by all replicas this would distribute
+jobs across them. The SQLite store is local to one host (see
+SQLiteJobStore), so the default deployment runs a single replica and leases
+hand a dead process's jobs to its successor on the same volume.
+
+Conversation checkpoints are appends: each message is stored as its own row
+and never rewritten.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, is_dataclass
+from typing import Dict, List, Any, Optional
+
+from incident_queue import priority_rank
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# States of jobs that still need work after a restart
+INCOMPLETE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class Job:
+    """A persisted investigation job."""
+    job_id: str
+    alert_data: Dict[str, Any]
+    state: str
+    rank: int = 0
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    # Investigation time used by earlier attempts, as of the last checkpoint
+    elapsed_seconds: float = 0.0
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convert message content (including SDK and stub block objects) to plain JSON data.
+
+    Cache-control markers are dropped: they belong to the request being sent,
+    not to the stored conversation.
+
+    Args:
+        value: Message, content block or any nested value
+
+    Returns:
+        Any: JSON-serializable equivalent
+    """
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(exclude_none=True)
+    elif is_dataclass(value) and not isinstance(value, type):
+        value = asdict(value)
+
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items() if key != "cache_control"}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+class JobStore(ABC):
+    """
+    Persistence interface for investigation jobs.
+
+    Job ids are OpsGenie alert ids, so an alert re-delivered while its
+    investigation is pending maps to the existing job.
+    """
+
+    @abstractmethod
+    async def create_job(self, alert_data: Dict[str, Any]) -> bool:
+        """
+        Record an accepted alert as a queued job.
+
+        A finished job for the same alert is replaced, so an alert can be
+        investigated again once its previous investigation has ended.
+
+        Args:
+            alert_data: Alert information from OpsGenie webhook
+
+        Returns:
+            bool: False if an unfinished job for the alert already exists
+        """
+
+    @abstractmethod
+    async def add_related_alert(self, job_id: str, related: Dict[str, Any]):
+        """
+        Append an alert coalesced into a job to its `coalescedAlerts`.
+
+        Args:
+            job_id: Job id of the primary alert
+            related: Summary of the coalesced alert
+        """
+
+    @abstractmethod
+    async def backlog(self) -> int:
+        """Number of queued jobs, i.e. accepted alerts whose investigation has not started."""
+
+    @abstractmethod
+    async def claim_job(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Job]:
+        """
+        Lease the most urgent unfinished job that has no live lease.
+
+        Claimable jobs that already used `max_attempts` attempts are failed
+        instead, so an alert that crashes its worker cannot loop forever.
+
+        Args:
+            owner: Id of the claiming process
+            lease_seconds: Lease duration
+            max_attempts: Attempts after which a job is given up
+
+        Returns:
+            Optional[Job]: Claimed job, or None if there is no claimable job
+        """
+
+    @abstractmethod
+    async def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Extend a lease.
+
+        Returns:
+            bool: False if the job is no longer leased to `owner`
+        """
+
+    @abstractmethod
+    async def release_job(self, job_id: str, owner: str):
+        """Give up a lease so another owner can claim the job right away."""
+
+    @abstractmethod
+    async def mark_running(self, job_id: str):
+        """Mark a job as running and count the attempt."""
+
+    @abstractmethod
+    async def append_messages(self, job_id: str, start_index: int, messages: List[Dict], elapsed_seconds: float = 0.0):
+        """
+        Checkpoint new conversation messages.
+
+        Args:
+            job_id: Job id
+            start_index: Position of the first message in the conversation
+            messages: Messages to append
+            elapsed_seconds: Investigation time used so far, charged again when the job resumes
+        """
+
+    @abstractmethod
+    async def load_messages(self, job_id: str) -> List[Dict]:
+        """Checkpointed conversation of a job, in order."""
+
+    @abstractmethod
+    async def complete_job(self, job_id: str, result: str):
+        """Mark a job as completed with its analysis."""
+
+    @abstractmethod
+    async def fail_job(self, job_id: str, error: str):
+        """Mark a job as failed."""
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """Look up a job."""
+
+    @abstractmethod
+    async def prune(self, older_than: float) -> int:
+        """
+        Delete finished jobs last updated more than `older_than` seconds ago.
+
+        Returns:
+            int: Number of jobs deleted
+        """
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Job counts by state."""
+
+    async def close(self):
+        """Release resources held by the store."""
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store in a local SQLite database.
+
+    All database work runs on one dedicated thread so the event loop never
+    blocks on disk I/O and the connection is never shared between threads.
+    Several processes on one host may share the database file; claims take
+    the write lock up front so two processes never lease the same job.
+
+    The file must be on a local filesystem (in Kubernetes, a ReadWriteOnce
+    volume per pod). WAL mode needs shared memory between the processes, and
+    the write lock relies on POSIX byte-range locks; neither works reliably
+    on network filesystems, so the file must not be shared across hosts.
+    """
+
+    # Columns added after the first schema version, with their definitions
+    MIGRATIONS = {
+        "rank": "INTEGER NOT NULL DEFAULT 0",
+        "lease_owner": "TEXT",
+        "lease_expires": "REAL",
+        "elapsed_seconds": "REAL NOT NULL DEFAULT 0"
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            alert_data TEXT NOT NULL,
+            state TEXT NOT NULL,
+            rank INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            elapsed_seconds REAL NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, rank, created_at);
+        CREATE TABLE IF NOT EXISTS job_messages (
+            job_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            PRIMARY KEY (job_id, position)
+        );
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (and if needed create) the database.
+
+        Args:
+            path: Database file path
+        """
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._connection.executescript(self.SCHEMA)
+        logger.info(f"SQLite job store opened at {path}")
+
+    def _migrate(self):
+        """Add columns missing from a database created by an older version."""
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        if not columns:
+            return
+        for column, definition in self.MIGRATIONS.items():
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+                logger.info(f"Added column {column} to jobs table")
+
+    async def _run(self, function, *args) -> Any:
+        """Run a database function on the store's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Execute one statement (on the store's thread)."""
+        return self._connection.execute(sql, parameters)
+
+    async def create_job(self, alert_data: Dict[str, Any]) -> bool:
+        now = time.time()
+        placeholders = ", ".join("?" for _ in INCOMPLETE_STATES)
+        cursor = await self._run(
+            self._execute,
+            "INSERT INTO jobs (job_id, alert_data, state, rank, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (job_id) DO UPDATE SET alert_data = excluded.alert_data, state = excluded.state, "
+            "rank = excluded.rank, attempts = 0, lease_owner = NULL, lease_expires = NULL, result = NULL, error = NULL, "
+            "elapsed_seconds = 0, created_at = excluded.created_at, updated_at = excluded.updated_at "
+            f"WHERE jobs.state NOT IN ({placeholders})",
+            (alert_data['alertId'], json.dumps(alert_data, default=str), QUEUED, priority_rank(alert_data), now, now,
+             *INCOMPLETE_STATES)
+        )
+        return cursor.rowcount == 1
+
+    async def add_related_alert(self, job_id: str, related: Dict[str, Any]):
+        def add():
+            with self._connection:
+                self._connection.execute("BEGIN IMMEDIATE")
+                row = self._connection.execute("SELECT alert_data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None:
+                    return
+                alert_data = json.loads(row[0])
+                alert_data.setdefault('coalescedAlerts', []).append(related)
+                self._connection.execute(
+                    "UPDATE jobs SET alert_data = ?, updated_at = ? WHERE job_id = ?",
+                    (json.dumps(alert_data, default=str), time.time(), job_id)
+                )
+        await self._run(add)
+
+    async def backlog(self) -> int:
+        cursor = await self._run(self._execute, "SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,))
+        return (await self._run(cursor.fetchone))[0]
+
+    async def claim_job(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Job]:
+        def claim():
+            now = time.time()
+            claimable = "state IN (?, ?) AND (lease_expires IS NULL OR lease_expires < ?)"
+            with self._connection:
+                self._connection.execute("BEGIN IMMEDIATE")
+                self._connection.execute(
+                    f"UPDATE jobs SET state = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                    f"WHERE {claimable} AND attempts >= ?",
+                    (FAILED, f"Gave up after {max_attempts} attempts", now, QUEUED, RUNNING, now, max_attempts)
+                )
+                row = self._connection.execute(
+                    f"SELECT job_id FROM jobs WHERE {claimable} ORDER BY rank, created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute(
+                    "UPDATE jobs SET lease_owner = ?, lease_expires = ?, updated_at = ? WHERE job_id = ?",
+                    (owner, now + lease_seconds, now, row[0])
+                )
+                return row[0]
+
+        job_id = await self._run(claim)
+        return await self.get_job(job_id) if job_id is not None else None
+
+    async def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        cursor = await self._run(
+            self._execute,
+            "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_owner = ? AND state IN (?, ?)",
+            (time.time() + lease_seconds, job_id, owner, *INCOMPLETE_STATES)
+        )
+        return cursor.rowcount == 1
+
+    async def release_job(self, job_id: str, owner: str):
+        await self._run(
+            self._execute,
+            "UPDATE jobs SET lease_owner = NULL, lease_expires = NULL WHERE job_id = ? AND lease_owner = ?",
+            (job_id, owner)
+        )
+
+    async def mark_running(self, job_id: str):
+        await self._run(
+            self._execute,
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+            (RUNNING, time.time(), job_id)
+        )
+
+    async def append_messages(self, job_id: str, start_index: int, messages: List[Dict], elapsed_seconds: float = 0.0):
+        rows = [
+            (job_id, start_index + offset, json.dumps(to_jsonable(message), default=str))
+            for offset, message in enumerate(messages)
+        ]
+        await self._run(self._append_rows, job_id, rows, elapsed_seconds)
+
+    def _append_rows(self, job_id: str, rows: List[tuple], elapsed_seconds: float):
+        """Insert message rows and update the job's progress in one transaction."""
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO job_messages (job_id, position, message) VALUES (?, ?, ?)", rows
+            )
+            self._connection.execute(
+                "UPDATE jobs SET elapsed_seconds = ?, updated_at = ? WHERE job_id = ?",
+                (elapsed_seconds, time.time(), job_id)
+            )
+
+    async def load_messages(self, job_id: str) -> List[Dict]:
+        cursor = await self._run(
+            self._execute, "SELECT message FROM job_messages WHERE job_id = ? ORDER BY position", (job_id,)
+        )
+        return [json.loads(row[0]) for row in await self._run(cursor.fetchall)]
+
+    async def complete_job(self, job_id: str, result: str):
+        await self._finish(job_id, COMPLETED, result=result)
+
+    async def fail_job(self, job_id: str, error: str):
+        await self._finish(job_id, FAILED, error=error)
+
+    async def _finish(self, job_id: str, state: str, result: Optional[str] = None, error: Optional[str] = None):
+        """Record a terminal state; the checkpointed conversation is no longer needed."""
+        def finish():
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.execute(
+                    "UPDATE jobs SET state = ?, result = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (state, result, error, time.time(), job_id)
+                )
+                self._connection.execute("DELETE FROM job_messages WHERE job_id = ?", (job_id,))
+        await self._run(finish)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        rows = await self._query("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    async def _query(self, sql: str, parameters: tuple) -> List[Job]:
+        """Run a query over the jobs table and build Job objects."""
+        def query():
+            cursor = self._connection.execute(sql, parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        jobs = []
+        for row in await self._run(query):
+            row["alert_data"] = json.loads(row["alert_data"])
+            jobs.append(Job(**row))
+        return jobs
+
+    async def prune(self, older_than: float) -> int:
+        placeholders = ", ".join("?" for _ in INCOMPLETE_STATES)
+        cursor = await self._run(
+            self._execute,
+            f"DELETE FROM jobs WHERE state NOT IN ({placeholders}) AND updated_at < ?",
+            (*INCOMPLETE_STATES, time.time() - older_than)
+        )
+        return cursor.rowcount
+
+    async def stats(self) -> Dict[str, Any]:
+        cursor = await self._run(self._execute, "SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        counts = dict(await self._run(cursor.fetchall))
+        return {"backend": "sqlite", "path": self.path, **{state: counts.get(state, 0) for state in (QUEUED, RUNNING, COMPLETED, FAILED)}}
+
+    async def close(self):
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
+
+
+def create_job_store() -> Optional[JobStore]:
+    """
+    Build the job store selected by environment configuration.
+
+    Environment variables:
+    - JOB_STORE: "sqlite" (default) or "none" to disable persistence
+    - JOB_STORE_PATH: SQLite database path
+
+    Returns:
+        Optional[JobStore]: Configured store, or None if disabled
+    """
+    backend = os.environ.get('JOB_STORE', 'sqlite').lower()
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SQLiteJobStore(os.environ.get('JOB_STORE_PATH', 'incident_jobs.db'))
+
+    raise ValueError(f"Unknown job store backend: {backend}")
@@ -0,0 +1,118 @@
+"""
+JSON encoding and decoding for the orchestrator and the MCP servers.
+
+orjson is used when it is installed (several times faster than the stdlib
+codec on large tool results), with the stdlib json module as fallback.
+Output is always compact UTF-8 JSON, whichever backend is active.
+
+Parsing and serializing run inline: orjson and the stdlib C scanner hold
+the GIL for the whole call, so a worker thread would block the event loop
+just as long and only add a thread hop. offload() is for pure-Python work
+on large payloads (such as result shaping), which the interpreter preempts
+at every switch interval, so on a worker thread it shares the GIL with the
+event loop instead of stalling it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _select_backend() -> str:
+    """Backend chosen by JSON_CODEC (auto|orjson|stdlib)."""
+    requested = os.environ.get('JSON_CODEC', 'auto').lower()
+    if requested not in ("auto", "orjson", "stdlib"):
+        raise ValueError(f"Unknown JSON codec: {requested}")
+    if requested == "stdlib":
+        return "stdlib"
+    if not ORJSON_AVAILABLE:
+        if requested == "orjson":
+            logger.warning("orjson is not installed; using the stdlib JSON codec")
+        return "stdlib"
+    return "orjson"
+
+
+BACKEND = _select_backend()
+
+# Payload size (bytes/chars) from which offload() uses the thread pool
+OFFLOAD_THRESHOLD = int(os.environ.get('JSON_OFFLOAD_THRESHOLD', 256 * 1024))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('JSON_OFFLOAD_WORKERS', 2)),
+    thread_name_prefix="json-codec"
+)
+
+
+def dumps_bytes(value: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON.
+
+    Args:
+        value: Value to serialize
+        default: Called for objects that are not natively serializable
+        sort_keys: Whether to sort object keys (for stable cache keys)
+
+    Returns:
+        bytes: Encoded JSON
+
+    Raises:
+        TypeError: If the value is not serializable
+    """
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(value, default=default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib codec handles
+            pass
+    return json.dumps(
+        value, default=default, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def dumps(value: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> str:
+    """Serialize to a compact JSON string; see dumps_bytes()."""
+    return dumps_bytes(value, default=default, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Parse JSON.
+
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON (orjson's error is a subclass)
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def offload(size: int, function: Callable[..., Any], *args) -> Any:
+    """
+    Run pure-Python CPU-bound work inline, or in the codec thread pool if `size` reaches the offload threshold.
+
+    Not useful for functions that hold the GIL throughout, such as loads() and dumps().
+
+    Args:
+        size: Size of the payload the function processes
+        function: Function to run
+        *args: Its arguments
+
+    Returns:
+        Any: The function's result
+    """
+    if size < OFFLOAD_THRESHOLD:
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
@@ -0,0 +1,236 @@
+"""
+Lease-based claiming of jobs from the job store.
+
+Webhooks only record jobs in the job store. The LeaseWorker claims jobs
+from the store whenever an incident worker is idle, renews the leases of
+the jobs it holds, and releases them on shutdown. A process that dies
+stops renewing; once its leases expire the jobs are claimed by the next
+process using the store (with the default SQLite store, the restarted
+pod) and resume from their last checkpoint.
+
+Claiming only spreads work across replicas when every replica uses the
+same store, which needs a shared JobStore backend; the SQLite store is
+per pod, so the orchestrator runs as a single replica.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from incident_queue import IncidentQueue, QueueFullError, QueueClosedError
+from job_store import Job, JobStore, RUNNING
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseWorker:
+    """
+    Claims jobs from the job store into the local incident queue and keeps their leases alive.
+
+    Leases are renewed every third of `lease_seconds`. If a renewal finds the
+    lease gone (this process stalled long enough for another owner to take
+    the job over), the local investigation is cancelled so each alert is
+    investigated by one owner only.
+    """
+
+    def __init__(
+        self,
+        job_store: JobStore,
+        incident_queue: IncidentQueue,
+        owner: Optional[str] = None,
+        lease_seconds: float = 60,
+        poll_interval: float = 2,
+        max_attempts: int = 3
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            job_store: Store the jobs are claimed from
+            incident_queue: Local queue the claimed jobs are submitted to
+            owner: Lease owner id; defaults to the host name plus a random suffix
+            lease_seconds: Lease duration
+            poll_interval: Seconds between polls of the store while idle workers remain
+            max_attempts: Attempts after which a job is failed instead of claimed again
+        """
+        self.job_store = job_store
+        self.incident_queue = incident_queue
+        self.owner = owner or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+
+        # Jobs leased by this worker, with the task running each one once it started
+        self._claimed: Dict[str, Optional[asyncio.Task]] = {}
+        self._lost: set = set()
+
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._tasks: list = []
+        self._counters = {"claimed": 0, "taken_over": 0, "lost": 0, "renewal_errors": 0}
+
+    @classmethod
+    def from_env(cls, job_store: JobStore, incident_queue: IncidentQueue) -> "LeaseWorker":
+        """
+        Build a worker from environment configuration.
+
+        Environment variables (all optional): JOB_LEASE_SECONDS,
+        JOB_POLL_INTERVAL, JOB_MAX_ATTEMPTS, POD_NAME (lease owner prefix)
+
+        Args:
+            job_store: Store the jobs are claimed from
+            incident_queue: Local queue the claimed jobs are submitted to
+
+        Returns:
+            LeaseWorker: Configured worker
+        """
+        pod_name = os.environ.get('POD_NAME')
+        return cls(
+            job_store,
+            incident_queue,
+            owner=f"{pod_name}-{uuid.uuid4().hex[:8]}" if pod_name else None,
+            lease_seconds=float(os.environ.get('JOB_LEASE_SECONDS', 60)),
+            poll_interval=float(os.environ.get('JOB_POLL_INTERVAL', 2)),
+            max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+        )
+
+    def start(self):
+        """Start claiming jobs and renewing leases."""
+        if self._tasks:
+            return
+
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._claim_loop(), name="lease-claim"),
+            asyncio.create_task(self._renew_loop(), name="lease-renew")
+        ]
+        logger.info(f"Lease worker {self.owner} started (lease {self.lease_seconds}s)")
+
+    def notify(self):
+        """Claim right away instead of at the next poll, e.g. after a new job was recorded."""
+        self._wakeup.set()
+
+    async def run(self, alert_data: Dict[str, Any], handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        """
+        Run the handler for a claimed job, cancelling it if the lease is lost.
+
+        Args:
+            alert_data: Alert data of the claimed job
+            handler: Coroutine function that processes one alert
+        """
+        job_id = alert_data['alertId']
+        if job_id not in self._claimed:
+            logger.warning(f"Skipping job {job_id}: its lease was lost while it was queued")
+            return
+
+        task = asyncio.create_task(handler(alert_data), name=f"job-{job_id}")
+        self._claimed[job_id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            if job_id not in self._lost:
+                raise
+            logger.warning(f"Stopped job {job_id}: its lease was taken over by another owner")
+        finally:
+            # Finished jobs no longer have a lease; this frees one the handler left behind
+            self._lost.discard(job_id)
+            self._claimed.pop(job_id, None)
+            await self._release(job_id)
+            self.notify()
+
+    async def stop(self):
+        """Stop claiming and renewing, and release the leases still held so the next owner takes over at once."""
+        # The flag also stops the claim loop if wait_for swallows the cancellation
+        self._running = False
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        held = list(self._claimed)
+        self._claimed.clear()
+        for job_id in held:
+            await self._release(job_id)
+        if held:
+            logger.info(f"Released leases of {len(held)} unfinished jobs")
+
+    async def _release(self, job_id: str):
+        """Release a lease, logging instead of raising on store errors."""
+        try:
+            await self.job_store.release_job(job_id, self.owner)
+        except Exception as e:
+            logger.warning(f"Failed to release lease of job {job_id}: {str(e)}")
+
+    async def _claim_loop(self):
+        """Claim jobs while the local queue has idle workers; otherwise wait for a wakeup or the next poll."""
+        while self._running:
+            self._wakeup.clear()
+            try:
+                while self.incident_queue.accepting and self.incident_queue.idle_workers > 0:
+                    job = await self.job_store.claim_job(self.owner, self.lease_seconds, self.max_attempts)
+                    if job is None:
+                        break
+                    self._submit(job)
+            except Exception as e:
+                logger.error(f"Failed to claim jobs: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _submit(self, job: Job):
+        """Hand a claimed job to the local queue."""
+        self._claimed[job.job_id] = None
+        self._counters["claimed"] += 1
+        if job.state == RUNNING:
+            self._counters["taken_over"] += 1
+            logger.info(f"Took over job {job.job_id} (attempt {job.attempts + 1})")
+
+        try:
+            self.incident_queue.submit(job.alert_data)
+        except (QueueFullError, QueueClosedError) as e:
+            logger.warning(f"Returning job {job.job_id} to the store: {str(e)}")
+            self._claimed.pop(job.job_id, None)
+            asyncio.create_task(self._release(job.job_id))
+
+    async def _renew_loop(self):
+        """Renew held leases; cancel local work whose lease was taken over."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for job_id in list(self._claimed):
+                try:
+                    renewed = await self.job_store.renew_lease(job_id, self.owner, self.lease_seconds)
+                except Exception as e:
+                    self._counters["renewal_errors"] += 1
+                    logger.warning(f"Failed to renew lease of job {job_id}: {str(e)}")
+                    continue
+
+                if renewed or job_id not in self._claimed:
+                    continue
+
+                # Lost to another owner, or finished meanwhile (finished jobs are no longer renewable)
+                task = self._claimed.pop(job_id)
+                if task is not None and not task.done():
+                    self._counters["lost"] += 1
+                    self._lost.add(job_id)
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of lease activity.
+
+        Returns:
+            Dict: Owner id, jobs held and claim/takeover/loss counters
+        """
+        return {
+            "owner": self.owner,
+            "lease_seconds": self.lease_seconds,
+            "held": len(self._claimed),
+            "running": sum(1 for task in self._claimed.values() if task is not None),
+            **self._counters
+        }
@@ -0,0 +1,335 @@
+"""
+LLM client layer for the autonomous incident agent.
+
+This module provides an async interface for model calls so that an in-flight
+investigation never blocks the event loop while waiting on Claude. Responses
+can also be streamed, reporting each content block as soon as it is complete.
+It also ships a local stub backend that emits deterministic tool calls,
+allowing concurrency and throughput to be measured without a live model.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Optional
+
+from anthropic import APIConnectionError, APITimeoutError, AsyncAnthropic
+
+from resilience import CONNECTION, TIMEOUT, classify_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "claude-3-sonnet-20240229"
+DEFAULT_MAX_TOKENS = 4000
+
+# Streaming callbacks: one receives each completed tool_use block, the other text deltas
+ToolUseCallback = Callable[[Any], None]
+TextCallback = Callable[[str], None]
+
+
+class LLMClient(ABC):
+    """
+    Abstract async client for the model backing the investigation loop.
+
+    Implementations return message objects exposing `content` (a list of
+    text / tool_use blocks), `stop_reason` and `usage`, mirroring the
+    Anthropic Messages API response shape.
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, max_tokens: int = DEFAULT_MAX_TOKENS):
+        """
+        Initialize the client with default generation settings.
+
+        Args:
+            model: Model identifier used when a call does not override it
+            max_tokens: Maximum output tokens used when a call does not override it
+        """
+        self.model = model
+        self.max_tokens = max_tokens
+
+    @abstractmethod
+    async def create_message(self, messages: List[Dict], **kwargs) -> Any:
+        """
+        Send a conversation to the model and return its response.
+
+        Args:
+            messages: Conversation history in Messages API format
+            **kwargs: Extra request parameters (tools, tool_choice, system, ...)
+
+        Returns:
+            Any: Message object with content, stop_reason and usage
+        """
+
+    async def stream_message(
+        self,
+        messages: List[Dict],
+        on_tool_use: Optional[ToolUseCallback] = None,
+        on_text: Optional[TextCallback] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Send a conversation to the model, reporting output as it is generated.
+
+        The default implementation does not stream: it makes a regular call
+        and reports the blocks of the complete response.
+
+        Args:
+            messages: Conversation history in Messages API format
+            on_tool_use: Called with each tool_use block once its input is complete
+            on_text: Called with each chunk of generated text
+            **kwargs: Extra request parameters (tools, tool_choice, system, ...)
+
+        Returns:
+            Any: The complete message, as returned by create_message
+        """
+        response = await self.create_message(messages, **kwargs)
+        for block in response.content:
+            if block.type == "tool_use" and on_tool_use:
+                on_tool_use(block)
+            elif block.type == "text" and on_text:
+                on_text(block.text)
+        return response
+
+    def classify_error(self, error: BaseException) -> Optional[str]:
+        """
+        Classify a failed model call for the retry policy.
+
+        Args:
+            error: Exception raised by create_message
+
+        Returns:
+            Optional[str]: Retry reason, or None if the error is not transient
+        """
+        return classify_error(error)
+
+    async def close(self):
+        """Release any resources held by the client."""
+
+
+class AnthropicLLMClient(LLMClient):
+    """
+    LLM client backed by the native async Anthropic SDK client.
+    """
+
+    def __init__(self, api_key: str, model: str = DEFAULT_MODEL, max_tokens: int = DEFAULT_MAX_TOKENS):
+        """
+        Initialize the Anthropic client.
+
+        Args:
+            api_key: Anthropic API key
+            model: Default model identifier
+            max_tokens: Default maximum output tokens
+        """
+        super().__init__(model, max_tokens)
+        # Retries are left to the shared retry policy so they count against its budget
+        self.client = AsyncAnthropic(api_key=api_key, max_retries=0)
+
+    async def create_message(self, messages: List[Dict], **kwargs) -> Any:
+        """Send the conversation to Claude without blocking the event loop."""
+        kwargs.setdefault("model", self.model)
+        kwargs.setdefault("max_tokens", self.max_tokens)
+        return await self.client.messages.create(messages=messages, **kwargs)
+
+    async def stream_message(
+        self,
+        messages: List[Dict],
+        on_tool_use: Optional[ToolUseCallback] = None,
+        on_text: Optional[TextCallback] = None,
+        **kwargs
+    ) -> Any:
+        """Stream the response, reporting tool_use blocks as each one's input JSON completes."""
+        kwargs.setdefault("model", self.model)
+        kwargs.setdefault("max_tokens", self.max_tokens)
+        async with self.client.messages.stream(messages=messages, **kwargs) as stream:
+            async for event in stream:
+                if event.type == "text" and on_text:
+                    on_text(event.text)
+                elif event.type == "content_block_stop" and event.content_block.type == "tool_use" and on_tool_use:
+                    on_tool_use(event.content_block)
+            return await stream.get_final_message()
+
+    def classify_error(self, error: BaseException) -> Optional[str]:
+        """Classify SDK connection errors, which carry no status code; other errors by status."""
+        if isinstance(error, APITimeoutError):
+            return TIMEOUT
+        if isinstance(error, APIConnectionError):
+            return CONNECTION
+        return classify_error(error)
+
+    async def close(self):
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
+
+
+@dataclass
+class StubTextBlock:
+    """Text content block returned by the stub backend."""
+    text: str
+    type: str = "text"
+
+
+@dataclass
+class StubToolUseBlock:
+    """Tool use content block returned by the stub backend."""
+    id: str
+    name: str
+    input: Dict[str, Any]
+    type: str = "tool_use"
+
+
+@dataclass
+class StubUsage:
+    """Token usage reported by the stub backend."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class StubMessage:
+    """Message returned by the stub backend."""
+    content: List[Any]
+    stop_reason: str
+    usage: StubUsage = field(default_factory=StubUsage)
+
+
+class StubLLMClient(LLMClient):
+    """
+    Local model stand-in for offline benchmarking.
+
+    The stub sleeps for a configurable latency (without blocking the loop),
+    requests a fixed number of tools for a fixed number of turns, then
+    returns a canned final analysis. Tool selection is deterministic: tools
+    are taken round-robin from the catalog passed in the request.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        tool_turns: int = 3,
+        tools_per_turn: int = 2,
+        model: str = "stub",
+        max_tokens: int = DEFAULT_MAX_TOKENS
+    ):
+        """
+        Initialize the stub backend.
+
+        Args:
+            latency: Simulated model round-trip time in seconds
+            tool_turns: Number of turns that request tools before answering
+            tools_per_turn: Number of tool_use blocks emitted per tool turn
+            model: Reported model identifier
+            max_tokens: Ignored, kept for interface parity
+        """
+        super().__init__(model, max_tokens)
+        self.latency = latency
+        self.tool_turns = tool_turns
+        self.tools_per_turn = tools_per_turn
+        self._call_ids = itertools.count(1)
+
+    async def create_message(self, messages: List[Dict], **kwargs) -> StubMessage:
+        """Return a deterministic response based on how far the conversation has progressed."""
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs)
+
+    def _respond(self, messages: List[Dict], kwargs: Dict[str, Any]) -> StubMessage:
+        """Build the response for the current turn of the conversation."""
+        turn = sum(1 for message in messages if message.get("role") == "assistant")
+        tools = kwargs.get("tools") or []
+        if (kwargs.get("tool_choice") or {}).get("type") == "none":
+            tools = []
+        input_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+
+        if turn < self.tool_turns and tools:
+            blocks = []
+            for offset in range(self.tools_per_turn):
+                tool = tools[(turn * self.tools_per_turn + offset) % len(tools)]
+                blocks.append(StubToolUseBlock(
+                    id=f"toolu_stub_{next(self._call_ids)}",
+                    name=tool["name"],
+                    input=self._fill_arguments(tool.get("input_schema", {}))
+                ))
+            return StubMessage(
+                content=blocks,
+                stop_reason="tool_use",
+                usage=StubUsage(input_tokens=input_tokens, output_tokens=50 * len(blocks))
+            )
+
+        return StubMessage(
+            content=[StubTextBlock(text=f"## 🔍 **ROOT CAUSE ANALYSIS**\nStub analysis after {turn} tool turns.")],
+            stop_reason="end_turn",
+            usage=StubUsage(input_tokens=input_tokens, output_tokens=200)
+        )
+
+    async def stream_message(
+        self,
+        messages: List[Dict],
+        on_tool_use: Optional[ToolUseCallback] = None,
+        on_text: Optional[TextCallback] = None,
+        **kwargs
+    ) -> StubMessage:
+        """Simulate streaming: the latency is spread evenly over the response's blocks."""
+        response = self._respond(messages, kwargs)
+        for block in response.content:
+            await asyncio.sleep(self.latency / len(response.content))
+            if block.type == "tool_use" and on_tool_use:
+                on_tool_use(block)
+            elif block.type == "text" and on_text:
+                on_text(block.text)
+        return response
+
+    @staticmethod
+    def _fill_arguments(schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Build placeholder arguments satisfying the required fields of a JSON schema."""
+        arguments = {}
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            prop_type = properties.get(name, {}).get("type", "string")
+            if prop_type == "array":
+                arguments[name] = []
+            elif prop_type in ("integer", "number"):
+                arguments[name] = 0
+            elif prop_type == "boolean":
+                arguments[name] = False
+            elif prop_type == "object":
+                arguments[name] = {}
+            else:
+                enum = properties.get(name, {}).get("enum")
+                arguments[name] = enum[0] if enum else "stub"
+        return arguments
+
+
+def create_llm_client() -> LLMClient:
+    """
+    Build the LLM client selected by environment configuration.
+
+    Environment variables:
+    - LLM_BACKEND: "anthropic" (default) or "stub"
+    - CLAUDE_MODEL / CLAUDE_MAX_TOKENS: generation defaults
+    - STUB_LLM_LATENCY_MS / STUB_LLM_TOOL_TURNS / STUB_LLM_TOOLS_PER_TURN: stub settings
+
+    Returns:
+        LLMClient: Configured client instance
+    """
+    backend = os.environ.get('LLM_BACKEND', 'anthropic').lower()
+    model = os.environ.get('CLAUDE_MODEL', DEFAULT_MODEL)
+    max_tokens = int(os.environ.get('CLAUDE_MAX_TOKENS', DEFAULT_MAX_TOKENS))
+
+    if backend == "stub":
+        logger.info("Using stub LLM backend")
+        return StubLLMClient(
+            latency=float(os.environ.get('STUB_LLM_LATENCY_MS', 500)) / 1000,
+            tool_turns=int(os.environ.get('STUB_LLM_TOOL_TURNS', 3)),
+            tools_per_turn=int(os.environ.get('STUB_LLM_TOOLS_PER_TURN', 2))
+        )
+
+    if backend != "anthropic":
+        raise ValueError(f"Unknown LLM backend: {backend}")
+
+    return AnthropicLLMClient(
+        api_key=os.environ['ANTHROPIC_API_KEY'],
+        model=model,
+        max_tokens=max_tokens
+    )
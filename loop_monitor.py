@@ -0,0 +1,163 @@
+"""
+Event-loop lag monitor and slow-callback detector.
+
+A sampler task sleeps for a fixed interval and measures how late it wakes
+up; the delay is the time the loop spent running other callbacks, and is
+recorded as the event-loop lag metric. Every wakeup is also a heartbeat: a
+watchdog thread checks it and, when the loop has not come back for longer
+than the slow-callback threshold, logs the stack of the loop thread while
+it is still blocked, which points at the blocking code itself.
+
+Both parts cost one timer per interval and one thread wakeup per check, so
+they are meant to stay on in production.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Any, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Frames of the blocked stack included in the log message and in stats
+STACK_LIMIT = 25
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and captures the stack of callbacks that block the loop.
+    """
+
+    def __init__(self, interval: float = 0.25, slow_callback_threshold: Optional[float] = 0.5, window: int = 240):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between lag samples
+            slow_callback_threshold: Blocking time (seconds) after which the loop's stack is logged; None disables the watchdog
+            window: Number of recent samples kept for stats
+        """
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self._lags = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._slow_callbacks = 0
+        self._last_slow_callback: Optional[Dict[str, Any]] = None
+
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitor":
+        """
+        Build a monitor from environment configuration.
+
+        Environment variables (all optional): LOOP_LAG_INTERVAL,
+        SLOW_CALLBACK_THRESHOLD (0 disables the watchdog)
+
+        Returns:
+            LoopMonitor: Configured monitor
+        """
+        threshold = float(os.environ.get('SLOW_CALLBACK_THRESHOLD', 0.5))
+        return cls(
+            interval=float(os.environ.get('LOOP_LAG_INTERVAL', 0.25)),
+            slow_callback_threshold=threshold if threshold > 0 else None
+        )
+
+    def start(self):
+        """Start sampling on the running loop and, if enabled, the watchdog thread."""
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample_loop(), name="loop-monitor")
+
+        if self.slow_callback_threshold is not None:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop sampling and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample_loop(self):
+        """Measure how late each timer fires."""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - expected)
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            metrics.loop_lag_seconds.observe(lag)
+
+    def _watch(self):
+        """Watchdog thread: log the loop thread's stack when the heartbeat stalls."""
+        check_interval = min(self.interval, self.slow_callback_threshold / 2)
+        reported_heartbeat = None
+
+        while not self._stopped.wait(check_interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.slow_callback_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report each stall once, while it is still in progress
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else "<unavailable>\n"
+
+            self._slow_callbacks += 1
+            self._last_slow_callback = {
+                "blocked_seconds": round(blocked, 3),
+                "at": time.time(),
+                "stack": stack
+            }
+            metrics.slow_callbacks.inc()
+            logger.warning(f"Event loop blocked for {blocked:.2f}s so far; running callback stack:\n{stack}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of loop health.
+
+        Returns:
+            Dict: Recent lag (last/p50/p99/max), slow-callback count and the last captured stack
+        """
+        lags = sorted(self._lags)
+
+        def percentile(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))], 4) if lags else 0.0
+
+        return {
+            "interval": self.interval,
+            "slow_callback_threshold": self.slow_callback_threshold,
+            "lag_seconds": {
+                "last": round(self._lags[-1], 4) if self._lags else 0.0,
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": round(self._max_lag, 4)
+            },
+            "slow_callbacks": self._slow_callbacks,
+            "last_slow_callback": self._last_slow_callback
+        }
@@ -8,14 +8,23 @@ import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Dict, Any
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
 from autonomous_incident_agent import AutonomousIncidentAgent
+from incident_queue import IncidentQueue, QueueFullError, QueueClosedError
+from alert_dedup import AlertDeduplicator, NEW, DUPLICATE, COALESCED
+from job_store import JobStore, create_job_store
+from lease_worker import LeaseWorker
+from loop_monitor import LoopMonitor
+from metrics import CONTENT_TYPE_LATEST, metrics
+import json_codec
+import tracing
 
 # Configure logging
 logging.basicConfig(
@@ -34,19 +43,58 @@ app = FastAPI(
 # Global agent instance (initialized on startup)
 agent: AutonomousIncidentAgent = None
 
+# Global incident queue (started on startup, drained on shutdown)
+incident_queue: IncidentQueue = None
+
+# Durable record of accepted alerts and investigation checkpoints (None if disabled)
+job_store: JobStore = None
+
+# Pulls jobs from the job store (None without a job store)
+lease_worker: LeaseWorker = None
+
+# Event-loop lag sampler and slow-callback watchdog
+loop_monitor = LoopMonitor.from_env()
+
+# Drops re-delivered webhooks and coalesces alert bursts on the same entity
+deduplicator = AlertDeduplicator(
+    dedup_ttl=float(os.getenv("WEBHOOK_DEDUP_TTL", 3600)),
+    coalesce_window=float(os.getenv("ALERT_COALESCE_WINDOW", 300))
+)
+
 @app.on_event("startup")
 async def startup_event():
     """
     Initialize the agent and MCP connections on application startup.
     This ensures all MCP servers are ready before processing webhooks.
+    With a job store, investigations are pulled from it, including those
+    left unfinished by a previous process.
     """
-    global agent
+    global agent, incident_queue, job_store, lease_worker
     logger.info("Initializing Autonomous Incident Agent...")
+    loop_monitor.start()
     
     try:
-        agent = AutonomousIncidentAgent()
+        job_store = create_job_store()
+        
+        agent = AutonomousIncidentAgent(job_store=job_store)
         await agent.initialize()
         logger.info("Agent initialized successfully")
+        
+        # Start the worker pool that runs investigations
+        incident_queue = IncidentQueue(
+            run_incident,
+            workers=int(os.getenv("INCIDENT_WORKERS", 4)),
+            max_depth=int(os.getenv("INCIDENT_QUEUE_MAX_DEPTH", 100))
+        )
+        incident_queue.start()
+        
+        if job_store:
+            pruned = await job_store.prune(older_than=float(os.getenv("JOB_RETENTION_SECONDS", 7 * 24 * 3600)))
+            if pruned:
+                logger.info(f"Pruned {pruned} finished jobs")
+            
+            lease_worker = LeaseWorker.from_env(job_store, incident_queue)
+            lease_worker.start()
     except Exception as e:
         logger.error(f"Failed to initialize agent: {str(e)}")
         raise e
@@ -54,13 +102,26 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """
-    Clean shutdown of MCP connections and resources.
+    Drain pending investigations, then shut down MCP connections and resources.
     """
     global agent
+    if incident_queue:
+        await incident_queue.drain(timeout=float(os.getenv("INCIDENT_DRAIN_TIMEOUT", 25)))
+    
+    # Hand unfinished jobs back to the store for the next process
+    if lease_worker:
+        await lease_worker.stop()
+    
     if agent:
         logger.info("Shutting down agent...")
         await agent.shutdown()
         logger.info("Agent shutdown complete")
+    
+    if job_store:
+        await job_store.close()
+    
+    await tracing.shutdown()
+    await loop_monitor.stop()
 
 @app.post("/webhook/opsgenie")
 async def handle_opsgenie_webhook(request: Request):
@@ -69,6 +130,7 @@ async def handle_opsgenie_webhook(request: Request):
     
     Expected payload structure from OpsGenie:
     {
+        "action": "string",
         "alert": {
             "alertId": "string",
             "message": "string", 
@@ -84,10 +146,13 @@ async def handle_opsgenie_webhook(request: Request):
     Returns:
         JSONResponse: Processing status and basic info
     """
+    started = time.monotonic()
+    outcome = "rejected"
+    
     try:
         # Parse webhook payload
         body = await request.body()
-        webhook_data = json.loads(body.decode('utf-8'))
+        webhook_data = json_codec.loads(body)
         
         # Validate webhook structure
         if 'alert' not in webhook_data:
@@ -113,31 +178,116 @@ async def handle_opsgenie_webhook(request: Request):
                 detail=f"Missing required fields: {missing_fields}"
             )
         
-        # Process the incident asynchronously
-        # We return immediately to acknowledge the webhook
-        asyncio.create_task(process_incident_async(alert_data))
+        if incident_queue is None:
+            raise HTTPException(status_code=503, detail="Incident queue not initialized")
         
+        # Drop re-deliveries and fold alerts on an already-investigated entity
+        action = webhook_data.get('action', 'Create')
+        decision = deduplicator.check(alert_data, action)
+        
+        if decision.status == COALESCED and decision.related and job_store:
+            await job_store.add_related_alert(decision.primary_alert_id, decision.related)
+        
+        if decision.status != NEW:
+            outcome = decision.status
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "status": decision.status,
+                    "alert_id": alert_id,
+                    "primary_alert_id": decision.primary_alert_id,
+                    "timestamp": datetime.now().isoformat()
+                }
+            )
+        
+        # Stamp receipt so time-to-first-note covers queueing as well
+        alert_data['receivedAt'] = time.time()
+        
+        if job_store:
+            # Record the job for the lease worker to claim
+            # We return immediately to acknowledge the webhook
+            if not incident_queue.accepting:
+                raise HTTPException(status_code=503, detail="Incident queue is not accepting work")
+            
+            # Shed load on the store backlog, as the local queue does without a store
+            backlog = await job_store.backlog()
+            if backlog >= incident_queue.max_depth:
+                logger.warning(f"Shedding alert {alert_id}: job backlog is full ({backlog} pending)")
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Job backlog is full ({backlog} pending)",
+                    headers={"Retry-After": "30"}
+                )
+            
+            if not await job_store.create_job(alert_data):
+                logger.info(f"Alert {alert_id} already has an unfinished investigation")
+                outcome = DUPLICATE
+                return JSONResponse(
+                    status_code=200,
+                    content={
+                        "status": DUPLICATE,
+                        "alert_id": alert_id,
+                        "primary_alert_id": alert_id,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                )
+            lease_worker.notify()
+            queue_depth = backlog + 1
+        else:
+            # Queue the incident for a worker
+            # We return immediately to acknowledge the webhook
+            try:
+                queue_depth = incident_queue.submit(alert_data)
+            except QueueFullError as e:
+                logger.warning(f"Shedding alert {alert_id}: {str(e)}")
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+            except QueueClosedError as e:
+                logger.warning(f"Rejecting alert {alert_id}: {str(e)}")
+                raise HTTPException(status_code=503, detail=str(e))
+        
+        deduplicator.record(alert_data, action)
+        
+        outcome = "accepted"
         return JSONResponse(
             status_code=200,
             content={
                 "status": "accepted",
                 "alert_id": alert_id,
-                "message": "Incident analysis started",
+                "message": "Incident analysis queued",
+                "queue_depth": queue_depth,
                 "timestamp": datetime.now().isoformat()
             }
         )
         
+    except HTTPException:
+        raise
     except json.JSONDecodeError:
         logger.error("Failed to parse webhook JSON")
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
+        outcome = "error"
+        metrics.errors["webhook"].inc()
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        metrics.webhook_seconds[outcome].observe(time.monotonic() - started)
+
+async def run_incident(alert_data: Dict[str, Any]):
+    """
+    Incident queue handler: process the alert, under its lease when jobs come from the job store.
+    
+    Args:
+        alert_data: Alert information from OpsGenie webhook
+    """
+    if lease_worker:
+        await lease_worker.run(alert_data, process_incident_async)
+    else:
+        await process_incident_async(alert_data)
 
 async def process_incident_async(alert_data: Dict[str, Any]):
     """
     Asynchronously process the incident using the autonomous agent.
-    This function runs in the background to avoid blocking the webhook response.
+    This function runs on an incident queue worker, outside the webhook request.
     
     Args:
         alert_data: Alert information from OpsGenie webhook
@@ -153,8 +303,33 @@ async def process_incident_async(alert_data: Dict[str, Any]):
         logger.info(f"Analysis completed for alert: {alert_id}")
         logger.debug(f"Analysis result preview: {analysis_result[:200]}...")
         
+        # Stop coalescing into this investigation before collecting its coalesced alerts,
+        # so later alerts on the entity start their own investigation instead of going unnoticed
+        deduplicator.complete(alert_data)
+        
+        # Share the analysis with alerts that were coalesced into this investigation,
+        # including those recorded in the job store before a restart
+        related_alerts = alert_data.get('coalescedAlerts', [])
+        if job_store:
+            try:
+                job = await job_store.get_job(alert_id)
+                if job is not None:
+                    related_alerts = job.alert_data.get('coalescedAlerts', [])
+            except Exception as store_error:
+                logger.error(f"Failed to load coalesced alerts of job {alert_id}: {str(store_error)}")
+        
+        for related in related_alerts:
+            try:
+                await agent.update_opsgenie_ticket(
+                    related['alertId'],
+                    f"🔗 **Coalesced into investigation of alert {alert_id}**\n\n{analysis_result}"
+                )
+            except Exception as notify_error:
+                logger.error(f"Failed to update coalesced alert {related['alertId']}: {str(notify_error)}")
+        
     except Exception as e:
         logger.error(f"Error in async incident processing for alert {alert_id}: {str(e)}")
+        deduplicator.complete(alert_data)
         
         # Try to notify OpsGenie about the analysis failure
         try:
@@ -165,10 +340,45 @@ async def process_incident_async(alert_data: Dict[str, Any]):
         except Exception as notify_error:
             logger.error(f"Failed to notify OpsGenie about analysis error: {str(notify_error)}")
 
+@app.get("/livez")
+async def liveness_check():
+    """
+    Liveness probe: the process is up and its event loop is serving requests.
+    
+    Deliberately independent of MCP server health, so a slow or failing
+    dependency cannot get the orchestrator pod restarted.
+    """
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe served from the health monitor's cache.
+    
+    Returns:
+        JSONResponse: 200 when the agent is initialized, accepting work and
+        all MCP servers were recently probed healthy; 503 otherwise
+    """
+    if agent is None or not agent.initialized:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "reason": "Agent not initialized"})
+    
+    if incident_queue is None or not incident_queue.accepting:
+        return JSONResponse(status_code=503, content={"status": "not_ready", "reason": "Not accepting incidents"})
+    
+    health_status = await agent.check_health()
+    if not health_status["healthy"]:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not_ready", "reason": "MCP server connection issues", "details": health_status["servers"]}
+        )
+    
+    return {"status": "ready"}
+
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint for Kubernetes liveness/readiness probes.
+    Detailed health status, served from the background health monitor's
+    cache. Kubernetes probes should use /livez and /readyz instead.
     
     Returns:
         JSONResponse: Health status of the application and MCP connections
@@ -216,6 +426,38 @@ async def health_check():
             }
         )
 
+@app.get("/stats")
+async def stats():
+    """
+    Runtime statistics for monitoring: token usage, queue depth, wait times,
+    worker utilization, webhook deduplication counters and job counts.
+    
+    Returns:
+        Dict: Current statistics snapshot
+    """
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "agent": agent.get_stats() if agent else None,
+        "queue": incident_queue.stats() if incident_queue else None,
+        "dedup": deduplicator.stats(),
+        "jobs": await job_store.stats() if job_store else None,
+        "leases": lease_worker.stats() if lease_worker else None,
+        "event_loop": loop_monitor.stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint.
+    
+    Returns:
+        Response: Metrics in the Prometheus text format, or 503 if metrics are disabled
+    """
+    payload = metrics.render()
+    if payload is None:
+        raise HTTPException(status_code=503, detail="Metrics are disabled")
+    return Response(content=payload, media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root():
     """
@@ -227,7 +469,11 @@ async def root():
         "status": "running",
         "endpoints": {
             "webhook": "/webhook/opsgenie",
-            "health": "/health"
+            "health": "/health",
+            "liveness": "/livez",
+            "readiness": "/readyz",
+            "stats": "/stats",
+            "metrics": "/metrics"
         }
     }
 
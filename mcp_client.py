@@ -2,38 +2,310 @@
 MCP Client implementation for communicating with MCP servers.
 
 This module provides a client for connecting to and communicating with
-Model Context Protocol (MCP) servers over HTTP/WebSocket connections.
+Model Context Protocol (MCP) servers over HTTP. Two transports are supported:
+the MCP streamable-HTTP mode (persistent session id, JSON or SSE responses)
+and plain JSON-RPC POSTs, which is used as a fallback.
 """
 
 import asyncio
-import json
 import logging
+import os
+import time
 import aiohttp
-from typing import Dict, List, Any, Optional
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Tuple, Union
 from urllib.parse import urljoin
 
+from resilience import CallTimeoutError, CircuitBreaker, CircuitOpenError, LatencyTracker, RetryPolicy
+from tool_cache import READ_PREFIXES, ToolResultCache
+import json_codec
+from tracing import get_tracer, inject
+
 logger = logging.getLogger(__name__)
+tracer = get_tracer("incident-agent")
+
+# A single JSON-RPC message or a batch of them
+JSONRPCPayload = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+SESSION_HEADER = "Mcp-Session-Id"
+PROTOCOL_VERSION_HEADER = "MCP-Protocol-Version"
+
+
+class SessionExpiredError(Exception):
+    """Raised when the server no longer recognizes the transport's session id."""
+
+
+class MCPHTTPError(Exception):
+    """Raised when an MCP server answers with a non-success HTTP status."""
+
+    def __init__(self, status: int, body: str, retry_after: Optional[str] = None):
+        """
+        Initialize the error.
+
+        Args:
+            status: HTTP status code
+            body: Response body text
+            retry_after: Retry-After header value, if the server sent one
+        """
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @classmethod
+    async def from_response(cls, response: aiohttp.ClientResponse) -> "MCPHTTPError":
+        """Build the error from a failed response."""
+        return cls(response.status, await response.text(), response.headers.get("Retry-After"))
+
+
+class MCPTransport(ABC):
+    """
+    Carries JSON-RPC messages between the client and one MCP server.
+    """
+
+    name = "base"
+
+    def __init__(self, session: aiohttp.ClientSession, url: str):
+        """
+        Initialize the transport.
+
+        Args:
+            session: Shared aiohttp session (keep-alive connection pool)
+            url: MCP endpoint URL of the server
+        """
+        self.session = session
+        self.url = url
+
+    @abstractmethod
+    async def send(self, message: JSONRPCPayload) -> JSONRPCPayload:
+        """
+        Send a JSON-RPC request (or batch) and return the matching response.
+
+        Args:
+            message: JSON-RPC request, or a list of requests for a batch
+
+        Returns:
+            JSONRPCPayload: JSON-RPC response, or a list of responses for a batch
+
+        Raises:
+            Exception: If the request fails at the HTTP level
+        """
+
+    async def initialize(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Perform the MCP initialize exchange over this transport.
+
+        Args:
+            message: JSON-RPC initialize request
+
+        Returns:
+            Dict: JSON-RPC initialize response
+        """
+        return await self.send(message)
+
+    async def close(self):
+        """Release any server-side state held by the transport."""
+
+
+class HTTPPostTransport(MCPTransport):
+    """
+    Plain JSON-RPC over HTTP: every message is an independent POST whose body
+    is the JSON response.
+    """
+
+    name = "http"
+
+    async def send(self, message: JSONRPCPayload) -> JSONRPCPayload:
+        """Send the request as a single POST and parse the JSON body."""
+        async with self.session.post(self.url, json=message, headers=inject({})) as response:
+            if response.status != 200:
+                raise await MCPHTTPError.from_response(response)
+            
+            return json_codec.loads(await response.read())
+
+
+class StreamableHTTPTransport(MCPTransport):
+    """
+    MCP streamable-HTTP transport.
+
+    The server assigns a session id on initialize, which is sent with every
+    later request so the server can keep per-client state. Responses are
+    either plain JSON or an SSE stream carrying the JSON-RPC response. All
+    requests share the client's keep-alive connection pool, so concurrent
+    calls reuse established connections instead of paying connection setup.
+    """
+
+    name = "streamable-http"
+
+    def __init__(self, session: aiohttp.ClientSession, url: str):
+        super().__init__(session, url)
+        self.session_id: Optional[str] = None
+        self.protocol_version: Optional[str] = None
+        self._init_message: Optional[Dict[str, Any]] = None
+        self._reinitialize_lock = asyncio.Lock()
+
+    def _headers(self) -> Dict[str, str]:
+        """Headers carrying the session, negotiated protocol version and trace context."""
+        headers = {"Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers[SESSION_HEADER] = self.session_id
+        if self.protocol_version:
+            headers[PROTOCOL_VERSION_HEADER] = self.protocol_version
+        return inject(headers)
+
+    async def initialize(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Open a session: initialize, store the session id, confirm with notifications/initialized."""
+        self._init_message = message
+        self.session_id = None
+        self.protocol_version = None
+
+        response = await self._post(message)
+        self.protocol_version = response.get("result", {}).get("protocolVersion")
+
+        if "error" not in response:
+            await self._notify("notifications/initialized")
+
+        return response
+
+    async def send(self, message: JSONRPCPayload) -> JSONRPCPayload:
+        """Send a request within the session, re-initializing once if the server dropped it."""
+        session_id = self.session_id
+        try:
+            return await self._post(message)
+        except SessionExpiredError:
+            async with self._reinitialize_lock:
+                # Another request may already have re-opened the session
+                if self.session_id == session_id and self._init_message is not None:
+                    logger.info(f"MCP session at {self.url} expired; re-initializing")
+                    await self.initialize(self._init_message)
+            return await self._post(message)
+
+    async def _post(self, message: JSONRPCPayload) -> JSONRPCPayload:
+        """POST one message (or batch) and read the JSON or SSE response."""
+        async with self.session.post(self.url, json=message, headers=self._headers()) as response:
+            if response.status == 404 and self.session_id:
+                raise SessionExpiredError(f"Session {self.session_id} not found")
+            if response.status != 200:
+                raise await MCPHTTPError.from_response(response)
+
+            if response.headers.get(SESSION_HEADER):
+                self.session_id = response.headers[SESSION_HEADER]
+
+            if response.content_type == "text/event-stream":
+                if isinstance(message, list):
+                    return await self._read_sse_responses(response, [entry.get("id") for entry in message if "id" in entry])
+                return (await self._read_sse_responses(response, [message.get("id")]))[0]
+
+            return json_codec.loads(await response.read())
+
+    async def _read_sse_responses(self, response: aiohttp.ClientResponse, request_ids: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Read SSE events until a JSON-RPC response has arrived for every request id.
+
+        Events may carry a single message or a batch. Server-initiated requests
+        and notifications interleaved on the stream are skipped.
+
+        Returns:
+            List[Dict]: Responses in the order of `request_ids`
+        """
+        pending = set(request_ids)
+        responses: Dict[Any, Dict[str, Any]] = {}
+        data_lines: List[str] = []
+
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+                continue
+            if line or not data_lines:
+                continue
+
+            # Blank line: end of event
+            event = json_codec.loads("\n".join(data_lines))
+            data_lines = []
+            for entry in event if isinstance(event, list) else [event]:
+                if isinstance(entry, dict) and entry.get("id") in pending and ("result" in entry or "error" in entry):
+                    pending.discard(entry["id"])
+                    responses[entry["id"]] = entry
+                else:
+                    logger.debug(f"Skipping unsolicited SSE message from {self.url}: {entry.get('method') if isinstance(entry, dict) else entry}")
+
+            if not pending:
+                return [responses[request_id] for request_id in request_ids]
+
+        raise Exception(f"SSE stream from {self.url} ended without responses to requests {sorted(pending, key=str)}")
+
+    async def _notify(self, method: str):
+        """Send a JSON-RPC notification; the server answers 202 without a body."""
+        notification = {"jsonrpc": "2.0", "method": method}
+        async with self.session.post(self.url, json=notification, headers=self._headers()) as response:
+            if response.status >= 400:
+                logger.debug(f"Notification {method} to {self.url} returned HTTP {response.status}")
+
+    async def close(self):
+        """Terminate the server-side session."""
+        if not self.session_id or self.session.closed:
+            return
+        try:
+            async with self.session.delete(self.url, headers=self._headers()) as response:
+                logger.debug(f"Closed MCP session {self.session_id} (HTTP {response.status})")
+        except Exception as e:
+            logger.debug(f"Failed to close MCP session {self.session_id}: {str(e)}")
+        self.session_id = None
+
+
+TRANSPORTS = {
+    HTTPPostTransport.name: HTTPPostTransport,
+    StreamableHTTPTransport.name: StreamableHTTPTransport
+}
 
 class MCPClient:
     """
     Client for communicating with MCP (Model Context Protocol) servers.
     
     Supports HTTP-based communication with MCP servers, handling connection
-    management, tool discovery, and tool execution.
+    management, tool discovery, and tool execution. Requests to each server
+    pass through a per-server circuit breaker and get a timeout budget
+    derived from the observed latency of that server and method/tool.
+    Transient failures are retried under a shared retry policy; tools that
+    may have side effects are only retried when the server rate-limited the
+    request.
     """
     
-    def __init__(self):
-        """Initialize the MCP client with empty server connections."""
+    def __init__(
+        self,
+        default_transport: Optional[str] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        Initialize the MCP client with empty server connections.
+        
+        Args:
+            default_transport: "auto" (default), "streamable-http" or "http";
+                falls back to the MCP_TRANSPORT environment variable
+            tool_cache: Optional cache placed in front of tool calls
+            retry_policy: Retry policy, shared with other callers to share its
+                retry budget; built from environment if omitted
+        """
         self.connected_servers: Dict[str, Dict] = {}
         self.session: Optional[aiohttp.ClientSession] = None
         self._request_id_counter = 0
+        self.default_transport = default_transport or os.environ.get('MCP_TRANSPORT', 'auto')
+        self.tool_cache = tool_cache
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self._tool_annotations: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.latency = LatencyTracker.from_env()
+        self._breakers: Dict[str, CircuitBreaker] = {}
 
     async def _ensure_session(self):
         """Ensure aiohttp session is created and available."""
         if self.session is None or self.session.closed:
-            # Configure session with reasonable timeouts
-            timeout = aiohttp.ClientTimeout(total=60, connect=10)
-            connector = aiohttp.TCPConnector(limit=100, limit_per_host=30)
+            # Connections are kept alive between calls so tool calls reuse
+            # established connections. Overall request time is bounded per call
+            # by adaptive budgets; the read timeout is only a backstop
+            timeout = aiohttp.ClientTimeout(total=None, connect=10, sock_read=self.latency.max_timeout)
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=30, keepalive_timeout=120)
             
             self.session = aiohttp.ClientSession(
                 timeout=timeout,
@@ -41,54 +313,169 @@ class MCPClient:
                 headers={
                     "Content-Type": "application/json",
                     "User-Agent": "AutonomousIncidentAgent/1.0.0"
-                }
+                },
+                json_serialize=json_codec.dumps
             )
+            
+            # Point existing transports at the new connection pool
+            for server_info in self.connected_servers.values():
+                server_info["transport"].session = self.session
+
+    def _breaker(self, server_name: str) -> CircuitBreaker:
+        """Circuit breaker of a server, created on first use and kept across reconnects."""
+        breaker = self._breakers.get(server_name)
+        if breaker is None:
+            breaker = self._breakers[server_name] = CircuitBreaker.from_env(server_name)
+        return breaker
+
+    async def _send_guarded(
+        self,
+        server_name: str,
+        message: JSONRPCPayload,
+        latency_keys: List[Tuple[str, str]]
+    ) -> JSONRPCPayload:
+        """
+        Send a request through the server's circuit breaker with an adaptive timeout.
+        
+        The timeout is the largest budget among `latency_keys`; on success the
+        elapsed time is recorded against each of them. Transport failures, 5xx
+        responses and timeouts count against the breaker. 4xx and JSON-RPC error
+        responses do not, since they mean the server is up and answering.
+        
+        Args:
+            server_name: Name of the connected server
+            message: JSON-RPC request or batch
+            latency_keys: (server, method or tool) keys the request covers
+            
+        Returns:
+            JSONRPCPayload: Response from the transport
+            
+        Raises:
+            CircuitOpenError: If the server's breaker is open
+            CallTimeoutError: If the request exceeds its budget
+        """
+        breaker = self._breaker(server_name)
+        breaker.allow()
+        
+        timeout = max(self.latency.timeout_for(key) for key in latency_keys)
+        started = time.monotonic()
+        
+        try:
+            response = await asyncio.wait_for(self.connected_servers[server_name]["transport"].send(message), timeout)
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            raise CallTimeoutError(
+                f"Request to server '{server_name}' timed out after {timeout:.1f}s", timeout
+            ) from None
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            # A 4xx (including 429) means the server is up and answering
+            if isinstance(e, MCPHTTPError) and e.status < 500:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            raise
+        
+        breaker.record_success()
+        elapsed = time.monotonic() - started
+        for key in latency_keys:
+            self.latency.record(key, elapsed)
+        return response
+
+    def get_circuit_state(self, server_name: str) -> Dict[str, Any]:
+        """
+        Circuit breaker state and current timeout budgets of a server.
+        
+        Args:
+            server_name: Name of the server
+            
+        Returns:
+            Dict: Breaker snapshot plus learned per-tool timeouts in seconds
+        """
+        state = self._breaker(server_name).snapshot()
+        state["timeouts"] = {
+            name: round(self.latency.timeout_for((server, name)), 2)
+            for server, name in self.latency.keys()
+            if server == server_name
+        }
+        return state
+
+    def is_idempotent(self, server_name: str, tool_name: str) -> bool:
+        """
+        Whether a tool call may safely be repeated.
+        
+        Uses the readOnlyHint / idempotentHint tool annotations; tools without
+        annotations count as idempotent only if their name reads like a query.
+        """
+        annotations = self._tool_annotations.get((server_name, tool_name), {})
+        if annotations.get("readOnlyHint") is True or annotations.get("idempotentHint") is True:
+            return True
+        if "readOnlyHint" in annotations or "idempotentHint" in annotations or "destructiveHint" in annotations:
+            return False
+        return tool_name.startswith(READ_PREFIXES)
+
+    def is_read_only(self, server_name: str, tool_name: str) -> bool:
+        """
+        Whether a tool declares that it has no side effects (readOnlyHint).
+        
+        Unlike is_idempotent, tools without annotations never count as read-only.
+        """
+        return self._tool_annotations.get((server_name, tool_name), {}).get("readOnlyHint") is True
 
     def _get_next_request_id(self) -> int:
         """Generate unique request ID for MCP protocol messages."""
         self._request_id_counter += 1
         return self._request_id_counter
 
-    async def connect_server(self, server_name: str, server_url: str):
+    async def connect_server(self, server_name: str, server_url: str, transport: Optional[str] = None):
         """
         Connect to an MCP server and perform initialization handshake.
         
+        With the "auto" transport the streamable-HTTP session mode is tried
+        first and plain POST is used if the server rejects it.
+        
         Args:
             server_name: Identifier for this server connection
             server_url: Base URL of the MCP server
+            transport: Transport name; defaults to the client's default transport
             
         Raises:
             Exception: If connection or initialization fails
         """
+        await self.retry_policy.run(
+            f"connect to '{server_name}'",
+            lambda: self._connect_server_once(server_name, server_url, transport)
+        )
+
+    async def _connect_server_once(self, server_name: str, server_url: str, transport: Optional[str]):
+        """Make one connection attempt, trying each candidate transport."""
         await self._ensure_session()
         
         logger.info(f"Connecting to MCP server '{server_name}' at {server_url}")
         
+        transport = transport or self.default_transport
+        if transport == "auto":
+            candidates = [StreamableHTTPTransport.name, HTTPPostTransport.name]
+        elif transport in TRANSPORTS:
+            candidates = [transport]
+        else:
+            raise ValueError(f"Unknown MCP transport: {transport}")
+        
+        init_url = urljoin(server_url.rstrip('/') + '/', 'mcp')
+        
         try:
-            # Perform MCP initialization handshake
-            init_request = {
-                "jsonrpc": "2.0",
-                "id": self._get_next_request_id(),
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "tools": {}
-                    },
-                    "clientInfo": {
-                        "name": "autonomous-incident-agent",
-                        "version": "1.0.0"
-                    }
-                }
-            }
-            
-            # Send initialization request
-            init_url = urljoin(server_url.rstrip('/') + '/', 'mcp')
-            async with self.session.post(init_url, json=init_request) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP {response.status}: {await response.text()}")
+            for index, candidate in enumerate(candidates):
+                server_transport = TRANSPORTS[candidate](self.session, init_url)
                 
-                init_response = await response.json()
+                try:
+                    init_response = await server_transport.initialize(self._build_initialize_request())
+                except Exception as e:
+                    if index + 1 < len(candidates):
+                        logger.info(f"Transport '{candidate}' rejected by '{server_name}' ({str(e)}); falling back")
+                        continue
+                    raise
                 
                 if "error" in init_response:
                     raise Exception(f"MCP Error: {init_response['error']}")
@@ -97,17 +484,37 @@ class MCPClient:
                 self.connected_servers[server_name] = {
                     "url": server_url,
                     "base_mcp_url": init_url,
+                    "transport": server_transport,
                     "capabilities": init_response.get("result", {}).get("capabilities", {}),
                     "server_info": init_response.get("result", {}).get("serverInfo", {})
                 }
                 
-                logger.info(f"Successfully connected to MCP server '{server_name}'")
+                logger.info(f"Successfully connected to MCP server '{server_name}' using {server_transport.name} transport")
                 logger.debug(f"Server capabilities: {self.connected_servers[server_name]['capabilities']}")
+                return
                 
         except Exception as e:
             logger.error(f"Failed to connect to MCP server '{server_name}': {str(e)}")
             raise e
 
+    def _build_initialize_request(self) -> Dict[str, Any]:
+        """Create the MCP initialize request."""
+        return {
+            "jsonrpc": "2.0",
+            "id": self._get_next_request_id(),
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {
+                    "tools": {}
+                },
+                "clientInfo": {
+                    "name": "autonomous-incident-agent",
+                    "version": "1.0.0"
+                }
+            }
+        }
+
     async def list_tools(self, server_name: str) -> List[Dict[str, Any]]:
         """
         Get list of available tools from a specific MCP server.
@@ -126,7 +533,6 @@ class MCPClient:
             raise ValueError(f"Server '{server_name}' is not connected")
         
         await self._ensure_session()
-        server_info = self.connected_servers[server_name]
         
         try:
             # Create tools/list request
@@ -138,19 +544,23 @@ class MCPClient:
             }
             
             # Send request to server
-            async with self.session.post(server_info["base_mcp_url"], json=list_request) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP {response.status}: {await response.text()}")
-                
-                list_response = await response.json()
-                
-                if "error" in list_response:
-                    raise Exception(f"MCP Error: {list_response['error']}")
-                
-                tools = list_response.get("result", {}).get("tools", [])
-                logger.debug(f"Retrieved {len(tools)} tools from server '{server_name}'")
-                
-                return tools
+            list_response = await self.retry_policy.run(
+                f"tools/list on '{server_name}'",
+                lambda: self._send_guarded(server_name, list_request, [(server_name, "tools/list")])
+            )
+            
+            if "error" in list_response:
+                raise Exception(f"MCP Error: {list_response['error']}")
+            
+            tools = list_response.get("result", {}).get("tools", [])
+            logger.debug(f"Retrieved {len(tools)} tools from server '{server_name}'")
+            
+            for tool in tools:
+                self._tool_annotations[(server_name, tool["name"])] = tool.get("annotations") or {}
+            if self.tool_cache is not None:
+                self.tool_cache.register_tools(server_name, tools)
+            
+            return tools
                 
         except Exception as e:
             logger.error(f"Failed to list tools from server '{server_name}': {str(e)}")
@@ -175,8 +585,20 @@ class MCPClient:
         if server_name not in self.connected_servers:
             raise ValueError(f"Server '{server_name}' is not connected")
         
+        with tracer.span("mcp.call_tool", kind="client", server=server_name, tool=tool_name):
+            if self.tool_cache is not None:
+                return await self.tool_cache.get_or_call(
+                    server_name,
+                    tool_name,
+                    arguments,
+                    lambda: self._call_tool_uncached(server_name, tool_name, arguments)
+                )
+            
+            return await self._call_tool_uncached(server_name, tool_name, arguments)
+
+    async def _call_tool_uncached(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Send a tools/call request to the server, bypassing the tool cache."""
         await self._ensure_session()
-        server_info = self.connected_servers[server_name]
         
         logger.debug(f"Calling tool '{tool_name}' on server '{server_name}' with args: {arguments}")
         
@@ -193,24 +615,230 @@ class MCPClient:
             }
             
             # Send request to server
-            async with self.session.post(server_info["base_mcp_url"], json=call_request) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP {response.status}: {await response.text()}")
-                
-                call_response = await response.json()
-                
-                if "error" in call_response:
-                    raise Exception(f"MCP Tool Error: {call_response['error']}")
-                
-                result = call_response.get("result", {})
-                logger.debug(f"Tool '{tool_name}' executed successfully")
-                
-                return result
+            call_response = await self.retry_policy.run(
+                f"tool '{tool_name}' on '{server_name}'",
+                lambda: self._send_guarded(server_name, call_request, [(server_name, tool_name)]),
+                idempotent=self.is_idempotent(server_name, tool_name)
+            )
+            
+            if "error" in call_response:
+                raise Exception(f"MCP Tool Error: {call_response['error']}")
+            
+            result = call_response.get("result", {})
+            logger.debug(f"Tool '{tool_name}' executed successfully")
+            
+            return result
                 
         except Exception as e:
             logger.error(f"Failed to call tool '{tool_name}' on server '{server_name}': {str(e)}")
             raise e
 
+    async def call_tools_batch(
+        self,
+        server_name: str,
+        calls: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Union[Any, Exception]]:
+        """
+        Execute several tools on one MCP server in a single JSON-RPC batch.
+        
+        Responses are matched to calls by request id. Calls answered by the
+        tool cache are not sent. If the server does not accept batches, the
+        calls are sent individually (concurrently) and the server is
+        remembered as batch-incapable.
+        
+        Args:
+            server_name: Name of the connected server
+            calls: (tool name, arguments) pairs
+            
+        Returns:
+            List: One entry per call, in order: the tool result, or the
+            Exception raised for that call
+            
+        Raises:
+            ValueError: If server is not connected
+        """
+        if server_name not in self.connected_servers:
+            raise ValueError(f"Server '{server_name}' is not connected")
+        
+        await self._ensure_session()
+        server_info = self.connected_servers[server_name]
+        
+        if len(calls) == 1 or not server_info.get("supports_batch", True):
+            return await self._call_tools_individually(server_name, calls)
+        
+        # Serve what we can from the cache and batch only the misses
+        results: List[Union[Any, Exception]] = [None] * len(calls)
+        pending: List[int] = []
+        for position, (tool_name, arguments) in enumerate(calls):
+            hit, value = self.tool_cache.lookup(server_name, tool_name, arguments) if self.tool_cache else (False, None)
+            if hit:
+                results[position] = value
+            else:
+                pending.append(position)
+        
+        if len(pending) < 2:
+            outcomes = await self._call_tools_individually(server_name, [calls[position] for position in pending])
+            for position, outcome in zip(pending, outcomes):
+                results[position] = outcome
+            return results
+        
+        # Join identical calls already in flight and register the others, so the
+        # tool cache's single-flight also covers batched reads
+        joined: Dict[int, asyncio.Future] = {}
+        to_send: List[int] = []
+        keys: Dict[int, tuple] = {}
+        for position in pending:
+            tool_name, arguments = calls[position]
+            shared = self.tool_cache.join(server_name, tool_name, arguments) if self.tool_cache else None
+            if shared is not None:
+                joined[position] = shared
+                continue
+            to_send.append(position)
+            key = self.tool_cache.begin(server_name, tool_name, arguments) if self.tool_cache else None
+            if key is not None:
+                keys[position] = key
+        
+        outcomes: Dict[int, Union[Any, Exception]] = {}
+        try:
+            sent = await self._send_batch(server_name, [calls[position] for position in to_send])
+            outcomes.update(zip(to_send, sent))
+        finally:
+            for position, key in keys.items():
+                tool_name, arguments = calls[position]
+                outcome = outcomes.get(position, Exception(f"Batched call of tool '{tool_name}' was cancelled"))
+                self.tool_cache.complete(key, server_name, tool_name, arguments, outcome)
+        
+        for position, outcome in outcomes.items():
+            results[position] = outcome
+        for position, shared in joined.items():
+            try:
+                results[position] = await asyncio.shield(shared)
+            except Exception as e:
+                results[position] = e
+        
+        return results
+
+    async def _send_batch(
+        self,
+        server_name: str,
+        calls: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Union[Any, Exception]]:
+        """
+        Send calls as one JSON-RPC batch, bypassing the tool cache.
+        
+        A server that answers the batch with a JSON-RPC error object does not
+        support batches: the calls are sent individually and the server is
+        remembered as batch-incapable. Any other failure fails every call of
+        the batch without changing that.
+        
+        Returns:
+            List: One entry per call, in order: the tool result, or the Exception for that call
+        """
+        if len(calls) < 2:
+            return await self._call_tools_individually(server_name, calls, cached=False)
+        
+        batch = [
+            {
+                "jsonrpc": "2.0",
+                "id": self._get_next_request_id(),
+                "method": "tools/call",
+                "params": {
+                    "name": tool_name,
+                    "arguments": arguments
+                }
+            }
+            for tool_name, arguments in calls
+        ]
+        
+        logger.debug(f"Calling {len(batch)} tools on server '{server_name}' in one batch")
+        
+        try:
+            with tracer.span("mcp.call_tools_batch", kind="client", server=server_name, calls=len(batch)):
+                batch_response = await self.retry_policy.run(
+                    f"batch of {len(batch)} tools on '{server_name}'",
+                    lambda: self._send_guarded(server_name, batch, [(server_name, tool_name) for tool_name, _ in calls]),
+                    idempotent=all(self.is_idempotent(server_name, tool_name) for tool_name, _ in calls)
+                )
+        except Exception as e:
+            logger.error(f"Failed to call a batch of {len(batch)} tools on server '{server_name}': {str(e)}")
+            return [e] * len(calls)
+        
+        if isinstance(batch_response, dict) and "error" in batch_response:
+            # A single error object means the server rejected the batch as a whole
+            logger.info(f"Server '{server_name}' rejected a JSON-RPC batch ({batch_response['error']}); sending calls individually")
+            self.connected_servers[server_name]["supports_batch"] = False
+            return await self._call_tools_individually(server_name, calls, cached=False)
+        
+        if not isinstance(batch_response, list):
+            error = Exception(f"Unexpected response to a JSON-RPC batch from server '{server_name}'")
+            return [error] * len(calls)
+        
+        responses_by_id = {entry.get("id"): entry for entry in batch_response if isinstance(entry, dict)}
+        
+        outcomes: List[Union[Any, Exception]] = []
+        for request, (tool_name, _) in zip(batch, calls):
+            response = responses_by_id.get(request["id"])
+            if response is None:
+                outcomes.append(Exception(f"No response for tool '{tool_name}' in batch"))
+            elif "error" in response:
+                outcomes.append(Exception(f"MCP Tool Error: {response['error']}"))
+            else:
+                outcomes.append(response.get("result", {}))
+        
+        return outcomes
+
+    async def _call_tools_individually(
+        self,
+        server_name: str,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        cached: bool = True
+    ) -> List[Union[Any, Exception]]:
+        """Execute calls as concurrent single requests (through the tool cache unless `cached` is False), collecting exceptions per call."""
+        call = self.call_tool if cached else self._call_tool_uncached
+        return await asyncio.gather(
+            *(call(server_name, tool_name, arguments) for tool_name, arguments in calls),
+            return_exceptions=True
+        )
+
+    async def ping(self, server_name: str):
+        """
+        Send an MCP ping to a server.
+        
+        Servers that do not implement ping are probed with tools/list instead.
+        
+        Args:
+            server_name: Name of the connected server
+            
+        Raises:
+            ValueError: If server is not connected
+            Exception: If the server does not respond successfully
+        """
+        if server_name not in self.connected_servers:
+            raise ValueError(f"Server '{server_name}' is not connected")
+        
+        await self._ensure_session()
+        server_info = self.connected_servers[server_name]
+        
+        if not server_info.get("supports_ping", True):
+            await self.list_tools(server_name)
+            return
+        
+        ping_request = {
+            "jsonrpc": "2.0",
+            "id": self._get_next_request_id(),
+            "method": "ping"
+        }
+        
+        ping_response = await server_info["transport"].send(ping_request)
+        
+        if "error" in ping_response:
+            if ping_response["error"].get("code") == -32601:
+                logger.info(f"Server '{server_name}' does not implement ping; probing with tools/list")
+                server_info["supports_ping"] = False
+                await self.list_tools(server_name)
+                return
+            raise Exception(f"MCP Error: {ping_response['error']}")
+
     async def ping_server(self, server_name: str) -> bool:
         """
         Check if a server is responding to requests.
@@ -225,8 +853,7 @@ class MCPClient:
             return False
         
         try:
-            # Try to list tools as a health check
-            await self.list_tools(server_name)
+            await self.ping(server_name)
             return True
         except Exception as e:
             logger.warning(f"Server '{server_name}' health check failed: {str(e)}")
@@ -248,7 +875,9 @@ class MCPClient:
         if server_name not in self.connected_servers:
             raise ValueError(f"Server '{server_name}' is not connected")
         
-        return self.connected_servers[server_name].copy()
+        server_info = self.connected_servers[server_name].copy()
+        server_info["transport"] = server_info["transport"].name
+        return server_info
 
     async def disconnect_server(self, server_name: str):
         """
@@ -259,7 +888,8 @@ class MCPClient:
         """
         if server_name in self.connected_servers:
             logger.info(f"Disconnecting from MCP server '{server_name}'")
-            del self.connected_servers[server_name]
+            server_info = self.connected_servers.pop(server_name)
+            await server_info["transport"].close()
 
     async def disconnect_all(self):
         """
@@ -267,7 +897,9 @@ class MCPClient:
         """
         logger.info("Disconnecting from all MCP servers...")
         
-        # Clear all server connections
+        # Close transport sessions and clear all server connections
+        for server_info in self.connected_servers.values():
+            await server_info["transport"].close()
         self.connected_servers.clear()
         
         # Close HTTP session
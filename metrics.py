@@ -0,0 +1,221 @@
+"""
+Prometheus metrics for the orchestrator hot paths.
+
+All metric families are created once, and every label combination that is
+known up front (outcomes, token types, components) is bound to its child
+when the process starts. Children for open-ended labels (server, tool,
+priority, retry reason) are bound the first time a value is seen and
+cached, so the hot paths only do a dict lookup and an observe().
+
+prometheus_client is optional: without it (or with METRICS_ENABLED=false)
+every metric is a no-op and /metrics reports that metrics are unavailable.
+"""
+
+import logging
+import os
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Label values bound at startup
+WEBHOOK_OUTCOMES = ("accepted", "duplicate", "coalesced", "rejected", "error")
+TOKEN_TYPES = ("input", "cache_creation_input", "cache_read_input", "output")
+ERROR_COMPONENTS = ("webhook", "model", "mcp", "investigation")
+
+# Bucket boundaries in seconds / bytes
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+INVESTIGATION_BUCKETS = (5.0, 10.0, 20.0, 30.0, 60.0, 90.0, 120.0, 180.0, 240.0, 300.0, 450.0, 600.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class _NoopMetric:
+    """Stand-in for a metric or label child when Prometheus is unavailable."""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+
+NOOP = _NoopMetric()
+
+
+class Metrics:
+    """
+    Orchestrator metric families and their pre-bound label children.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Create the metric families and bind the known label children.
+
+        Args:
+            enabled: Whether to record metrics; ignored (off) without prometheus_client
+        """
+        self.enabled = enabled and PROMETHEUS_AVAILABLE
+        if enabled and not PROMETHEUS_AVAILABLE:
+            logger.warning("prometheus_client is not installed; metrics are disabled")
+
+        self._mcp_tool_family = self._histogram(
+            "incident_agent_mcp_tool_call_duration_seconds", "MCP tool call latency", ("server", "tool"), CALL_BUCKETS
+        )
+        self._mcp_tool_children: Dict[str, Dict[str, Any]] = {}
+        self._mcp_batch_family = self._histogram(
+            "incident_agent_mcp_batch_duration_seconds", "Latency of one JSON-RPC batch of MCP tool calls",
+            ("server",), CALL_BUCKETS
+        )
+        self._mcp_batch_children: Dict[str, Any] = {}
+
+        webhook = self._histogram(
+            "incident_agent_webhook_duration_seconds", "Webhook handling time by outcome", ("outcome",), FAST_BUCKETS
+        )
+        self.webhook_seconds = {outcome: webhook.labels(outcome) for outcome in WEBHOOK_OUTCOMES}
+
+        self.queue_wait_seconds = self._histogram(
+            "incident_agent_queue_wait_seconds", "Time alerts wait in the incident queue", (), CALL_BUCKETS
+        )
+
+        self.loop_lag_seconds = self._histogram(
+            "incident_agent_event_loop_lag_seconds", "How late event-loop timers fire", (), FAST_BUCKETS
+        )
+        self.slow_callbacks = self._counter(
+            "incident_agent_event_loop_slow_callbacks_total", "Callbacks that blocked the event loop past the threshold", ()
+        )
+
+        self._investigation_family = self._histogram(
+            "incident_agent_investigation_duration_seconds", "Investigation duration by priority and outcome",
+            ("priority", "outcome"), INVESTIGATION_BUCKETS
+        )
+        self._investigation_children: Dict[Tuple[str, str], Any] = {}
+
+        self.model_call_seconds = self._histogram(
+            "incident_agent_model_call_duration_seconds", "Latency of one model call (one investigation iteration)",
+            (), CALL_BUCKETS
+        )
+
+        tokens = self._counter("incident_agent_model_tokens_total", "Model tokens by type", ("type",))
+        self._usage_fields = [(f"{token_type}_tokens", tokens.labels(token_type)) for token_type in TOKEN_TYPES]
+
+        self._result_bytes_family = self._histogram(
+            "incident_agent_tool_result_bytes", "Size of tool results sent to the model, by server",
+            ("server",), SIZE_BUCKETS
+        )
+        self._result_bytes_children: Dict[str, Any] = {}
+
+        errors = self._counter("incident_agent_errors_total", "Errors by component", ("component",))
+        self.errors = {component: errors.labels(component) for component in ERROR_COMPONENTS}
+
+        self._retries_family = self._counter(
+            "incident_agent_retries_total", "Retries of model and MCP calls by reason", ("reason",)
+        )
+        self._budget_family = self._counter(
+            "incident_agent_budget_exhausted_total", "Investigations forced to summarize, by exhausted limit", ("reason",)
+        )
+        self._retry_children: Dict[str, Any] = {}
+        self._budget_children: Dict[str, Any] = {}
+
+    def _histogram(self, name: str, documentation: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]) -> Any:
+        """Create a histogram family, or a no-op when disabled."""
+        if not self.enabled:
+            return NOOP
+        return Histogram(name, documentation, labels, buckets=buckets)
+
+    def _counter(self, name: str, documentation: str, labels: Tuple[str, ...]) -> Any:
+        """Create a counter family, or a no-op when disabled."""
+        if not self.enabled:
+            return NOOP
+        return Counter(name, documentation, labels)
+
+    def mcp_tool_seconds(self, server: str, tool: str) -> Any:
+        """
+        Latency histogram child of one MCP tool, bound on first use.
+
+        Args:
+            server: MCP server name
+            tool: Tool name on that server
+
+        Returns:
+            Any: Histogram child to observe() on
+        """
+        tools = self._mcp_tool_children.get(server)
+        if tools is None:
+            tools = self._mcp_tool_children[server] = {}
+        child = tools.get(tool)
+        if child is None:
+            child = tools[tool] = self._mcp_tool_family.labels(server, tool)
+        return child
+
+    def mcp_batch_seconds(self, server: str) -> Any:
+        """Batch latency histogram child of one MCP server, bound on first use."""
+        child = self._mcp_batch_children.get(server)
+        if child is None:
+            child = self._mcp_batch_children[server] = self._mcp_batch_family.labels(server)
+        return child
+
+    def tool_result_bytes(self, server: str) -> Any:
+        """Tool result size histogram child of one MCP server, bound on first use."""
+        child = self._result_bytes_children.get(server)
+        if child is None:
+            child = self._result_bytes_children[server] = self._result_bytes_family.labels(server)
+        return child
+
+    def investigation_seconds(self, priority: str, outcome: str) -> Any:
+        """Investigation duration histogram child, bound on first use."""
+        key = (priority, outcome)
+        child = self._investigation_children.get(key)
+        if child is None:
+            child = self._investigation_children[key] = self._investigation_family.labels(priority, outcome)
+        return child
+
+    def retry(self, reason: str) -> Any:
+        """Retry counter child of one retry reason, bound on first use."""
+        child = self._retry_children.get(reason)
+        if child is None:
+            child = self._retry_children[reason] = self._retries_family.labels(reason)
+        return child
+
+    def budget_exhausted(self, reason: str) -> Any:
+        """Counter child of investigations that hit one budget limit, bound on first use."""
+        child = self._budget_children.get(reason)
+        if child is None:
+            child = self._budget_children[reason] = self._budget_family.labels(reason)
+        return child
+
+    def observe_usage(self, usage: Any):
+        """
+        Count the tokens of one model response.
+
+        Args:
+            usage: Usage object from a model response (fields may be missing or None)
+        """
+        if not self.enabled or usage is None:
+            return
+        for field, child in self._usage_fields:
+            count = getattr(usage, field, 0)
+            if count:
+                child.inc(count)
+
+    def render(self) -> Optional[bytes]:
+        """
+        Current metrics in the Prometheus text exposition format.
+
+        Returns:
+            Optional[bytes]: Exposition payload, or None when metrics are disabled
+        """
+        return generate_latest() if self.enabled else None
+
+
+# Process-wide metrics, shared by every module that records them
+metrics = Metrics(enabled=os.environ.get('METRICS_ENABLED', 'true').lower() == 'true')
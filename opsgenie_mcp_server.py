@@ -7,20 +7,23 @@ and retrieving alert information.
 """
 
 import asyncio
-import json
 import logging
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 
 import aiohttp
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
+import json_codec
+import tracing
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+tracer = tracing.get_tracer("opsgenie-mcp-server")
 
 class OpsGenieMCPServer:
     """
@@ -66,6 +69,9 @@ class OpsGenieMCPServer:
                         }
                     },
                     "required": ["alert_id", "note"]
+                },
+                "annotations": {
+                    "readOnlyHint": False
                 }
             },
             {
@@ -80,6 +86,9 @@ class OpsGenieMCPServer:
                         }
                     },
                     "required": ["alert_id"]
+                },
+                "annotations": {
+                    "readOnlyHint": True
                 }
             },
             {
@@ -99,6 +108,10 @@ class OpsGenieMCPServer:
                         }
                     },
                     "required": ["alert_id", "priority"]
+                },
+                "annotations": {
+                    "readOnlyHint": False,
+                    "idempotentHint": True
                 }
             },
             {
@@ -118,6 +131,10 @@ class OpsGenieMCPServer:
                         }
                     },
                     "required": ["alert_id", "tags"]
+                },
+                "annotations": {
+                    "readOnlyHint": False,
+                    "idempotentHint": True
                 }
             }
         ]
@@ -136,6 +153,31 @@ class OpsGenieMCPServer:
                 headers=headers
             )
 
+    async def handle_mcp_batch(self, requests: List[Any]) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Handle a JSON-RPC batch by processing its entries concurrently.
+        
+        Args:
+            requests: List of MCP requests and notifications
+            
+        Returns:
+            Union[List, Dict]: Responses for the requests (notifications get
+            none), or a single error response for an empty batch
+        """
+        if not requests:
+            return self._create_error_response(None, -32600, "Invalid Request: empty batch")
+        
+        # Notifications in the batch are not answered
+        entries = [entry for entry in requests if not isinstance(entry, dict) or "id" in entry]
+        
+        return list(await asyncio.gather(*(self._handle_batch_entry(entry) for entry in entries)))
+
+    async def _handle_batch_entry(self, entry: Any) -> Dict[str, Any]:
+        """Handle one batch entry, rejecting entries that are not request objects."""
+        if not isinstance(entry, dict):
+            return self._create_error_response(None, -32600, "Invalid Request")
+        return await self.handle_mcp_request(entry)
+
     async def handle_mcp_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """
         Handle incoming MCP protocol requests.
@@ -153,6 +195,8 @@ class OpsGenieMCPServer:
         try:
             if method == "initialize":
                 return await self._handle_initialize(request_id, params)
+            elif method == "ping":
+                return {"jsonrpc": "2.0", "id": request_id, "result": {}}
             elif method == "tools/list":
                 return await self._handle_tools_list(request_id)
             elif method == "tools/call":
@@ -202,16 +246,17 @@ class OpsGenieMCPServer:
         arguments = params.get("arguments", {})
         
         # Route to appropriate tool handler
-        if tool_name == "add_note":
-            result = await self._add_note(arguments)
-        elif tool_name == "get_alert":
-            result = await self._get_alert(arguments)
-        elif tool_name == "update_alert_priority":
-            result = await self._update_alert_priority(arguments)
-        elif tool_name == "add_tags":
-            result = await self._add_tags(arguments)
-        else:
-            raise Exception(f"Unknown tool: {tool_name}")
+        with tracer.span("mcp.tool", tool=tool_name, alert_id=arguments.get("alert_id")):
+            if tool_name == "add_note":
+                result = await self._add_note(arguments)
+            elif tool_name == "get_alert":
+                result = await self._get_alert(arguments)
+            elif tool_name == "update_alert_priority":
+                result = await self._update_alert_priority(arguments)
+            elif tool_name == "add_tags":
+                result = await self._add_tags(arguments)
+            else:
+                raise Exception(f"Unknown tool: {tool_name}")
         
         return {
             "jsonrpc": "2.0",
@@ -220,7 +265,7 @@ class OpsGenieMCPServer:
                 "content": [
                     {
                         "type": "text",
-                        "text": json.dumps(result, indent=2)
+                        "text": json_codec.dumps(result, default=str)
                     }
                 ]
             }
@@ -254,7 +299,7 @@ class OpsGenieMCPServer:
                 error_text = await response.text()
                 raise Exception(f"OpsGenie API error: {response.status} - {error_text}")
             
-            result = await response.json()
+            result = await response.json(loads=json_codec.loads)
             logger.info(f"Successfully added note to alert {alert_id}")
             return result
 
@@ -280,7 +325,7 @@ class OpsGenieMCPServer:
                 error_text = await response.text()
                 raise Exception(f"OpsGenie API error: {response.status} - {error_text}")
             
-            result = await response.json()
+            result = await response.json(loads=json_codec.loads)
             logger.info(f"Successfully retrieved alert {alert_id}")
             return result
 
@@ -309,7 +354,7 @@ class OpsGenieMCPServer:
                 error_text = await response.text()
                 raise Exception(f"OpsGenie API error: {response.status} - {error_text}")
             
-            result = await response.json()
+            result = await response.json(loads=json_codec.loads)
             logger.info(f"Successfully updated priority of alert {alert_id}")
             return result
 
@@ -338,7 +383,7 @@ class OpsGenieMCPServer:
                 error_text = await response.text()
                 raise Exception(f"OpsGenie API error: {response.status} - {error_text}")
             
-            result = await response.json()
+            result = await response.json(loads=json_codec.loads)
             logger.info(f"Successfully added tags to alert {alert_id}")
             return result
 
@@ -358,6 +403,12 @@ class OpsGenieMCPServer:
         if self.session and not self.session.closed:
             await self.session.close()
 
+class CodecJSONResponse(JSONResponse):
+    """JSON response encoded with the shared JSON codec."""
+    
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps_bytes(content, default=str)
+
 # FastAPI application for serving the MCP server
 app = FastAPI(
     title="OpsGenie MCP Server",
@@ -386,21 +437,35 @@ async def shutdown_event():
     global mcp_server
     if mcp_server:
         await mcp_server.cleanup()
+    await tracing.shutdown()
 
 @app.post("/mcp")
-async def handle_mcp_request(request: Dict[str, Any]):
-    """Handle MCP protocol requests."""
+async def handle_mcp_request(request: Union[List[Any], Dict[str, Any]], traceparent: Optional[str] = Header(None)):
+    """Handle MCP protocol requests, single or batched, continuing the caller's trace if one is propagated."""
     global mcp_server
     
     if not mcp_server:
         raise HTTPException(status_code=503, detail="MCP server not initialized")
     
-    try:
-        response = await mcp_server.handle_mcp_request(request)
-        return JSONResponse(content=response)
-    except Exception as e:
-        logger.error(f"Error handling MCP request: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    method = "batch" if isinstance(request, list) else request.get("method")
+    with tracer.span("mcp.request", parent=tracing.parse_traceparent(traceparent), kind="server", method=method):
+        try:
+            if isinstance(request, list):
+                responses = await mcp_server.handle_mcp_batch(request)
+                # A batch of only notifications gets no response body
+                if responses == []:
+                    return Response(status_code=202)
+                return CodecJSONResponse(content=responses)
+            
+            # JSON-RPC notifications (e.g. notifications/initialized) get no response body
+            if "id" not in request and str(request.get("method", "")).startswith("notifications/"):
+                return Response(status_code=202)
+            
+            response = await mcp_server.handle_mcp_request(request)
+            return CodecJSONResponse(content=response)
+        except Exception as e:
+            logger.error(f"Error handling MCP request: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
 async def health_check():
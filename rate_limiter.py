@@ -0,0 +1,238 @@
+"""
+Client-side rate limiting for model API calls.
+
+All investigations in the process share one limiter, which budgets both
+requests per minute and tokens per minute with token buckets. Calls that
+do not fit the current budget wait in a priority queue (P1 first) instead of
+being sent and rejected with 429, and part of each budget is held back for
+P1/P2 investigations so lower priorities cannot starve them.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ranks at or below this are allowed to use the reserved headroom
+HIGH_PRIORITY_MAX_RANK = 2
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    The balance may go negative when actual usage exceeds what was reserved;
+    the debt is paid back by refill before new reservations succeed.
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Refill rate, also used as the bucket capacity
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        """Remove tokens; the balance may go negative."""
+        self._refill()
+        self.tokens -= amount
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reported a rate limit."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class ModelRateLimiter:
+    """
+    Shared requests/min and tokens/min budget for model calls with priority queuing.
+
+    Callers reserve an estimate with `acquire()` and report actual usage with
+    `settle()`. Waiters are served strictly by priority rank, then arrival
+    order. Requests from ranks above HIGH_PRIORITY_MAX_RANK are only admitted
+    while `priority_reserve` of both budgets would remain afterwards.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 50,
+        tokens_per_minute: float = 80000,
+        priority_reserve: float = 0.2,
+        default_output_tokens: int = 1000
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Request budget; 0 disables the request limit
+            tokens_per_minute: Input+output token budget; 0 disables the token limit
+            priority_reserve: Fraction of each budget only P1/P2 may use
+            default_output_tokens: Output estimate before any usage is observed
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.priority_reserve = priority_reserve
+
+        # Running average of output tokens per call, used in reservations
+        self.expected_output_tokens = float(default_output_tokens)
+
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._counters = {"granted": 0, "queued": 0, "rate_limited": 0}
+        self._wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ModelRateLimiter":
+        """
+        Build a limiter from environment configuration.
+
+        Environment variables (all optional): MODEL_REQUESTS_PER_MINUTE,
+        MODEL_TOKENS_PER_MINUTE, MODEL_RATE_PRIORITY_RESERVE
+
+        Returns:
+            ModelRateLimiter: Configured limiter
+        """
+        return cls(
+            requests_per_minute=float(os.environ.get('MODEL_REQUESTS_PER_MINUTE', 50)),
+            tokens_per_minute=float(os.environ.get('MODEL_TOKENS_PER_MINUTE', 80000)),
+            priority_reserve=float(os.environ.get('MODEL_RATE_PRIORITY_RESERVE', 0.2))
+        )
+
+    def estimate(self, input_tokens: int) -> int:
+        """Tokens to reserve for a call with the given estimated input size."""
+        return int(input_tokens + self.expected_output_tokens)
+
+    async def acquire(self, tokens: int, rank: int):
+        """
+        Wait until the call fits the budget, then reserve it.
+
+        Args:
+            tokens: Estimated input+output tokens of the call
+            rank: Priority rank of the investigation (lower is more urgent)
+        """
+        if not self._waiters and self._wait_time(tokens, rank) == 0:
+            self._grant(tokens)
+            return
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), future, tokens))
+        self._counters["queued"] += 1
+        self._wakeup.set()
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="model-rate-limiter")
+
+        await future
+        self._wait_seconds += time.monotonic() - started
+
+    def settle(self, reserved: int, input_tokens: int, output_tokens: int):
+        """
+        Correct the token budget with the usage the API reported.
+
+        Args:
+            reserved: Tokens reserved by acquire()
+            input_tokens: Input tokens counted against the rate limit
+            output_tokens: Output tokens generated
+        """
+        if self.tokens is not None:
+            self.tokens.take(input_tokens + output_tokens - reserved)
+        self.expected_output_tokens = 0.9 * self.expected_output_tokens + 0.1 * output_tokens
+
+    def on_rate_limited(self):
+        """Stop admitting calls until the budgets refill after a 429 from the API."""
+        self._counters["rate_limited"] += 1
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.drain()
+
+    def _wait_time(self, tokens: int, rank: int) -> float:
+        """Seconds until a call of this size and rank may be admitted."""
+        wait = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is None:
+                continue
+            if rank > HIGH_PRIORITY_MAX_RANK:
+                amount = min(amount, bucket.capacity * (1 - self.priority_reserve)) + bucket.capacity * self.priority_reserve
+            wait = max(wait, bucket.wait_time(amount))
+        return wait
+
+    def _grant(self, tokens: int):
+        """Take one request and the reserved tokens from the budgets."""
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self._counters["granted"] += 1
+
+    async def _dispatch(self):
+        """Admit queued calls in priority order as the budgets refill."""
+        while self._waiters:
+            rank, _, future, tokens = self._waiters[0]
+            if future.done():
+                # The waiter was cancelled
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self._wait_time(tokens, rank)
+            if wait == 0:
+                heapq.heappop(self._waiters)
+                self._grant(tokens)
+                future.set_result(None)
+                continue
+
+            # Sleep until the head fits, or until a more urgent call arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of limiter activity.
+
+        Returns:
+            Dict: Remaining budgets, queue depth by rank and grant counters
+        """
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.wait_time(0)
+
+        waiting: Dict[str, int] = {}
+        for rank, _, future, _ in self._waiters:
+            if not future.done():
+                waiting[f"P{rank}"] = waiting.get(f"P{rank}", 0) + 1
+
+        return {
+            "requests_available": round(self.requests.tokens, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.tokens) if self.tokens else None,
+            "expected_output_tokens": round(self.expected_output_tokens),
+            "waiting": waiting,
+            "total_wait_seconds": round(self._wait_seconds, 2),
+            **self._counters
+        }
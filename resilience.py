@@ -0,0 +1,491 @@
+"""
+Resilience primitives for calls to MCP servers and the model API.
+
+Provides per-server circuit breakers, which fail fast while a server is
+degraded instead of letting every call hang until its timeout, a latency
+tracker that derives per-tool timeout budgets from observed latency
+percentiles, and a shared retry policy for transient failures.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Any, Awaitable, Callable, Hashable, Optional
+
+import aiohttp
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a server whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for '{name}' is open; retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CallTimeoutError(Exception):
+    """Raised when a call exceeds its timeout budget."""
+
+    def __init__(self, message: str, timeout: float):
+        super().__init__(message)
+        self.timeout = timeout
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding time window.
+
+    Closed: calls flow and outcomes are recorded. Once at least
+    `min_requests` outcomes in the window fail at `failure_rate_threshold`
+    or more, the breaker opens and rejects calls for `open_seconds`. It then
+    goes half-open and lets `half_open_probes` calls through: a success
+    closes it, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        min_requests: int = 5,
+        window_seconds: float = 60,
+        open_seconds: float = 30,
+        half_open_probes: int = 1
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name of the protected dependency, used in errors and logs
+            failure_rate_threshold: Failure fraction that opens the circuit
+            min_requests: Outcomes needed in the window before it can open
+            window_seconds: Length of the sliding outcome window
+            open_seconds: How long the circuit stays open before probing
+            half_open_probes: Concurrent trial calls allowed while half-open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self._outcomes = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._times_opened = 0
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        """
+        Build a breaker from environment configuration.
+
+        Environment variables (all optional): MCP_BREAKER_FAILURE_RATE,
+        MCP_BREAKER_MIN_REQUESTS, MCP_BREAKER_WINDOW, MCP_BREAKER_OPEN_SECONDS
+
+        Args:
+            name: Name of the protected dependency
+
+        Returns:
+            CircuitBreaker: Configured breaker
+        """
+        return cls(
+            name,
+            failure_rate_threshold=float(os.environ.get('MCP_BREAKER_FAILURE_RATE', 0.5)),
+            min_requests=int(os.environ.get('MCP_BREAKER_MIN_REQUESTS', 5)),
+            window_seconds=float(os.environ.get('MCP_BREAKER_WINDOW', 60)),
+            open_seconds=float(os.environ.get('MCP_BREAKER_OPEN_SECONDS', 30))
+        )
+
+    def allow(self):
+        """
+        Admit a call or fail fast.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all
+                trial slots taken
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                raise CircuitOpenError(self.name, 0)
+            self._probes_in_flight += 1
+
+    def release(self):
+        """Give back an admitted call's slot without recording an outcome (e.g. on cancellation)."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record_success(self):
+        """Record a successful call."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._outcomes.clear()
+            self._transition(CLOSED)
+            return
+        self._record(True)
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit if the error rate is too high."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._open()
+            return
+
+        self._record(False)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_requests
+            and failures / len(self._outcomes) >= self.failure_rate_threshold
+        ):
+            self._open()
+
+    def _record(self, ok: bool):
+        """Append an outcome and drop outcomes that left the window."""
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self):
+        """Open the circuit."""
+        self._opened_at = time.monotonic()
+        self._times_opened += 1
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        """Change state, logging the transition."""
+        if state != self.state:
+            log = logger.warning if state == OPEN else logger.info
+            log(f"Circuit for '{self.name}' {self.state} -> {state}")
+            self.state = state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current breaker state for health output.
+
+        Returns:
+            Dict: State, window error rate and open count
+        """
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        snapshot = {
+            "state": self.state,
+            "window_requests": len(self._outcomes),
+            "window_failure_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "times_opened": self._times_opened
+        }
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+        return snapshot
+
+
+class LatencyTracker:
+    """
+    Tracks call latencies per key and derives timeout budgets from them.
+
+    The timeout for a key is its observed latency percentile times a
+    multiplier, clamped to [min_timeout, max_timeout]. Keys without enough
+    samples get `default_timeout`.
+    """
+
+    def __init__(
+        self,
+        default_timeout: float = 60,
+        min_timeout: float = 5,
+        max_timeout: float = 60,
+        multiplier: float = 3.0,
+        percentile: float = 0.99,
+        min_samples: int = 10,
+        max_samples: int = 200
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            default_timeout: Timeout before enough samples exist
+            min_timeout: Lower bound for derived timeouts
+            max_timeout: Upper bound for derived timeouts
+            multiplier: Headroom applied to the observed percentile
+            percentile: Latency percentile the budget is derived from
+            min_samples: Samples needed before deriving a timeout
+            max_samples: Recent samples kept per key
+        """
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.multiplier = multiplier
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+
+        self._samples: Dict[Hashable, deque] = {}
+
+    @classmethod
+    def from_env(cls) -> "LatencyTracker":
+        """
+        Build a tracker from environment configuration.
+
+        Environment variables (all optional): MCP_TIMEOUT_DEFAULT,
+        MCP_TIMEOUT_MIN, MCP_TIMEOUT_MAX, MCP_TIMEOUT_MULTIPLIER
+
+        Returns:
+            LatencyTracker: Configured tracker
+        """
+        return cls(
+            default_timeout=float(os.environ.get('MCP_TIMEOUT_DEFAULT', 60)),
+            min_timeout=float(os.environ.get('MCP_TIMEOUT_MIN', 5)),
+            max_timeout=float(os.environ.get('MCP_TIMEOUT_MAX', 60)),
+            multiplier=float(os.environ.get('MCP_TIMEOUT_MULTIPLIER', 3))
+        )
+
+    def record(self, key: Hashable, seconds: float):
+        """Record the latency of one successful call."""
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.max_samples)
+        samples.append(seconds)
+
+    def keys(self) -> List[Hashable]:
+        """Keys with recorded latencies."""
+        return list(self._samples)
+
+    def latency_percentile(self, key: Hashable) -> Optional[float]:
+        """Observed latency percentile for a key, or None without enough samples."""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def timeout_for(self, key: Hashable) -> float:
+        """Timeout budget in seconds for the next call with this key."""
+        observed = self.latency_percentile(key)
+        if observed is None:
+            return self.default_timeout
+        return min(self.max_timeout, max(self.min_timeout, observed * self.multiplier))
+
+
+# Retry reasons reported by classify_error
+RATE_LIMITED = "rate_limited"
+SERVER_ERROR = "server_error"
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value: Delay in seconds or an HTTP date
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparseable
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """
+    Classify an error as a transient failure worth retrying.
+
+    HTTP status codes are read from a `status` or `status_code` attribute,
+    which covers structured MCP errors and the Anthropic SDK's API errors.
+
+    A CallTimeoutError is not retried: the call already used its whole
+    adaptive timeout budget, and retrying would multiply that wait on a
+    degraded server instead of failing fast (the breaker records it).
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        Optional[str]: Retry reason, or None if the error is not transient
+    """
+    if isinstance(error, (CircuitOpenError, CallTimeoutError)):
+        return None
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (aiohttp.ClientConnectionError, ConnectionError)):
+        return CONNECTION
+
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return RATE_LIMITED
+        if status == 408:
+            return TIMEOUT
+        if status >= 500:
+            return SERVER_ERROR
+    return None
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Server-requested delay carried by an error, from a `retry_after` attribute or response headers."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return parse_retry_after(retry_after)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        return parse_retry_after(headers.get("retry-after"))
+    return None
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with capped exponential backoff and full jitter.
+
+    A server-provided Retry-After delay is honored (up to `max_delay`). All
+    callers share one retry budget: every first attempt deposits
+    `budget_ratio` tokens (up to `budget_max`) and every retry spends one,
+    so during an outage retries add at most about `budget_ratio` extra load
+    instead of multiplying it.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20,
+        budget_ratio: float = 0.2,
+        budget_max: float = 20
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff ceiling for the first retry in seconds
+            max_delay: Upper bound for any single delay
+            budget_ratio: Retry tokens earned per first attempt
+            budget_max: Maximum banked retry tokens
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+
+        self._budget = budget_max
+        self._counters: Dict[str, int] = {"calls": 0, "retries": 0, "budget_exhausted": 0, "gave_up": 0}
+        self._retries_by_reason: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """
+        Build a policy from environment configuration.
+
+        Environment variables (all optional): RETRY_MAX_ATTEMPTS,
+        RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX
+
+        Returns:
+            RetryPolicy: Configured policy
+        """
+        return cls(
+            max_attempts=int(os.environ.get('RETRY_MAX_ATTEMPTS', 4)),
+            base_delay=float(os.environ.get('RETRY_BASE_DELAY', 0.5)),
+            max_delay=float(os.environ.get('RETRY_MAX_DELAY', 20)),
+            budget_ratio=float(os.environ.get('RETRY_BUDGET_RATIO', 0.2)),
+            budget_max=float(os.environ.get('RETRY_BUDGET_MAX', 20))
+        )
+
+    async def run(
+        self,
+        operation: str,
+        call: Callable[[], Awaitable[Any]],
+        classify: Callable[[BaseException], Optional[str]] = classify_error,
+        idempotent: bool = True
+    ) -> Any:
+        """
+        Run a call, retrying transient failures.
+
+        Args:
+            operation: Description used in logs
+            call: Coroutine function making one attempt
+            classify: Maps an error to a retry reason, or None to fail
+            idempotent: Whether the call may be repeated after an ambiguous
+                failure; non-idempotent calls are only retried when rate
+                limited, which means the request was not processed
+
+        Returns:
+            Any: Result of the first successful attempt
+
+        Raises:
+            Exception: The last error, once it is not retryable, attempts
+                are used up, or the retry budget is empty
+        """
+        self._counters["calls"] += 1
+        self._budget = min(self.budget_max, self._budget + self.budget_ratio)
+
+        attempt = 1
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                reason = classify(e)
+                if reason is None or (not idempotent and reason != RATE_LIMITED):
+                    raise
+                if attempt >= self.max_attempts:
+                    self._counters["gave_up"] += 1
+                    raise
+                if self._budget < 1:
+                    self._counters["budget_exhausted"] += 1
+                    logger.warning(f"Retry budget exhausted; not retrying {operation} ({reason})")
+                    raise
+
+                self._budget -= 1
+                self._counters["retries"] += 1
+                self._retries_by_reason[reason] = self._retries_by_reason.get(reason, 0) + 1
+                metrics.retry(reason).inc()
+
+                delay = self._delay(attempt, retry_after_of(e))
+                logger.info(f"Retrying {operation} in {delay:.2f}s after {reason} (attempt {attempt}/{self.max_attempts}): {str(e)}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Delay before the next attempt: Retry-After if given, else full-jitter backoff."""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of retry activity.
+
+        Returns:
+            Dict: Call and retry counters, retries per reason and remaining budget
+        """
+        return {
+            **self._counters,
+            "retries_by_reason": dict(self._retries_by_reason),
+            "budget_remaining": round(self._budget, 2)
+        }
@@ -0,0 +1,342 @@
+"""
+Tool result shaping for the autonomous incident agent.
+
+MCP tool results (especially Grafana range queries and log searches) can be
+megabytes in size. The shaper reduces each result to something the model can
+use: time series are downsampled into min/max/avg buckets, long log listings
+keep the most relevant lines, oversized lists and strings are cut, and the
+whole payload is capped. Everything that was dropped is recorded in the
+shaped output so the model knows to narrow its query if it needs more.
+"""
+
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Terms that make a log line more likely to matter for an incident
+LOG_RELEVANCE_PATTERN = re.compile(
+    r"error|exception|fatal|panic|fail|timeout|timed out|refused|oom|killed|denied|"
+    r"critical|unavailable|crash|traceback|"
+    # 5xx only as an HTTP status: status=503, "code": 500, HTTP/1.1" 502
+    r"\b(?:status(?:[_ ]?code)?|code|http(?:/\d(?:\.\d)?)?)[\"']?\s*[=:]?\s*[\"']?5\d\d\b",
+    re.IGNORECASE
+)
+# A timestamp or a level, which every log line carries and other text rarely does
+LOG_SHAPE_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}|\b\d{2}:\d{2}:\d{2}\b|\b\d{10,19}\b|"
+    r"\b(?:level|lvl|severity)=|\b(?:TRACE|DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b"
+)
+# Entries sampled when deciding whether a list is a log listing
+LOG_SHAPE_SAMPLE = 20
+LOG_LINE_KEYS = ("line", "message", "msg", "log")
+LOG_LEVEL_KEYS = ("level", "lvl", "severity")
+TIMESTAMP_KEYS = ("time", "timestamp", "ts", "t")
+VALUE_KEYS = ("value", "v", "y")
+
+
+class ResultShaper:
+    """
+    Reduces MCP tool results to a bounded, model-friendly JSON string.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 16000,
+        max_series_points: int = 60,
+        max_log_lines: int = 100,
+        max_list_items: int = 100,
+        max_string_chars: int = 4000
+    ):
+        """
+        Initialize the shaper.
+
+        Args:
+            max_chars: Hard cap on the serialized size of one tool result
+            max_series_points: Buckets a time series is downsampled to
+            max_log_lines: Log lines kept from a log listing
+            max_list_items: Items kept from any other list
+            max_string_chars: Characters kept from any single string
+        """
+        self.max_chars = max_chars
+        self.max_series_points = max_series_points
+        self.max_log_lines = max_log_lines
+        self.max_list_items = max_list_items
+        self.max_string_chars = max_string_chars
+
+    @classmethod
+    def from_env(cls) -> "ResultShaper":
+        """
+        Build a shaper from environment configuration.
+
+        Environment variables (all optional): TOOL_RESULT_MAX_CHARS,
+        TOOL_RESULT_MAX_POINTS, TOOL_RESULT_MAX_LOG_LINES, TOOL_RESULT_MAX_LIST_ITEMS,
+        TOOL_RESULT_MAX_STRING_CHARS
+
+        Returns:
+            ResultShaper: Configured shaper
+        """
+        return cls(
+            max_chars=int(os.environ.get('TOOL_RESULT_MAX_CHARS', 16000)),
+            max_series_points=int(os.environ.get('TOOL_RESULT_MAX_POINTS', 60)),
+            max_log_lines=int(os.environ.get('TOOL_RESULT_MAX_LOG_LINES', 100)),
+            max_list_items=int(os.environ.get('TOOL_RESULT_MAX_LIST_ITEMS', 100)),
+            max_string_chars=int(os.environ.get('TOOL_RESULT_MAX_STRING_CHARS', 4000))
+        )
+
+    def shape(self, result: Any) -> str:
+        """
+        Shape a tool result and serialize it compactly.
+
+        Args:
+            result: Raw result returned by the MCP server
+
+        Returns:
+            str: Serialized, size-bounded result
+        """
+        dropped: List[str] = []
+        shaped = self._shape_value(self._decode_text_content(result), "result", dropped)
+
+        if dropped:
+            shaped = {
+                "result": shaped,
+                "truncation": {
+                    "dropped": dropped,
+                    "hint": "Output was reduced. Narrow the query (time range, step, filters, limit) to see more detail."
+                }
+            }
+
+        serialized = json_codec.dumps(shaped, default=str)
+
+        if len(serialized) > self.max_chars:
+            logger.debug(f"Tool result of {len(serialized)} chars cut to {self.max_chars}")
+            serialized = (
+                serialized[:self.max_chars]
+                + f"... [truncated: {len(serialized) - self.max_chars} of {len(serialized)} chars dropped; "
+                f"narrow the query to see more]"
+            )
+
+        return serialized
+
+    async def shape_async(self, result: Any) -> str:
+        """
+        Shape a tool result, in the JSON codec's thread pool if it is large.
+
+        Args:
+            result: Raw result returned by the MCP server
+
+        Returns:
+            str: Serialized, size-bounded result
+        """
+        return await json_codec.offload(self._raw_size(result), self.shape, result)
+
+    @staticmethod
+    def _raw_size(result: Any) -> int:
+        """Size of the text content of an MCP result, which dominates the cost of shaping it."""
+        if not isinstance(result, dict) or not isinstance(result.get("content"), list):
+            return 0
+        return sum(
+            len(item["text"]) for item in result["content"]
+            if isinstance(item, dict) and isinstance(item.get("text"), str)
+        )
+
+    def _decode_text_content(self, result: Any) -> Any:
+        """Parse JSON carried inside MCP text content items so it can be shaped structurally."""
+        if not isinstance(result, dict) or not isinstance(result.get("content"), list):
+            return result
+
+        content = []
+        for item in result["content"]:
+            if isinstance(item, dict) and item.get("type") == "text" and isinstance(item.get("text"), str):
+                text = item["text"]
+                if text[:1] in ("{", "["):
+                    try:
+                        item = {**item, "text": json_codec.loads(text)}
+                    except ValueError:
+                        pass
+                elif text.count("\n") > self.max_log_lines:
+                    item = {**item, "text": text.splitlines()}
+            content.append(item)
+
+        return {**result, "content": content}
+
+    def _shape_value(self, value: Any, path: str, dropped: List[str]) -> Any:
+        """Recursively shape a decoded value, recording what was dropped."""
+        if isinstance(value, dict):
+            return {key: self._shape_value(item, f"{path}.{key}", dropped) for key, item in value.items()}
+
+        if isinstance(value, list):
+            return self._shape_list(value, path, dropped)
+
+        if isinstance(value, str) and len(value) > self.max_string_chars:
+            dropped.append(f"{path}: string cut from {len(value)} to {self.max_string_chars} chars")
+            return value[:self.max_string_chars] + "..."
+
+        return value
+
+    def _shape_list(self, items: List[Any], path: str, dropped: List[str]) -> Any:
+        """Shape a list as a time series, a log listing or a plain list."""
+        series = self._as_series(items)
+        if series is not None:
+            if len(series) <= self.max_series_points:
+                return items
+            dropped.append(
+                f"{path}: {len(series)} points downsampled to {self.max_series_points} min/max/avg buckets"
+            )
+            return self._downsample(series)
+
+        lines = self._as_log_lines(items)
+        if lines is not None and len(items) > self.max_log_lines:
+            dropped.append(
+                f"{path}: kept {self.max_log_lines} most relevant of {len(items)} log lines"
+            )
+            return [
+                self._shape_value(items[index], f"{path}[{index}]", dropped)
+                for index in self._top_log_lines(lines)
+            ]
+
+        if len(items) > self.max_list_items:
+            dropped.append(f"{path}: kept first {self.max_list_items} of {len(items)} items")
+            items = items[:self.max_list_items]
+
+        return [self._shape_value(item, f"{path}[{index}]", dropped) for index, item in enumerate(items)]
+
+    @staticmethod
+    def _as_series(items: List[Any]) -> Optional[List[Tuple[Any, float]]]:
+        """
+        Interpret a list as a time series of (timestamp, value) points.
+
+        Accepts Prometheus-style [timestamp, "value"] pairs and dicts with a
+        timestamp key and a value key. The timestamps must be epoch numbers
+        or ISO 8601 strings in strictly increasing order, so other numeric
+        pairs such as (port, connection count) are not mistaken for a series.
+
+        Returns:
+            Optional[List[Tuple]]: Points, or None if the list is not a time series
+        """
+        if len(items) < 2:
+            return None
+
+        first = items[0]
+        if isinstance(first, (list, tuple)) and len(first) == 2:
+            try:
+                series = [(point[0], float(point[1])) for point in items]
+            except (TypeError, ValueError, IndexError):
+                return None
+        elif isinstance(first, dict):
+            ts_key = next((key for key in TIMESTAMP_KEYS if key in first), None)
+            value_key = next((key for key in VALUE_KEYS if key in first), None)
+            if not ts_key or not value_key:
+                return None
+            try:
+                series = [(point[ts_key], float(point[value_key])) for point in items]
+            except (TypeError, ValueError, KeyError):
+                return None
+        else:
+            return None
+
+        previous = None
+        for timestamp, _ in series:
+            seconds = ResultShaper._timestamp_seconds(timestamp)
+            if seconds is None or (previous is not None and seconds <= previous):
+                return None
+            previous = seconds
+
+        return series
+
+    @staticmethod
+    def _timestamp_seconds(value: Any) -> Optional[float]:
+        """Sortable value of an epoch number or ISO 8601 string, or None if it is neither."""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                return None
+        return None
+
+    def _downsample(self, series: List[Tuple[Any, float]]) -> List[Dict[str, Any]]:
+        """Reduce a time series to evenly sized min/max/avg buckets."""
+        buckets = []
+        size = len(series) / self.max_series_points
+
+        for bucket in range(self.max_series_points):
+            chunk = series[int(bucket * size):int((bucket + 1) * size)]
+            if not chunk:
+                continue
+            values = [value for _, value in chunk]
+            buckets.append({
+                "start": chunk[0][0],
+                "end": chunk[-1][0],
+                "min": min(values),
+                "max": max(values),
+                "avg": round(sum(values) / len(values), 6),
+                "count": len(values)
+            })
+
+        return buckets
+
+    @staticmethod
+    def _as_log_lines(items: List[Any]) -> Optional[List[str]]:
+        """
+        Extract the text of each entry if the list looks like log lines.
+
+        Strings count as log lines if they carry a timestamp or a level; dicts
+        need a line key plus a timestamp or level key, or a log-shaped line.
+        At least half of the first LOG_SHAPE_SAMPLE entries must qualify, so
+        lists of names, alerts or other records are not ranked as logs.
+
+        Returns:
+            Optional[List[str]]: Text of each entry, or None if the list is not a log listing
+        """
+        if not items:
+            return None
+
+        first = items[0]
+        if isinstance(first, str):
+            lines = [str(item) for item in items]
+            log_shaped = [bool(LOG_SHAPE_PATTERN.search(line)) for line in lines[:LOG_SHAPE_SAMPLE]]
+        elif isinstance(first, dict):
+            key = next((key for key in LOG_LINE_KEYS if key in first), None)
+            if not key:
+                return None
+            lines = [str(item.get(key, "")) if isinstance(item, dict) else str(item) for item in items]
+            log_shaped = [
+                isinstance(item, dict) and (
+                    any(field in item for field in TIMESTAMP_KEYS + LOG_LEVEL_KEYS)
+                    or bool(LOG_SHAPE_PATTERN.search(line))
+                )
+                for item, line in zip(items[:LOG_SHAPE_SAMPLE], lines)
+            ]
+        else:
+            return None
+
+        if sum(log_shaped) * 2 < len(log_shaped):
+            return None
+        return lines
+
+    def _top_log_lines(self, lines: List[str]) -> List[int]:
+        """
+        Pick the indices of the most relevant log lines, in original order.
+
+        Lines are ranked by the number of incident-related terms they contain;
+        ties prefer later (more recent) lines.
+        """
+        ranked = sorted(
+            range(len(lines)),
+            key=lambda index: (len(LOG_RELEVANCE_PATTERN.findall(lines[index])), index),
+            reverse=True
+        )
+        return sorted(ranked[:self.max_log_lines])
@@ -0,0 +1,255 @@
+import asyncio
+import time
+
+from autonomous_incident_agent import AutonomousIncidentAgent
+from investigation import Investigation, InvestigationBudget
+from job_store import SQLiteJobStore
+from llm_client import StubLLMClient
+from tool_catalog import ToolCatalog
+
+
+def alert(alert_id="a"):
+    return {"alertId": alert_id, "message": "m", "entity": "e", "priority": "P3"}
+
+
+def tool_turn(*tool_ids):
+    return [
+        {"role": "assistant", "content": [{"type": "tool_use", "id": tool_id, "name": "grafana_query_prometheus", "input": {}} for tool_id in tool_ids]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": "ok"} for tool_id in tool_ids]}
+    ]
+
+
+def test_resumed_investigation_is_charged_for_earlier_time_and_tool_calls(tmp_path):
+    async def main():
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        try:
+            await store.create_job(alert())
+            messages = [{"role": "user", "content": [{"type": "text", "text": "investigate"}]}]
+            messages += tool_turn("t1", "t2") + tool_turn("t3")
+            await store.append_messages("a", 0, messages, elapsed_seconds=120)
+
+            agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0), job_store=store)
+            investigation = Investigation(alert(), budget=InvestigationBudget(deadline_seconds=300, max_tool_calls=20))
+            await agent._restore_checkpoint(investigation)
+            return investigation
+        finally:
+            await store.close()
+
+    investigation = asyncio.run(main())
+    assert investigation.resumed
+    assert investigation.iterations == 2
+    assert investigation.budget.tool_calls == 3
+    assert 175 < investigation.budget.remaining_seconds <= 180
+
+
+def test_checkpoint_records_elapsed_time(tmp_path):
+    async def main():
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        try:
+            await store.create_job(alert())
+            agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0), job_store=store)
+            budget = InvestigationBudget(deadline_seconds=300)
+            budget.carry_over(42, 0)
+            investigation = Investigation(alert(), messages=[{"role": "user", "content": "hi"}], budget=budget)
+            await agent._checkpoint(investigation)
+            return await store.get_job("a")
+        finally:
+            await store.close()
+
+    job = asyncio.run(main())
+    assert 42 <= job.elapsed_seconds < 43
+
+
+def test_cancelled_early_tool_calls_are_refunded():
+    async def main():
+        agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+        investigation = Investigation(alert(), budget=InvestigationBudget(max_tool_calls=5))
+
+        async def finished():
+            return {}
+
+        for _ in range(3):
+            investigation.budget.take_tool_call()
+        done = asyncio.create_task(finished())
+        await done
+        early_tools = {"t1": done, "t2": asyncio.create_task(asyncio.sleep(10)), "t3": asyncio.create_task(asyncio.sleep(10))}
+
+        agent._cancel_early_tools(investigation, early_tools)
+        await asyncio.sleep(0)
+        return investigation, early_tools
+
+    investigation, early_tools = asyncio.run(main())
+    assert early_tools == {}
+    assert investigation.budget.tool_calls == 1
+
+
+class Block:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class Response:
+    def __init__(self, stop_reason, content):
+        self.stop_reason = stop_reason
+        self.content = content
+        self.usage = None
+
+
+def test_early_tool_calls_cancelled_when_turn_ends_without_tool_use():
+    async def main():
+        agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+        investigation = Investigation(alert(), messages=[{"role": "user", "content": [{"type": "text", "text": "go"}]}])
+        started = []
+
+        async def call_model(investigation, early_tools, final=False):
+            investigation.budget.take_tool_call()
+            task = asyncio.create_task(asyncio.sleep(10))
+            early_tools["t1"] = task
+            started.append(task)
+            # The turn was cut off after the tool_use block streamed
+            return Response("max_tokens", [Block(type="text", text="partial")])
+
+        agent._call_model = call_model
+        result = await agent._conduct_autonomous_investigation(investigation)
+        return result, started[0], investigation
+
+    result, task, investigation = asyncio.run(main())
+    assert result == "partial"
+    assert task.cancelled()
+    assert investigation.budget.tool_calls == 0
+
+
+class FakeMCPClient:
+    """Answers tool calls after a per-query delay and tracks how many run at once."""
+
+    def __init__(self):
+        self.in_flight = {}
+        self.peak = {}
+
+    async def _run(self, server_name, calls):
+        self.in_flight[server_name] = self.in_flight.get(server_name, 0) + len(calls)
+        self.peak[server_name] = max(self.peak.get(server_name, 0), self.in_flight[server_name])
+        await asyncio.sleep(max(arguments["delay"] for _, arguments in calls))
+        self.in_flight[server_name] -= len(calls)
+        return [{"content": [{"type": "text", "text": f"{tool_name}:{arguments['delay']}"}]} for tool_name, arguments in calls]
+
+    async def call_tool(self, server_name, tool_name, arguments):
+        return (await self._run(server_name, [(tool_name, arguments)]))[0]
+
+    async def call_tools_batch(self, server_name, calls):
+        return await self._run(server_name, calls)
+
+
+def tool_agent(grafana_concurrency=8):
+    agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+    agent.mcp_client = FakeMCPClient()
+    agent.tool_catalog = ToolCatalog([
+        {"server": "grafana", "server_name": "Grafana", "name": "query_prometheus", "description": ""},
+        {"server": "opsgenie", "server_name": "OpsGenie", "name": "get_alert", "description": ""}
+    ])
+    agent.mcp_servers["grafana"]["max_concurrency"] = grafana_concurrency
+    agent._server_semaphores["grafana"] = asyncio.Semaphore(grafana_concurrency)
+    return agent
+
+
+def tool_use(tool_id, name, delay):
+    return Block(type="tool_use", id=tool_id, name=name, input={"delay": delay})
+
+
+def test_tool_calls_of_one_turn_run_concurrently_in_order():
+    agent = tool_agent()
+    content = [
+        tool_use("t1", "grafana_query_prometheus", 0.2),
+        tool_use("t2", "opsgenie_get_alert", 0.1),
+        tool_use("t3", "grafana_query_prometheus", 0.05),
+        tool_use("t4", "grafana_unknown_tool", 0)
+    ]
+
+    async def main():
+        started = time.monotonic()
+        results = await agent._execute_tool_calls(content, budget=InvestigationBudget())
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(main())
+    assert [result["tool_use_id"] for result in results] == ["t1", "t2", "t3", "t4"]
+    assert [result.get("is_error", False) for result in results] == [False, False, False, True]
+    assert "query_prometheus:0.2" in results[0]["content"]
+    assert "get_alert:0.1" in results[1]["content"]
+    assert elapsed < 0.28
+
+
+def test_tool_calls_stay_within_server_concurrency():
+    agent = tool_agent(grafana_concurrency=2)
+    content = [tool_use(f"t{index}", "grafana_query_prometheus", 0.05) for index in range(5)]
+
+    results = asyncio.run(agent._execute_tool_calls(content, budget=InvestigationBudget()))
+    assert not any(result.get("is_error") for result in results)
+    assert agent.mcp_client.peak["grafana"] == 2
+
+
+def test_single_conversation_cache_breakpoint_follows_newest_turn():
+    agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+    investigation = Investigation(alert(), messages=[{"role": "user", "content": [{"type": "text", "text": "investigate"}]}])
+    assert agent.system_prompt[0]["cache_control"] == {"type": "ephemeral"}
+
+    agent._move_cache_breakpoint(investigation)
+    investigation.messages += tool_turn("t1")
+    agent._move_cache_breakpoint(investigation)
+
+    marked = [
+        block for message in investigation.messages for block in message["content"]
+        if isinstance(block, dict) and "cache_control" in block
+    ]
+    assert marked == [investigation.messages[-1]["content"][-1]]
+
+
+def test_prompt_caching_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("PROMPT_CACHING", "false")
+    agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+    investigation = Investigation(alert(), messages=[{"role": "user", "content": [{"type": "text", "text": "investigate"}]}])
+
+    agent._move_cache_breakpoint(investigation)
+    assert "cache_control" not in agent.system_prompt[0]
+    assert "cache_control" not in investigation.messages[0]["content"][0]
+
+
+def test_triage_note_records_time_to_first_note():
+    agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+    investigation = Investigation({**alert(), "message": "Disk full", "receivedAt": time.time() - 5})
+    posted = []
+
+    async def update_opsgenie_ticket(alert_id, analysis, title):
+        posted.append((alert_id, title, analysis))
+
+    agent.update_opsgenie_ticket = update_opsgenie_ticket
+    content = [Block(type="text", text="Looks like log growth."), tool_use("t1", "grafana_query_prometheus", 0)]
+    tool_results = [
+        {"type": "tool_result", "tool_use_id": "t1", "content": "x" * 1000},
+        {"type": "tool_result", "tool_use_id": "t2", "content": "timeout", "is_error": True}
+    ]
+
+    asyncio.run(agent._post_triage_note(investigation, content, tool_results))
+    alert_id, title, note = posted[0]
+    assert alert_id == "a"
+    assert "INITIAL TRIAGE" in title
+    assert "**Initial assessment:** Looks like log growth." in note
+    assert f"- `grafana_query_prometheus`: {'x' * 300}..." in note
+    assert "- `tool` (error): timeout" in note
+    assert 5 <= investigation.time_to_first_note < 6
+
+    # Only the first note counts towards time-to-first-note
+    agent._note_posted(investigation)
+    assert agent._first_note_stats()["samples"] == 1
+
+
+def test_failed_triage_note_is_not_counted():
+    agent = AutonomousIncidentAgent(llm_client=StubLLMClient(latency=0))
+    investigation = Investigation(alert())
+
+    async def update_opsgenie_ticket(alert_id, analysis, title):
+        raise ConnectionError("OpsGenie unavailable")
+
+    agent.update_opsgenie_ticket = update_opsgenie_ticket
+    asyncio.run(agent._post_triage_note(investigation, [], []))
+    assert investigation.first_note_at is None
+    assert agent._first_note_stats() == {"samples": 0}
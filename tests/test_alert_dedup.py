@@ -0,0 +1,70 @@
+import time
+
+from alert_dedup import COALESCED, DUPLICATE, NEW, AlertDeduplicator
+
+
+def alert(alert_id, entity="api"):
+    return {"alertId": alert_id, "message": "m", "entity": entity, "priority": "P3"}
+
+
+def advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+
+def test_redelivery_is_duplicate():
+    dedup = AlertDeduplicator()
+    assert dedup.check(alert("a"), "Create").status == NEW
+    dedup.record(alert("a"), "Create")
+
+    assert dedup.check(alert("a"), "Create").status == DUPLICATE
+
+
+def test_follow_up_actions_on_investigated_alert_are_dropped_after_window(monkeypatch):
+    dedup = AlertDeduplicator(dedup_ttl=3600, coalesce_window=300)
+    dedup.record(alert("a"), "Create")
+    advance(monkeypatch, 600)
+
+    for action in ("Acknowledge", "AddNote", "Escalate"):
+        assert dedup.check(alert("a"), action).status == DUPLICATE
+
+
+def test_follow_up_actions_on_coalesced_alert_are_dropped():
+    dedup = AlertDeduplicator()
+    dedup.record(alert("a"), "Create")
+    assert dedup.check(alert("b"), "Create").status == COALESCED
+    dedup.complete(alert("a"))
+
+    assert dedup.check(alert("b"), "Acknowledge").status == DUPLICATE
+
+
+def test_investigated_alert_forgotten_after_ttl(monkeypatch):
+    dedup = AlertDeduplicator(dedup_ttl=60, coalesce_window=0)
+    dedup.record(alert("a"), "Create")
+    advance(monkeypatch, 120)
+
+    assert dedup.check(alert("a"), "Acknowledge").status == NEW
+
+
+def test_alerts_coalesce_until_investigation_completes():
+    dedup = AlertDeduplicator()
+    primary = alert("a")
+    dedup.record(primary, "Create")
+
+    decision = dedup.check(alert("b"), "Create")
+    assert decision.status == COALESCED
+    assert decision.primary_alert_id == "a"
+    assert [related["alertId"] for related in primary["coalescedAlerts"]] == ["b"]
+
+    dedup.complete(primary)
+    assert dedup.check(alert("c"), "Create").status == NEW
+
+
+def test_complete_keeps_window_of_newer_primary():
+    dedup = AlertDeduplicator()
+    dedup.record(alert("a"), "Create")
+    dedup.complete(alert("a"))
+    dedup.record(alert("b"), "Create")
+
+    dedup.complete(alert("a"))
+    assert dedup.check(alert("c"), "Create").status == COALESCED
@@ -0,0 +1,59 @@
+from context_compaction import ELISION_MARKER, ContextCompactor, ContextPolicy, estimate_tokens
+
+
+def conversation(rounds, result_chars=20000):
+    """An alert prompt followed by `rounds` tool_use/tool_result exchanges."""
+    messages = [{"role": "user", "content": "Investigate alert: Disk full on api-1"}]
+    for index in range(rounds):
+        messages.append({"role": "assistant", "content": [
+            {"type": "tool_use", "id": f"toolu_{index}", "name": "query_prometheus", "input": {"query": "up"}}
+        ]})
+        messages.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": f"toolu_{index}", "content": str(index) * result_chars}
+        ]})
+    return messages
+
+
+def elided(message):
+    return [block["content"].startswith(ELISION_MARKER) for block in message["content"]]
+
+
+def test_budget_depends_on_priority():
+    compactor = ContextCompactor()
+    messages = conversation(12)
+    assert 50000 < estimate_tokens(messages) < 80000
+
+    assert compactor.compact(messages, "P1") == 0
+    assert compactor.compact(messages, "P2") == 0
+    assert compactor.compact(messages, "P3") > 0
+
+
+def test_compacts_down_to_target_ratio():
+    compactor = ContextCompactor(target_ratio=0.7)
+    messages = conversation(12)
+
+    compactor.compact(messages, "P3")
+    # Stops as soon as the conversation is under 70% of the 50k budget
+    assert 35000 - 5000 < estimate_tokens(messages) <= 35000
+
+
+def test_recent_turns_are_kept_verbatim():
+    compactor = ContextCompactor(policies={"P3": ContextPolicy(token_budget=1000, keep_recent_turns=2)})
+    messages = conversation(6)
+    recent = [message["content"][0]["content"] for message in messages[-3::2]]
+
+    compactor.compact(messages, "P3")
+    tool_results = messages[2::2]
+    assert [elided(message) for message in tool_results] == [[True]] * 4 + [[False]] * 2
+    assert [message["content"][0]["content"] for message in messages[-3::2]] == recent
+
+
+def test_elided_results_stay_paired_with_their_tool_use():
+    compactor = ContextCompactor(policies={"P3": ContextPolicy(token_budget=1000, keep_recent_turns=1)})
+    messages = conversation(6)
+
+    compactor.compact(messages, "P3")
+    for assistant, user in zip(messages[1::2], messages[2::2]):
+        assert user["content"][0]["type"] == "tool_result"
+        assert user["content"][0]["tool_use_id"] == assistant["content"][0]["id"]
+    assert messages[0]["content"] == "Investigate alert: Disk full on api-1"
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from health_monitor import HealthMonitor
+
+
+class FakeClient:
+    """Stands in for MCPClient: pings fail for servers listed in `down`."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.pings = []
+
+    async def ping(self, server_name):
+        self.pings.append(server_name)
+        if server_name in self.down:
+            raise ConnectionError("Connection refused")
+
+    def get_circuit_state(self, server_name):
+        return {"state": "closed"}
+
+
+SERVERS = {"grafana": {"url": "http://grafana-mcp:8000"}, "opsgenie": {"url": "http://opsgenie-mcp:8001"}}
+
+
+def advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+
+def probed_monitor(client, ttl=90):
+    monitor = HealthMonitor(client, SERVERS, ttl=ttl)
+
+    async def probe_all():
+        for server_name in SERVERS:
+            await monitor._probe(server_name)
+
+    asyncio.run(probe_all())
+    return monitor
+
+
+def test_snapshot_is_served_from_cache():
+    client = FakeClient(down={"opsgenie"})
+    monitor = probed_monitor(client)
+
+    snapshot = monitor.snapshot()
+    monitor.snapshot()
+    assert client.pings == ["grafana", "opsgenie"]
+    assert not snapshot["healthy"]
+    assert snapshot["servers"]["grafana"]["status"] == "healthy"
+    assert snapshot["servers"]["opsgenie"]["status"] == "unhealthy"
+    assert snapshot["servers"]["opsgenie"]["error"] == "Connection refused"
+
+
+def test_results_older_than_ttl_are_stale(monkeypatch):
+    monitor = probed_monitor(FakeClient(), ttl=90)
+    assert monitor.snapshot()["healthy"]
+
+    advance(monkeypatch, 60)
+    assert monitor.snapshot()["healthy"]
+
+    advance(monkeypatch, 91)
+    snapshot = monitor.snapshot()
+    assert not snapshot["healthy"]
+    assert {entry["status"] for entry in snapshot["servers"].values()} == {"stale"}
+
+
+def test_unprobed_server_is_not_ready():
+    snapshot = HealthMonitor(FakeClient(), SERVERS).snapshot()
+
+    assert not snapshot["healthy"]
+    assert snapshot["servers"]["grafana"]["status"] == "unknown"
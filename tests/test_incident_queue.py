@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from incident_queue import IncidentQueue, QueueClosedError, QueueFullError, priority_rank
+
+
+def alert(alert_id, priority="P3"):
+    return {"alertId": alert_id, "message": "m", "entity": "e", "priority": priority}
+
+
+def test_unknown_priority_ranks_as_p3():
+    assert priority_rank(alert("a", "p1")) == 1
+    assert priority_rank(alert("a", "urgent")) == 3
+    assert priority_rank({"alertId": "a"}) == 3
+
+
+def test_most_urgent_alert_runs_first():
+    processed = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def handler(alert_data):
+            if alert_data["alertId"] == "busy":
+                await release.wait()
+            processed.append(alert_data["alertId"])
+
+        queue = IncidentQueue(handler, workers=1, max_depth=10)
+        queue.start()
+        queue.submit(alert("busy"))
+        await asyncio.sleep(0)
+
+        for alert_id, priority in (("p4", "P4"), ("p3-first", "P3"), ("p1", "P1"), ("p3-second", "P3"), ("p2", "P2")):
+            queue.submit(alert(alert_id, priority))
+        release.set()
+        await queue.drain(timeout=1)
+
+    asyncio.run(main())
+    assert processed == ["busy", "p1", "p2", "p3-first", "p3-second", "p4"]
+
+
+def test_sheds_alerts_beyond_max_depth():
+    async def main():
+        release = asyncio.Event()
+
+        async def handler(alert_data):
+            await release.wait()
+
+        queue = IncidentQueue(handler, workers=1, max_depth=2)
+        queue.start()
+        queue.submit(alert("running"))
+        await asyncio.sleep(0)
+
+        assert queue.submit(alert("a")) == 1
+        assert queue.submit(alert("b")) == 2
+        with pytest.raises(QueueFullError):
+            queue.submit(alert("c", "P1"))
+
+        release.set()
+        await queue.drain(timeout=1)
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert stats["accepted"] == 3
+    assert stats["rejected_full"] == 1
+    assert stats["processed"] == 3
+
+
+def test_rejects_alerts_once_draining():
+    async def main():
+        async def handler(alert_data):
+            pass
+
+        queue = IncidentQueue(handler, workers=1)
+        with pytest.raises(QueueClosedError):
+            queue.submit(alert("early"))
+
+        queue.start()
+        await queue.drain(timeout=1)
+        with pytest.raises(QueueClosedError):
+            queue.submit(alert("late"))
+        return queue.stats()
+
+    assert asyncio.run(main())["rejected_closed"] == 2
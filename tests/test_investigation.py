@@ -0,0 +1,79 @@
+import time
+
+from investigation import InvestigationBudget, TokenUsage
+
+
+def advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+
+def test_summarizes_when_time_reaches_margin(monkeypatch):
+    budget = InvestigationBudget(deadline_seconds=300, summarize_margin=30)
+    advance(monkeypatch, 260)
+    assert budget.summarize_reason(1, TokenUsage(), 1000) is None
+
+    advance(monkeypatch, 11)
+    assert budget.summarize_reason(1, TokenUsage(), 1000) == "time"
+
+
+def test_margin_is_capped_at_half_the_deadline():
+    budget = InvestigationBudget(deadline_seconds=40, summarize_margin=30)
+
+    assert budget.summarize_margin == 20
+    assert budget.summarize_reason(1, TokenUsage(), 1000) is None
+
+
+def test_summarizes_when_turns_or_tokens_run_out():
+    budget = InvestigationBudget(max_iterations=5, max_tokens=10000)
+    usage = TokenUsage(input_tokens=6000, output_tokens=1000)
+
+    assert budget.summarize_reason(4, usage, 1000) is None
+    assert budget.summarize_reason(5, usage, 1000) == "turns"
+    # 3000 tokens left cannot cover two more turns of 2000
+    assert budget.summarize_reason(4, usage, 2000) == "tokens"
+
+
+def test_tool_calls_are_exhausted():
+    budget = InvestigationBudget(max_tool_calls=2)
+
+    assert budget.take_tool_call()
+    assert budget.take_tool_call()
+    assert not budget.take_tool_call()
+    assert budget.tool_calls == 2
+    assert budget.remaining_tool_calls == 0
+    assert budget.summarize_reason(1, TokenUsage(), 1000) == "tool calls"
+
+    budget.refund_tool_call()
+    assert budget.take_tool_call()
+
+
+def test_describe_reports_budget_left_before_summary(monkeypatch):
+    advance(monkeypatch, 0)
+    budget = InvestigationBudget(deadline_seconds=300, max_tool_calls=20, max_iterations=20, summarize_margin=30)
+    budget.take_tool_call()
+    advance(monkeypatch, 70)
+
+    description = budget.describe(3, TokenUsage())
+    assert "200s, 19 tool calls, 16 more turns." in description
+    assert "tokens" not in description
+
+    budget.max_tokens = 5000
+    assert "200s, 19 tool calls, 16 more turns, 4000 tokens." in budget.describe(3, TokenUsage(input_tokens=800, output_tokens=200))
+
+
+class Usage:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def test_usage_separates_cached_input_tokens():
+    usage = TokenUsage()
+    usage.add(Usage(input_tokens=1000, cache_creation_input_tokens=3000, cache_read_input_tokens=None, output_tokens=200))
+    usage.add(Usage(input_tokens=500, cache_read_input_tokens=3500, output_tokens=100))
+    usage.add(None)
+
+    assert usage.model_calls == 3
+    assert usage.total_input_tokens == 8000
+    assert usage.cache_hit_ratio == 3500 / 8000
+    assert usage.as_dict()["cache_creation_input_tokens"] == 3000
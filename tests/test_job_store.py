@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+from job_store import COMPLETED, FAILED, QUEUED, RUNNING, SQLiteJobStore
+
+
+def alert(alert_id, priority="P3"):
+    return {"alertId": alert_id, "message": "m", "entity": "e", "priority": priority}
+
+
+def run(tmp_path, scenario):
+    async def main():
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        try:
+            await scenario(store)
+        finally:
+            await store.close()
+
+    asyncio.run(main())
+
+
+async def expire_lease(store, job_id):
+    await store._run(store._execute, "UPDATE jobs SET lease_expires = ? WHERE job_id = ?", (time.time() - 1, job_id))
+
+
+def test_create_job_rejects_unfinished_duplicate_and_replaces_finished(tmp_path):
+    async def scenario(store):
+        assert await store.create_job(alert("a"))
+        assert not await store.create_job(alert("a"))
+
+        await store.complete_job("a", "done")
+        assert await store.create_job(alert("a"))
+        job = await store.get_job("a")
+        assert job.state == QUEUED
+        assert job.result is None
+
+    run(tmp_path, scenario)
+
+
+def test_claim_takes_most_urgent_job_first(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("low", "P5"))
+        await store.create_job(alert("high", "P1"))
+
+        first = await store.claim_job("a", lease_seconds=60, max_attempts=3)
+        second = await store.claim_job("a", lease_seconds=60, max_attempts=3)
+        assert (first.job_id, second.job_id) == ("high", "low")
+        assert first.lease_owner == "a"
+
+    run(tmp_path, scenario)
+
+
+def test_leased_job_is_not_claimed_by_another_owner(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        assert await store.claim_job("owner-1", lease_seconds=60, max_attempts=3) is not None
+        assert await store.claim_job("owner-2", lease_seconds=60, max_attempts=3) is None
+
+    run(tmp_path, scenario)
+
+
+def test_renew_lease_only_by_owner(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        await store.claim_job("owner-1", lease_seconds=60, max_attempts=3)
+
+        assert await store.renew_lease("a", "owner-1", 60)
+        assert not await store.renew_lease("a", "owner-2", 60)
+
+    run(tmp_path, scenario)
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        await store.claim_job("dead", lease_seconds=60, max_attempts=3)
+        await store.mark_running("a")
+        await expire_lease(store, "a")
+
+        job = await store.claim_job("alive", lease_seconds=60, max_attempts=3)
+        assert job.job_id == "a"
+        assert job.state == RUNNING
+        assert job.lease_owner == "alive"
+        assert not await store.renew_lease("a", "dead", 60)
+
+    run(tmp_path, scenario)
+
+
+def test_released_job_is_claimable_immediately(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        await store.claim_job("owner-1", lease_seconds=60, max_attempts=3)
+        await store.release_job("a", "owner-1")
+
+        job = await store.claim_job("owner-2", lease_seconds=60, max_attempts=3)
+        assert job.lease_owner == "owner-2"
+
+    run(tmp_path, scenario)
+
+
+def test_job_failed_after_max_attempts(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        for _ in range(2):
+            await store.claim_job("owner", lease_seconds=60, max_attempts=2)
+            await store.mark_running("a")
+            await expire_lease(store, "a")
+
+        assert await store.claim_job("owner", lease_seconds=60, max_attempts=2) is None
+        job = await store.get_job("a")
+        assert job.state == FAILED
+        assert job.lease_owner is None
+
+    run(tmp_path, scenario)
+
+
+def test_finished_job_is_not_renewable_and_drops_checkpoints(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        await store.claim_job("owner", lease_seconds=60, max_attempts=3)
+        await store.append_messages("a", 0, [{"role": "user", "content": "hi"}])
+        assert await store.load_messages("a") == [{"role": "user", "content": "hi"}]
+
+        await store.complete_job("a", "done")
+        assert not await store.renew_lease("a", "owner", 60)
+        assert await store.load_messages("a") == []
+        assert (await store.get_job("a")).state == COMPLETED
+
+    run(tmp_path, scenario)
+
+
+def test_backlog_counts_queued_jobs(tmp_path):
+    async def scenario(store):
+        await store.create_job(alert("a"))
+        await store.create_job(alert("b"))
+        await store.create_job(alert("c"))
+        await store.claim_job("owner", lease_seconds=60, max_attempts=3)
+        await store.mark_running("c")
+        await store.complete_job("b", "done")
+
+        assert await store.backlog() == 1
+
+    run(tmp_path, scenario)
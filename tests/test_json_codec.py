@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import json_codec
+
+VALUES = [
+    {"alertId": "a-1", "priority": "P1", "tags": ["db", "prod"], "count": 3, "ratio": 0.25, "ack": False, "owner": None},
+    {"message": "Disque plein sur api-1 — 95%", "emoji": "\U0001F525"},
+    {"nested": {"series": [[1714557600, "0.5"], [1714557660, "1.0"]]}, "empty": {}},
+    {1: "int key", "b": 2},
+    {"huge": 2 ** 70},
+    ["tuple", (1, 2)],
+    1.0,
+    "plain string"
+]
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(json_codec, "BACKEND", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_backends_encode_identically(backend, value):
+    expected = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    assert json_codec.dumps(value) == expected
+    assert json_codec.dumps_bytes(value) == expected.encode("utf-8")
+
+
+def test_sorted_keys_are_stable(backend):
+    arguments = {"query": "up", "end": "now", "datasource": {"uid": "prom", "type": "prometheus"}}
+
+    assert json_codec.dumps(arguments, sort_keys=True) == json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+
+
+def test_default_handles_unserializable_values(backend):
+    assert json_codec.dumps({"error": ValueError("boom")}, default=str) == '{"error":"boom"}'
+    with pytest.raises(TypeError):
+        json_codec.dumps({"error": ValueError("boom")})
+
+
+def test_backends_decode_identically(backend):
+    text = json.dumps(VALUES[:3], ensure_ascii=False)
+
+    assert json_codec.loads(text) == json.loads(text)
+    assert json_codec.loads(text.encode("utf-8")) == json.loads(text)
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads("{not json")
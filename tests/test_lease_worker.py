@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+from incident_queue import IncidentQueue
+from job_store import RUNNING, SQLiteJobStore
+from lease_worker import LeaseWorker
+
+
+def alert(alert_id):
+    return {"alertId": alert_id, "message": "m", "entity": "e", "priority": "P3"}
+
+
+async def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def run(tmp_path, handler_factory, scenario, lease_seconds=0.3, setup=None):
+    """Run a scenario against a LeaseWorker feeding a real IncidentQueue from a SQLite store."""
+    async def main():
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        if setup is not None:
+            await setup(store)
+        handler = handler_factory(store)
+        worker = None
+
+        async def run_incident(alert_data):
+            await worker.run(alert_data, handler)
+
+        queue = IncidentQueue(run_incident, workers=2, max_depth=10)
+        worker = LeaseWorker(store, queue, owner="local", lease_seconds=lease_seconds, poll_interval=0.05)
+        queue.start()
+        worker.start()
+        try:
+            await scenario(store, worker)
+        finally:
+            await worker.stop()
+            await queue.drain(timeout=1)
+            await store.close()
+
+    asyncio.run(main())
+
+
+def test_claims_and_completes_new_job(tmp_path):
+    processed = []
+
+    def handler_factory(store):
+        async def handler(alert_data):
+            processed.append(alert_data["alertId"])
+            await store.complete_job(alert_data["alertId"], "done")
+        return handler
+
+    async def scenario(store, worker):
+        await store.create_job(alert("a"))
+        worker.notify()
+        await wait_for(lambda: processed == ["a"])
+        await wait_for(lambda: worker.stats()["held"] == 0)
+        assert worker.stats()["claimed"] == 1
+        assert worker.stats()["taken_over"] == 0
+
+    run(tmp_path, handler_factory, scenario)
+
+
+def test_takes_over_job_whose_lease_expired(tmp_path):
+    processed = []
+
+    def handler_factory(store):
+        async def handler(alert_data):
+            processed.append(alert_data["alertId"])
+            await store.complete_job(alert_data["alertId"], "done")
+        return handler
+
+    async def setup(store):
+        # Left behind by a replica that died mid-investigation
+        await store.create_job(alert("a"))
+        await store.claim_job("dead", lease_seconds=0.2, max_attempts=3)
+        await store.mark_running("a")
+
+    async def scenario(store, worker):
+        await wait_for(lambda: processed == ["a"])
+        assert worker.stats()["taken_over"] == 1
+
+    run(tmp_path, handler_factory, scenario, setup=setup)
+
+
+def test_cancels_job_when_lease_is_lost(tmp_path):
+    state = {"started": False, "cancelled": False}
+
+    def handler_factory(store):
+        async def handler(alert_data):
+            state["started"] = True
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+        return handler
+
+    async def scenario(store, worker):
+        await store.create_job(alert("a"))
+        worker.notify()
+        await wait_for(lambda: state["started"])
+
+        # Another replica took the job over
+        await store._run(store._execute, "UPDATE jobs SET lease_owner = 'other' WHERE job_id = 'a'")
+
+        await wait_for(lambda: state["cancelled"])
+        assert worker.stats()["lost"] == 1
+        await wait_for(lambda: worker.stats()["held"] == 0)
+
+    run(tmp_path, handler_factory, scenario)
+
+
+def test_renews_leases_of_running_jobs(tmp_path):
+    state = {"started": False}
+
+    def handler_factory(store):
+        async def handler(alert_data):
+            state["started"] = True
+            await asyncio.sleep(30)
+        return handler
+
+    async def scenario(store, worker):
+        await store.create_job(alert("a"))
+        worker.notify()
+        await wait_for(lambda: state["started"])
+
+        # Well past the original lease: renewals keep it away from other replicas
+        await asyncio.sleep(0.6)
+        assert await store.claim_job("other", lease_seconds=60, max_attempts=3) is None
+        assert worker.stats()["lost"] == 0
+
+    run(tmp_path, handler_factory, scenario)
+
+
+def test_stop_releases_held_leases(tmp_path):
+    state = {"started": False}
+
+    def handler_factory(store):
+        async def handler(alert_data):
+            state["started"] = True
+            await store.mark_running(alert_data["alertId"])
+            await asyncio.sleep(30)
+        return handler
+
+    async def scenario(store, worker):
+        await store.create_job(alert("a"))
+        worker.notify()
+        await wait_for(lambda: state["started"])
+
+        await worker.stop()
+        job = await store.claim_job("other", lease_seconds=60, max_attempts=3)
+        assert job is not None
+        assert job.state == RUNNING
+
+    run(tmp_path, handler_factory, scenario, lease_seconds=60)
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from loop_monitor import LoopMonitor
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+def run_with_monitor(monitor, scenario):
+    async def main():
+        monitor.start()
+        try:
+            await scenario()
+        finally:
+            await monitor.stop()
+        return monitor.stats()
+
+    return asyncio.run(main())
+
+
+def test_blocking_callback_is_reported_with_its_stack():
+    monitor = LoopMonitor(interval=0.05, slow_callback_threshold=0.1)
+
+    async def scenario():
+        await asyncio.sleep(0.1)
+        block_the_loop(0.4)
+        await asyncio.sleep(0.1)
+
+    stats = run_with_monitor(monitor, scenario)
+    assert stats["slow_callbacks"] == 1
+    assert "block_the_loop" in stats["last_slow_callback"]["stack"]
+    assert stats["lag_seconds"]["max"] >= 0.3
+
+
+def test_idle_loop_has_no_slow_callbacks():
+    monitor = LoopMonitor(interval=0.02, slow_callback_threshold=0.2)
+
+    async def scenario():
+        await asyncio.sleep(0.2)
+
+    stats = run_with_monitor(monitor, scenario)
+    assert stats["slow_callbacks"] == 0
+    assert stats["last_slow_callback"] is None
+    assert stats["lag_seconds"]["p50"] < 0.05
+
+
+def test_watchdog_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("SLOW_CALLBACK_THRESHOLD", "0")
+    monitor = LoopMonitor.from_env()
+
+    async def scenario():
+        assert monitor._watchdog is None
+        await asyncio.sleep(0)
+
+    assert monitor.slow_callback_threshold is None
+    run_with_monitor(monitor, scenario)
@@ -0,0 +1,117 @@
+import asyncio
+
+from mcp_client import MCPClient
+from resilience import RetryPolicy
+from tool_cache import ToolResultCache
+
+
+def client_with_annotations(tools):
+    client = MCPClient()
+    for name, annotations in tools.items():
+        client._tool_annotations[("opsgenie", name)] = annotations
+    return client
+
+
+def test_idempotent_mutating_tool_is_not_read_only():
+    client = client_with_annotations({
+        "get_alert": {"readOnlyHint": True},
+        "add_tags": {"readOnlyHint": False, "idempotentHint": True},
+        "add_note": {"readOnlyHint": False}
+    })
+
+    assert client.is_read_only("opsgenie", "get_alert")
+    assert client.is_idempotent("opsgenie", "add_tags")
+    assert not client.is_read_only("opsgenie", "add_tags")
+    assert not client.is_read_only("opsgenie", "add_note")
+
+
+def test_unannotated_tool_is_not_read_only():
+    client = client_with_annotations({"get_alert": {}})
+
+    assert client.is_idempotent("opsgenie", "get_alert")
+    assert not client.is_read_only("opsgenie", "get_alert")
+
+
+class FakeServer:
+    """Answers tools/call messages and batches in place of the transport."""
+
+    def __init__(self, batch_response=None, error=None):
+        self.batch_response = batch_response
+        self.error = error
+        self.requests = []
+
+    async def send(self, server_name, message, latency_keys):
+        self.requests.append(message)
+        await asyncio.sleep(0.05)
+        if isinstance(message, list):
+            if self.error is not None:
+                raise self.error
+            if self.batch_response is not None:
+                return self.batch_response
+            return [self.answer(entry) for entry in message]
+        return self.answer(message)
+
+    @staticmethod
+    def answer(message):
+        query = message["params"]["arguments"]["query"]
+        return {"jsonrpc": "2.0", "id": message["id"], "result": {"content": [{"type": "text", "text": query}]}}
+
+    def tool_calls(self):
+        return sum(len(request) if isinstance(request, list) else 1 for request in self.requests)
+
+
+def batching_client(server):
+    client = MCPClient(tool_cache=ToolResultCache(), retry_policy=RetryPolicy(max_attempts=1))
+    client.connected_servers["grafana"] = {"transport": None}
+
+    async def ensure_session():
+        pass
+
+    client._ensure_session = ensure_session
+    client._send_guarded = server.send
+    return client
+
+
+def queries(*names):
+    return [("query_prometheus", {"query": name}) for name in names]
+
+
+def test_concurrent_batches_share_identical_reads():
+    server = FakeServer()
+    client = batching_client(server)
+
+    async def main():
+        return await asyncio.gather(
+            client.call_tools_batch("grafana", queries("a", "b")),
+            client.call_tools_batch("grafana", queries("a", "b", "c"))
+        )
+
+    first, second = asyncio.run(main())
+    assert [result["content"][0]["text"] for result in first + second] == ["a", "b", "a", "b", "c"]
+    assert server.tool_calls() == 3
+
+
+def test_batch_rejected_with_error_object_disables_batching():
+    server = FakeServer(batch_response={"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}})
+    client = batching_client(server)
+
+    results = asyncio.run(client.call_tools_batch("grafana", queries("a", "b")))
+    assert [result["content"][0]["text"] for result in results] == ["a", "b"]
+    assert client.connected_servers["grafana"]["supports_batch"] is False
+
+
+def test_failed_batch_keeps_batching_enabled():
+    server = FakeServer(error=ValueError("Invalid JSON in response"))
+    client = batching_client(server)
+
+    async def main():
+        results = await client.call_tools_batch("grafana", queries("a", "b"))
+        # Failures are not cached or left in flight: the next batch is sent again
+        server.error = None
+        return results, await client.call_tools_batch("grafana", queries("a", "b"))
+
+    failed, retried = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in failed)
+    assert client.connected_servers["grafana"].get("supports_batch", True)
+    assert [result["content"][0]["text"] for result in retried] == ["a", "b"]
+    assert isinstance(server.requests[-1], list)
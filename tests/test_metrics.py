@@ -0,0 +1,57 @@
+import pytest
+
+from metrics import NOOP, Metrics, metrics
+
+requires_metrics = pytest.mark.skipif(not metrics.enabled, reason="prometheus_client is not installed or metrics are disabled")
+
+
+class Usage:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def test_disabled_metrics_are_noops():
+    disabled = Metrics(enabled=False)
+
+    assert disabled.mcp_tool_seconds("grafana", "query_prometheus") is NOOP
+    disabled.observe_usage(Usage(input_tokens=10))
+    disabled.errors["mcp"].inc()
+    assert disabled.render() is None
+
+
+@requires_metrics
+def test_label_children_are_bound_once():
+    assert metrics.mcp_tool_seconds("grafana", "query_prometheus") is metrics.mcp_tool_seconds("grafana", "query_prometheus")
+    assert metrics.mcp_batch_seconds("grafana") is metrics.mcp_batch_seconds("grafana")
+    assert metrics.investigation_seconds("P1", "completed") is metrics.investigation_seconds("P1", "completed")
+    assert metrics.retry("timeout") is metrics.retry("timeout")
+
+
+@requires_metrics
+def test_usage_is_counted_by_token_type():
+    import prometheus_client
+
+    def count(token_type):
+        return prometheus_client.REGISTRY.get_sample_value("incident_agent_model_tokens_total", {"type": token_type}) or 0
+
+    before = {token_type: count(token_type) for token_type in ("input", "cache_read_input", "output")}
+    metrics.observe_usage(Usage(input_tokens=120, cache_read_input_tokens=3000, cache_creation_input_tokens=None, output_tokens=45))
+
+    assert count("input") - before["input"] == 120
+    assert count("cache_read_input") - before["cache_read_input"] == 3000
+    assert count("output") - before["output"] == 45
+
+
+@requires_metrics
+def test_render_exposes_hot_path_families():
+    metrics.mcp_tool_seconds("grafana", "query_prometheus").observe(0.2)
+
+    exposition = metrics.render().decode()
+    for family in (
+        "incident_agent_mcp_tool_call_duration_seconds",
+        "incident_agent_webhook_duration_seconds",
+        "incident_agent_queue_wait_seconds",
+        "incident_agent_model_tokens_total"
+    ):
+        assert family in exposition
+    assert 'incident_agent_mcp_tool_call_duration_seconds_count{server="grafana",tool="query_prometheus"}' in exposition
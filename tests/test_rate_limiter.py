@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from rate_limiter import ModelRateLimiter
+
+
+def test_reserve_is_held_back_for_p1_and_p2():
+    limiter = ModelRateLimiter(requests_per_minute=10, tokens_per_minute=0, priority_reserve=0.2)
+    for _ in range(8):
+        limiter._grant(0)
+
+    # 2 of 10 requests left: only the reserved headroom remains
+    assert limiter._wait_time(0, rank=1) == 0
+    assert limiter._wait_time(0, rank=2) == 0
+    assert limiter._wait_time(0, rank=3) > 0
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    limiter = ModelRateLimiter(requests_per_minute=6000, tokens_per_minute=0, priority_reserve=0)
+    order = []
+
+    async def call(name, rank):
+        await limiter.acquire(0, rank)
+        order.append(name)
+
+    async def main():
+        limiter.on_rate_limited()
+        tasks = [asyncio.create_task(call(name, rank)) for name, rank in (("a", 3), ("b", 3), ("c", 1), ("d", 3))]
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+    asyncio.run(main())
+    assert order == ["c", "a", "b", "d"]
+    assert limiter.stats()["queued"] == 4
+
+
+def test_settle_refunds_unused_reservation():
+    limiter = ModelRateLimiter(requests_per_minute=0, tokens_per_minute=1000, default_output_tokens=400)
+
+    asyncio.run(limiter.acquire(500, rank=3))
+    assert limiter.tokens.tokens == pytest.approx(500, abs=1)
+
+    limiter.settle(500, input_tokens=100, output_tokens=50)
+    assert limiter.tokens.tokens == pytest.approx(850, abs=1)
+    assert limiter.expected_output_tokens == pytest.approx(365)
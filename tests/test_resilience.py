@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, TIMEOUT, CallTimeoutError, CircuitBreaker, CircuitOpenError,
+    LatencyTracker, RetryPolicy, classify_error
+)
+
+
+def advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+
+def test_call_timeout_is_not_retried():
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        raise CallTimeoutError("Request to server 'grafana' timed out after 60.0s", 60)
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0)
+    try:
+        asyncio.run(policy.run("tool call", call))
+    except CallTimeoutError:
+        pass
+    else:
+        raise AssertionError("CallTimeoutError was swallowed")
+
+    assert classify_error(CallTimeoutError("timed out", 60)) is None
+    assert len(attempts) == 1
+
+
+def test_transient_errors_are_classified():
+    assert classify_error(asyncio.TimeoutError()) == TIMEOUT
+    assert classify_error(ConnectionResetError()) is not None
+    assert classify_error(CircuitOpenError("grafana", 5)) is None
+    assert classify_error(ValueError("bad arguments")) is None
+
+
+def open_breaker():
+    breaker = CircuitBreaker("grafana", failure_rate_threshold=0.5, min_requests=4, open_seconds=30)
+    for ok in (True, False, False):
+        breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_breaker_opens_at_failure_rate_and_fails_fast():
+    breaker = open_breaker()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.snapshot()["times_opened"] == 1
+
+
+def test_half_open_probe_success_closes_breaker(monkeypatch):
+    breaker = open_breaker()
+    advance(monkeypatch, 31)
+
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window_requests"] == 0
+
+
+def test_half_open_probe_failure_reopens_breaker(monkeypatch):
+    breaker = open_breaker()
+    advance(monkeypatch, 31)
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_released_probe_frees_half_open_slot(monkeypatch):
+    breaker = open_breaker()
+    advance(monkeypatch, 31)
+
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_timeout_defaults_until_enough_samples():
+    tracker = LatencyTracker(default_timeout=60, min_samples=10)
+    for _ in range(9):
+        tracker.record("query_prometheus", 4.0)
+
+    assert tracker.timeout_for("query_prometheus") == 60
+    tracker.record("query_prometheus", 4.0)
+    assert tracker.timeout_for("query_prometheus") == 12.0
+
+
+def test_timeout_is_clamped_to_bounds():
+    tracker = LatencyTracker(min_timeout=5, max_timeout=60, multiplier=3.0, min_samples=10)
+    for _ in range(10):
+        tracker.record("fast", 0.1)
+        tracker.record("slow", 45.0)
+
+    assert tracker.timeout_for("fast") == 5
+    assert tracker.timeout_for("slow") == 60
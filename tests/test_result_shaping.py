@@ -0,0 +1,64 @@
+from result_shaping import LOG_RELEVANCE_PATTERN, ResultShaper
+
+
+def test_from_env_reads_max_string_chars(monkeypatch):
+    monkeypatch.setenv("TOOL_RESULT_MAX_STRING_CHARS", "123")
+
+    assert ResultShaper.from_env().max_string_chars == 123
+
+
+def test_5xx_counts_only_as_status_code():
+    for line in ('status=503 upstream failed', '{"status": 500}', '"GET / HTTP/1.1" 502 0', "status_code: 504"):
+        assert LOG_RELEVANCE_PATTERN.search(line), line
+
+    for line in ("allocated 512 MiB", "took 1500ms", "pod api-5123 started"):
+        assert not LOG_RELEVANCE_PATTERN.search(line), line
+
+
+def test_log_lines_keep_most_relevant():
+    shaper = ResultShaper(max_log_lines=2, max_list_items=100)
+    lines = [f"2024-05-01T10:00:{second:02d}Z INFO request ok" for second in range(10)]
+    lines[3] = "2024-05-01T10:00:03Z ERROR upstream failed status=503"
+
+    assert shaper._as_log_lines(lines) == lines
+    kept = shaper._shape_list(lines, "result", [])
+    assert kept == [lines[3], lines[9]]
+
+
+def test_plain_string_lists_are_not_logs():
+    shaper = ResultShaper(max_log_lines=2, max_list_items=3)
+    names = [f"dashboard-{index}" for index in range(10)]
+
+    assert shaper._as_log_lines(names) is None
+    dropped = []
+    assert shaper._shape_list(names, "result", dropped) == names[:3]
+    assert "kept first 3 of 10 items" in dropped[0]
+
+
+def test_records_with_message_need_timestamp_or_level():
+    shaper = ResultShaper()
+    alerts = [{"id": str(index), "message": "Disk full", "status": "open"} for index in range(5)]
+    entries = [{"timestamp": str(1700000000 + index), "line": "request failed"} for index in range(5)]
+
+    assert shaper._as_log_lines(alerts) is None
+    assert shaper._as_log_lines(entries) == ["request failed"] * 5
+
+
+def test_prometheus_range_is_a_series():
+    points = [[1714557600 + 15 * index, str(index)] for index in range(5)]
+    entries = [{"time": f"2024-05-01T10:00:{second:02d}Z", "value": second} for second in range(5)]
+
+    assert ResultShaper._as_series(points) == [(1714557600 + 15 * index, float(index)) for index in range(5)]
+    assert len(ResultShaper._as_series(entries)) == 5
+
+
+def test_numeric_pairs_without_increasing_timestamps_are_not_a_series():
+    connections_by_port = [[443, "120"], [80, "45"], [8080, "12"], [22, "3"]]
+    repeated = [[1714557600, "1"], [1714557600, "2"]]
+    labelled = [["api-1", "0.5"], ["api-2", "0.7"]]
+
+    for items in (connections_by_port, repeated, labelled):
+        assert ResultShaper._as_series(items) is None, items
+
+    shaper = ResultShaper(max_series_points=2, max_list_items=100)
+    assert shaper._shape_list(connections_by_port, "result", []) == connections_by_port
@@ -0,0 +1,44 @@
+import asyncio
+
+from tool_cache import ToolResultCache
+
+
+def test_caches_successful_results():
+    cache = ToolResultCache()
+    result = {"content": [{"type": "text", "text": "ok"}]}
+    cache.store("grafana", "list_datasources", {}, result)
+
+    assert cache.lookup("grafana", "list_datasources", {}) == (True, result)
+
+
+def test_does_not_cache_error_results():
+    cache = ToolResultCache()
+    cache.store("grafana", "list_datasources", {}, {"content": [{"type": "text", "text": "timeout"}], "isError": True})
+
+    assert cache.lookup("grafana", "list_datasources", {}) == (False, None)
+    assert cache.stats()["errors_not_cached"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_error_result_is_retried_on_next_call():
+    cache = ToolResultCache()
+    responses = [
+        {"content": [{"type": "text", "text": "timeout"}], "isError": True},
+        {"content": [{"type": "text", "text": "ok"}]}
+    ]
+    calls = []
+
+    async def call():
+        calls.append(None)
+        return responses[len(calls) - 1]
+
+    async def main():
+        first = await cache.get_or_call("grafana", "query_prometheus", {"query": "up"}, call)
+        second = await cache.get_or_call("grafana", "query_prometheus", {"query": "up"}, call)
+        third = await cache.get_or_call("grafana", "query_prometheus", {"query": "up"}, call)
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert first["isError"]
+    assert second == third == responses[1]
+    assert len(calls) == 2
@@ -0,0 +1,33 @@
+import pytest
+
+from tool_catalog import ToolCatalog
+
+
+def tool(server, name):
+    return {
+        "server": server,
+        "server_name": server.title(),
+        "name": name,
+        "description": f"{name} description",
+        "inputSchema": {"type": "object", "properties": {}}
+    }
+
+
+def test_resolves_prefixed_names_back_to_server_and_tool():
+    catalog = ToolCatalog([tool("grafana", "query_prometheus"), tool("opsgenie", "add_note")], version=3)
+
+    assert catalog.resolve("grafana_query_prometheus") == ("grafana", "query_prometheus")
+    assert catalog.resolve("opsgenie_add_note") == ("opsgenie", "add_note")
+    assert [entry["name"] for entry in catalog.claude_tools] == ["grafana_query_prometheus", "opsgenie_add_note"]
+    assert catalog.claude_tools[1]["description"] == "[Opsgenie] add_note description"
+    assert len(catalog) == 2
+    assert catalog.version == 3
+
+
+def test_unknown_tool_raises_value_error():
+    catalog = ToolCatalog([tool("grafana", "query_prometheus")])
+
+    with pytest.raises(ValueError, match="Unknown tool: grafana_query_loki"):
+        catalog.resolve("grafana_query_loki")
+    with pytest.raises(ValueError):
+        catalog.resolve("query_prometheus")
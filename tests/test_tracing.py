@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from tracing import InMemoryExporter, SpanContext, Tracer, extract, inject, parse_traceparent
+
+
+def test_traceparent_round_trip():
+    context = SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", sampled=False)
+
+    assert context.to_traceparent() == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"
+    assert parse_traceparent(context.to_traceparent()) == context
+    assert parse_traceparent(" 00-4BF92F3577B34DA6A3CE929D0E0E4736-00F067AA0BA902B7-01 ").sampled
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    "",
+    "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7",
+    "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+    "00-4bf92f3577b34da6a3ce929d0e0e473-00f067aa0ba902b7-01",
+    "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902bz-01",
+    "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+    "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01"
+])
+def test_invalid_traceparent_is_ignored(value):
+    assert parse_traceparent(value) is None
+
+
+def test_injected_header_continues_trace_downstream():
+    exporter = InMemoryExporter()
+    agent = Tracer("incident-agent", exporter)
+    server = Tracer("opsgenie-mcp", exporter)
+
+    with agent.span("mcp.call", kind="client") as client_span:
+        headers = inject({"Content-Type": "application/json"})
+
+    with server.span("tools/call", parent=extract(headers), kind="server") as server_span:
+        pass
+
+    assert headers["traceparent"] == client_span.context.to_traceparent()
+    assert server_span.context.trace_id == client_span.context.trace_id
+    assert server_span.parent_id == client_span.context.span_id
+    assert [span.name for span in exporter.spans(client_span.context.trace_id)] == ["mcp.call", "tools/call"]
+
+
+def test_spans_in_child_tasks_share_the_trace():
+    exporter = InMemoryExporter()
+    tracer = Tracer("incident-agent", exporter)
+
+    async def tool_call():
+        with tracer.span("tool") as span:
+            return span
+
+    async def main():
+        with tracer.span("investigation") as root:
+            children = await asyncio.gather(tool_call(), tool_call())
+        return root, children
+
+    root, children = asyncio.run(main())
+    assert {child.parent_id for child in children} == {root.context.span_id}
+    assert {child.context.trace_id for child in children} == {root.context.trace_id}
+
+
+def test_nothing_is_injected_when_tracing_is_disabled():
+    tracer = Tracer("incident-agent", exporter=None)
+
+    with tracer.span("investigation"):
+        assert inject({}) == {}
@@ -0,0 +1,328 @@
+"""
+Tool result cache for MCP tool calls.
+
+Investigations (and concurrent investigations of related alerts) often repeat
+identical read-only calls such as listing datasources or searching the same
+dashboards. This cache sits in front of `MCPClient.call_tool`, keyed on
+server, tool and canonicalized arguments, with per-tool TTLs, LRU eviction
+under a memory cap, and single-flight so concurrent identical calls share
+one request. Tools that declare side effects are never cached, and neither
+are error results (`isError`), so a transient failure is retried on the
+next call.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Awaitable, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Name prefixes of tools treated as reads when a tool declares no annotations
+READ_PREFIXES = ("list_", "get_", "search_", "query_", "find_", "fetch_")
+
+# Default TTL in seconds by tool name prefix; first match wins
+DEFAULT_PREFIX_TTLS = (
+    ("list_", 300.0),
+    ("search_", 120.0),
+    ("get_", 60.0),
+    ("query_", 15.0),
+)
+
+
+class ToolResultCache:
+    """
+    TTL + LRU cache with single-flight for read-only MCP tool calls.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 30.0,
+        max_bytes: int = 32 * 1024 * 1024
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            tool_ttls: TTL overrides by tool name (without server prefix)
+            default_ttl: TTL for tools matching no override or prefix rule
+            max_bytes: Approximate memory cap for cached results
+        """
+        self.tool_ttls = tool_ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+
+        # (server, tool) -> whether the tool declared side effects / read-only
+        self._declarations: Dict[Tuple[str, str], Optional[bool]] = {}
+
+        self._entries: "OrderedDict[tuple, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0, "bypassed": 0, "errors_not_cached": 0}
+
+    @classmethod
+    def from_env(cls) -> "ToolResultCache":
+        """
+        Build a cache from environment configuration.
+
+        Environment variables (all optional):
+        - TOOL_CACHE_TTLS: JSON object of per-tool TTL overrides in seconds
+        - TOOL_CACHE_DEFAULT_TTL: fallback TTL in seconds
+        - TOOL_CACHE_MAX_BYTES: memory cap
+
+        Returns:
+            ToolResultCache: Configured cache
+        """
+        return cls(
+            tool_ttls=json.loads(os.environ.get('TOOL_CACHE_TTLS', '{}')),
+            default_ttl=float(os.environ.get('TOOL_CACHE_DEFAULT_TTL', 30)),
+            max_bytes=int(os.environ.get('TOOL_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+        )
+
+    def register_tools(self, server_name: str, tools: List[Dict[str, Any]]):
+        """
+        Record the side-effect declarations of a server's tools.
+
+        Uses the MCP tool annotations: `readOnlyHint: true` marks a tool as
+        safe to cache, `readOnlyHint: false` or `destructiveHint: true` marks
+        it as having side effects.
+
+        Args:
+            server_name: Name of the MCP server
+            tools: Tool definitions from tools/list
+        """
+        for tool in tools:
+            annotations = tool.get('annotations') or {}
+            if annotations.get('destructiveHint') is True or annotations.get('readOnlyHint') is False:
+                read_only = False
+            elif annotations.get('readOnlyHint') is True:
+                read_only = True
+            else:
+                read_only = None
+            self._declarations[(server_name, tool['name'])] = read_only
+
+    def is_cacheable(self, server_name: str, tool_name: str) -> bool:
+        """
+        Whether results of a tool may be cached.
+
+        Declared side effects always exclude a tool; undeclared tools are
+        cached only if their name reads like a query.
+        """
+        read_only = self._declarations.get((server_name, tool_name))
+        if read_only is not None:
+            return read_only
+        return tool_name.startswith(READ_PREFIXES)
+
+    def ttl_for(self, tool_name: str) -> float:
+        """TTL in seconds for a tool's results."""
+        if tool_name in self.tool_ttls:
+            return float(self.tool_ttls[tool_name])
+        for prefix, ttl in DEFAULT_PREFIX_TTLS:
+            if tool_name.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def make_key(server_name: str, tool_name: str, arguments: Dict[str, Any]) -> tuple:
+        """Cache key from server, tool and canonicalized arguments."""
+        return (server_name, tool_name, json_codec.dumps(arguments, default=str, sort_keys=True))
+
+    def lookup(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        Look up a fresh cached result without calling the tool.
+
+        Returns:
+            Tuple[bool, Any]: (hit, value)
+        """
+        if not self.is_cacheable(server_name, tool_name):
+            return False, None
+
+        key = self.make_key(server_name, tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._counters["misses"] += 1
+            return False, None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._counters["misses"] += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+        return True, value
+
+    def store(self, server_name: str, tool_name: str, arguments: Dict[str, Any], value: Any):
+        """
+        Cache a tool result if the tool is cacheable and the result is not an error.
+
+        Args:
+            server_name: Name of the MCP server
+            tool_name: Name of the tool
+            arguments: Arguments the tool was called with
+            value: Result to cache
+        """
+        if not self.is_cacheable(server_name, tool_name):
+            return
+        if isinstance(value, dict) and value.get("isError"):
+            self._counters["errors_not_cached"] += 1
+            return
+
+        try:
+            size = len(json_codec.dumps_bytes(value, default=str))
+        except (TypeError, ValueError):
+            return
+        if size > self.max_bytes:
+            return
+
+        key = self.make_key(server_name, tool_name, arguments)
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_for(tool_name), size, value)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    async def get_or_call(
+        self,
+        server_name: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return a cached result, join an identical in-flight call, or make the call.
+
+        Args:
+            server_name: Name of the MCP server
+            tool_name: Name of the tool
+            arguments: Tool arguments
+            call: Coroutine function performing the actual tool call
+
+        Returns:
+            Any: Tool result
+        """
+        if not self.is_cacheable(server_name, tool_name):
+            self._counters["bypassed"] += 1
+            return await call()
+
+        hit, value = self.lookup(server_name, tool_name, arguments)
+        if hit:
+            return value
+
+        key = self.make_key(server_name, tool_name, arguments)
+        task = self._inflight.get(key)
+
+        if task is not None:
+            self._counters["shared"] += 1
+        else:
+            task = asyncio.create_task(self._fill(key, server_name, tool_name, arguments, call))
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+
+        # Shield so one caller's cancellation does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _fill(
+        self,
+        key: tuple,
+        server_name: str,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run the tool call once on behalf of all waiters and cache the result."""
+        try:
+            value = await call()
+            self.store(server_name, tool_name, arguments, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def join(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """
+        Find an identical call already in flight, for callers that send calls themselves (batches).
+
+        Returns:
+            Optional[asyncio.Future]: Future of the in-flight call to await (shielded), or None
+        """
+        if not self.is_cacheable(server_name, tool_name):
+            return None
+        future = self._inflight.get(self.make_key(server_name, tool_name, arguments))
+        if future is not None:
+            self._counters["shared"] += 1
+        return future
+
+    def begin(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Register a call the caller is about to send, so identical calls join it.
+
+        Every key returned must be passed to `complete`, also when the call fails.
+
+        Returns:
+            Optional[tuple]: Key of the in-flight entry, or None if the tool is not cacheable
+        """
+        if not self.is_cacheable(server_name, tool_name):
+            return None
+        key = self.make_key(server_name, tool_name, arguments)
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception retrieved even if nobody joined the call
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+        return key
+
+    def complete(self, key: tuple, server_name: str, tool_name: str, arguments: Dict[str, Any], outcome: Any):
+        """
+        Finish a call registered with `begin`: cache its result and hand it to the calls that joined it.
+
+        Args:
+            key: Key returned by `begin`
+            server_name: Name of the MCP server
+            tool_name: Name of the tool
+            arguments: Arguments the tool was called with
+            outcome: Tool result, or the Exception the call failed with
+        """
+        future = self._inflight.pop(key, None)
+        if isinstance(outcome, BaseException):
+            if future is not None and not future.done():
+                future.set_exception(outcome)
+            return
+        self.store(server_name, tool_name, arguments, outcome)
+        if future is not None and not future.done():
+            future.set_result(outcome)
+
+    def _remove(self, key: tuple):
+        """Drop one entry and release its bytes."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of cache activity.
+
+        Returns:
+            Dict: Entry count, memory use and hit/miss counters; `shared`
+            counts misses that joined an identical in-flight call
+        """
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self._counters["hits"] + self._counters["shared"]) / lookups, 4) if lookups else 0.0,
+            **self._counters
+        }
@@ -0,0 +1,61 @@
+"""
+Tool catalog for the autonomous incident agent.
+
+The catalog is an immutable snapshot of the tools discovered on the MCP
+servers, pre-formatted for Claude's tool calling interface. It is built once
+per discovery run and shared by every investigation.
+"""
+
+from typing import Dict, List, Any, Tuple
+
+
+class ToolCatalog:
+    """
+    Versioned, pre-formatted snapshot of the available MCP tools.
+
+    Instances must be treated as read-only: the same `claude_tools` list is
+    passed to every model call of every investigation.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]], version: int = 0):
+        """
+        Build the catalog from discovered tools.
+
+        Args:
+            tools: Tool definitions annotated with 'server' and 'server_name'
+            version: Monotonic catalog version, bumped on every discovery run
+        """
+        self.version = version
+        self.tools = tools
+        self.claude_tools: List[Dict[str, Any]] = []
+        self.index: Dict[str, Tuple[str, str]] = {}
+
+        for tool in tools:
+            prefixed_name = f"{tool['server']}_{tool['name']}"  # Prefix with server name
+            self.claude_tools.append({
+                "name": prefixed_name,
+                "description": f"[{tool['server_name']}] {tool['description']}",
+                "input_schema": tool.get('inputSchema', {})
+            })
+            self.index[prefixed_name] = (tool['server'], tool['name'])
+
+    def resolve(self, prefixed_name: str) -> Tuple[str, str]:
+        """
+        Map a tool name as seen by Claude back to its MCP server and tool.
+
+        Args:
+            prefixed_name: Server-prefixed tool name from a tool_use block
+
+        Returns:
+            Tuple[str, str]: (server name, tool name)
+
+        Raises:
+            ValueError: If the tool is not in the catalog
+        """
+        try:
+            return self.index[prefixed_name]
+        except KeyError:
+            raise ValueError(f"Unknown tool: {prefixed_name}")
+
+    def __len__(self) -> int:
+        return len(self.claude_tools)
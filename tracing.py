@@ -0,0 +1,466 @@
+"""
+Lightweight distributed tracing with W3C trace context propagation.
+
+Spans are opened with `tracer.span(...)` as context managers; the current
+span lives in a context variable, so spans opened in tasks created inside a
+span become its children. `inject()` adds a `traceparent` header for the
+current span to outgoing requests, and `extract()` reads one from incoming
+requests so a downstream service (the OpsGenie MCP server) continues the
+same trace.
+
+Finished spans go to one process-wide exporter selected with TRACE_EXPORTER:
+- none (default): tracing disabled, spans are no-ops and nothing is propagated
+- memory: kept in memory (most recent TRACE_MEMORY_SPANS), for tests
+- file: appended as JSON lines to TRACE_FILE
+- otlp: batched to an OpenTelemetry collector over OTLP/HTTP JSON at
+  OTEL_EXPORTER_OTLP_ENDPOINT
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterator, Mapping, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+# OTLP span kinds and status codes
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+
+@dataclass
+class SpanContext:
+    """Identity of a span as carried across process boundaries."""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def to_traceparent(self) -> str:
+        """Encode as a W3C traceparent header value."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Decode a W3C traceparent header value.
+
+    Args:
+        value: Header value, e.g. "00-<32 hex trace id>-<16 hex span id>-01"
+
+    Returns:
+        Optional[SpanContext]: Remote parent, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+
+    return SpanContext(parts[1], parts[2], sampled=bool(flags & 1))
+
+
+@dataclass
+class Span:
+    """A timed operation within a trace."""
+    name: str
+    context: SpanContext
+    parent_id: Optional[str]
+    service: str
+    kind: str = "internal"
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "unset"
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute; None values are skipped."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        """Mark the span as failed by the given error."""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+    @property
+    def duration_seconds(self) -> float:
+        """Span duration (0 until the span has ended)."""
+        return max(0, self.end_ns - self.start_ns) / 1e9
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Plain representation used by the memory and file exporters."""
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_seconds": round(self.duration_seconds, 6),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error
+        }
+
+
+class _NoopSpan:
+    """Span stand-in when tracing is disabled."""
+
+    context = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Any:
+    """The active span of the calling task, or a no-op span."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Add the traceparent header of the current span, if any.
+
+    Args:
+        headers: Outgoing request headers, modified in place
+
+    Returns:
+        Dict[str, str]: The same headers
+    """
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.context.to_traceparent()
+    return headers
+
+
+def extract(headers: Mapping[str, str]) -> Optional[SpanContext]:
+    """Remote parent span context from incoming request headers, if present and valid."""
+    return parse_traceparent(headers.get(TRACEPARENT_HEADER))
+
+
+class SpanExporter(ABC):
+    """Destination for finished, sampled spans."""
+
+    @abstractmethod
+    def export(self, span: Span):
+        """Accept one finished span; must not block."""
+
+    async def shutdown(self):
+        """Flush buffered spans and release resources."""
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self._spans.append(span)
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """Finished spans, oldest first, optionally of one trace only."""
+        return [span for span in self._spans if trace_id is None or span.context.trace_id == trace_id]
+
+    def clear(self):
+        """Drop all recorded spans."""
+        self._spans.clear()
+
+
+class FileExporter(SpanExporter):
+    """Appends spans to a file as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+
+    def export(self, span: Span):
+        self._file.write(json.dumps(span.as_dict(), default=str) + "\n")
+
+    async def shutdown(self):
+        self._file.close()
+
+
+class OTLPHTTPExporter(SpanExporter):
+    """
+    Batches spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding.
+
+    Spans are buffered and posted every `flush_interval` seconds, or sooner
+    once `max_batch` spans are waiting. Export failures are logged and the
+    batch is dropped; tracing never slows down or fails the traced work.
+    """
+
+    def __init__(self, endpoint: str, flush_interval: float = 5, max_batch: int = 512, max_buffer: int = 10000):
+        """
+        Initialize the exporter.
+
+        Args:
+            endpoint: Collector base URL (e.g. http://otel-collector:4318); /v1/traces is appended
+            flush_interval: Seconds between exports
+            max_batch: Spans that trigger an early export
+            max_buffer: Spans kept while the collector is unreachable; older spans are dropped
+        """
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer: deque = deque(maxlen=max_buffer)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def export(self, span: Span):
+        self._buffer.append(span)
+        if self._task is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._flush_loop(), name="otlp-exporter")
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        """Export buffered spans periodically."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        """Post everything buffered so far."""
+        if not self._buffer:
+            return
+        spans = list(self._buffer)
+        self._buffer.clear()
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        try:
+            async with self._session.post(self.url, json=self._encode(spans)) as response:
+                if response.status >= 300:
+                    logger.warning(f"OTLP export of {len(spans)} spans failed with status {response.status}")
+        except Exception as e:
+            logger.warning(f"OTLP export of {len(spans)} spans failed: {str(e)}")
+
+    @staticmethod
+    def _encode(spans: List[Span]) -> Dict[str, Any]:
+        """Build an OTLP ExportTraceServiceRequest in its JSON mapping."""
+        by_service: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            encoded = {
+                "traceId": span.context.trace_id,
+                "spanId": span.context.span_id,
+                "name": span.name,
+                "kind": SPAN_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": STATUS_CODES[span.status], **({"message": span.error} if span.error else {})}
+            }
+            if span.parent_id:
+                encoded["parentSpanId"] = span.parent_id
+            by_service.setdefault(span.service, []).append(encoded)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", service)]},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": service_spans}]
+                }
+                for service, service_spans in by_service.items()
+            ]
+        }
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._flush()
+        if self._session is not None:
+            await self._session.close()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encode one attribute as an OTLP KeyValue."""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Tracer:
+    """
+    Creates spans for one service.
+    """
+
+    def __init__(self, service_name: str, exporter: Optional[SpanExporter] = None, sample_ratio: float = 1.0):
+        """
+        Initialize the tracer.
+
+        Args:
+            service_name: Service reported on every span
+            exporter: Destination of finished spans; None disables tracing
+            sample_ratio: Fraction of new traces that are recorded; continued traces follow their parent
+        """
+        self.service_name = service_name
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are created at all."""
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[SpanContext] = None, kind: str = "internal", **attributes) -> Iterator[Any]:
+        """
+        Open a span for the duration of the with-block.
+
+        The span is a child of `parent` if given (a remote parent from
+        `extract()`), else of the current span, else the root of a new
+        trace. An exception escaping the block marks the span as failed.
+
+        Args:
+            name: Operation name
+            parent: Explicit (remote) parent context
+            kind: "internal", "server" or "client"
+            **attributes: Initial span attributes
+
+        Yields:
+            Span: The open span (a no-op span when tracing is disabled)
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+
+        if parent is not None:
+            context = SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+        else:
+            context = SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < self.sample_ratio)
+
+        span = Span(
+            name=name,
+            context=context,
+            parent_id=parent.span_id if parent is not None else None,
+            service=self.service_name,
+            kind=kind,
+            start_ns=time.time_ns(),
+            attributes={key: value for key, value in attributes.items() if value is not None}
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if span.status == "unset" and span.error is None:
+                span.status = "ok"
+            if context.sampled:
+                self.exporter.export(span)
+
+
+def create_exporter() -> Optional[SpanExporter]:
+    """
+    Build the span exporter selected by environment configuration.
+
+    Environment variables: TRACE_EXPORTER (none|memory|file|otlp), TRACE_FILE,
+    TRACE_MEMORY_SPANS, OTEL_EXPORTER_OTLP_ENDPOINT
+
+    Returns:
+        Optional[SpanExporter]: Configured exporter, or None if tracing is disabled
+    """
+    kind = os.environ.get('TRACE_EXPORTER', 'none').lower()
+
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return InMemoryExporter(int(os.environ.get('TRACE_MEMORY_SPANS', 10000)))
+    if kind == "file":
+        return FileExporter(os.environ.get('TRACE_FILE', 'traces.jsonl'))
+    if kind == "otlp":
+        return OTLPHTTPExporter(os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318'))
+
+    raise ValueError(f"Unknown trace exporter: {kind}")
+
+
+# Process-wide exporter shared by all tracers
+exporter = create_exporter()
+
+_tracers: Dict[str, Tracer] = {}
+
+
+def get_tracer(service_name: str) -> Tracer:
+    """
+    Tracer for a service, using the process-wide exporter.
+
+    OTEL_SERVICE_NAME, if set, overrides the service name.
+
+    Args:
+        service_name: Default service name
+
+    Returns:
+        Tracer: Shared tracer instance
+    """
+    service_name = os.environ.get('OTEL_SERVICE_NAME', service_name)
+    tracer = _tracers.get(service_name)
+    if tracer is None:
+        tracer = _tracers[service_name] = Tracer(
+            service_name, exporter, sample_ratio=float(os.environ.get('TRACE_SAMPLE_RATIO', 1.0))
+        )
+    return tracer
+
+
+async def shutdown():
+    """Flush and close the process-wide exporter."""
+    if exporter is not None:
+        await exporter.shutdown()